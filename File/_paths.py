@@ -0,0 +1,16 @@
+# _paths.py
+"""
+File 下的工具复用 Other 中的哈希核心、容量单位与事件输出。
+需要这些共享模块的文件在导入它们之前 import _paths，Other 目录只在这里加入 sys.path 一次，
+且追加在末尾，不会遮蔽标准库或本目录中的同名模块
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+OTHER_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Other"))
+
+if OTHER_DIR not in sys.path:
+    sys.path.append(OTHER_DIR)
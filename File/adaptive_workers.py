@@ -0,0 +1,194 @@
+# adaptive_workers.py
+"""
+自适应并发：按 AIMD（加性增、乘性减）调整同时进行的复制任务数。
+每个统计窗口结束时比较吞吐量，不低于上一窗口就加一个并发，明显下降或出现资源紧张类错误（文件句柄耗尽、超时等）就减半；
+每个挂载点上吞吐量最高的并发数保存在 ~/.openpreptools/concurrency.json，下次从该值开始调整
+"""
+
+from __future__ import annotations
+
+import errno
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+INITIAL_WORKERS = 4
+MIN_WORKERS = 1
+MAX_WORKERS = 32
+WINDOW_SECONDS = 0.5  # 统计窗口的最短时长
+TOLERANCE = 0.1  # 吞吐量下降超过该比例才减少并发
+DECREASE_FACTOR = 0.5
+FILE_COST_BYTES = 64 * 1024  # 每个文件的固定开销折算的字节数，使小文件也能反映吞吐变化
+# 表示资源紧张的错误才减少并发，权限不足等与并发无关的错误不影响调整
+CONGESTION_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.EAGAIN, errno.ENOMEM, errno.EBUSY, errno.ETIMEDOUT, errno.EIO}
+STORE_PATH = os.path.join(os.path.expanduser("~"), ".openpreptools", "concurrency.json")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def mount_point(path: str) -> str:
+    """返回路径所在的挂载点，路径尚不存在时按其最近的上级目录判断"""
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class ConcurrencyStore:
+    """以 JSON 保存每个挂载点上吞吐量最高的并发数"""
+
+    def __init__(self, path: str = STORE_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, mount: str) -> Optional[int]:
+        record = self._read().get(mount)
+        return record.get("workers") if record else None
+
+    def update(self, mount: str, workers: int, rate: float) -> None:
+        with self._lock:
+            data = self._read()
+            data[mount] = {"workers": workers, "bytes_per_sec": round(rate), "updated": int(time.time())}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = self.path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self.path)
+            except OSError:
+                pass  # 无法保存时下次从默认值重新调整即可
+
+
+class AimdController:
+    """
+    AIMD 并发控制器
+    :param initial: 初始并发数
+    :param min_workers: 并发下限
+    :param max_workers: 并发上限，也是线程池的线程数
+    :param mount: 所在挂载点，提供时 save() 会记录最佳并发数
+    :param store: 并发记录存储
+    """
+
+    def __init__(self, initial: int = INITIAL_WORKERS, min_workers: int = MIN_WORKERS,
+                 max_workers: int = MAX_WORKERS, mount: Optional[str] = None,
+                 store: Optional[ConcurrencyStore] = None) -> None:
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.limit = min(max(initial, self.min_workers), self.max_workers)
+        self.mount = mount
+        self.store = store
+        self.best_limit = self.limit
+        self.best_rate = 0.0
+        self._previous_rate: Optional[float] = None
+        self._window_start = time.perf_counter()
+        self._window_cost = 0
+        self._window_files = 0
+        self._lock = threading.Lock()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_workers != self.max_workers
+
+    def record(self, size: int, error: Optional[OSError] = None) -> None:
+        """记录一个完成的任务，窗口结束时调整并发数"""
+        with self._lock:
+            if not self.adaptive:
+                return
+            if error is not None:
+                if error.errno in CONGESTION_ERRNOS:
+                    self._decrease()
+                return
+            self._window_cost += size + FILE_COST_BYTES
+            self._window_files += 1
+            elapsed = time.perf_counter() - self._window_start
+            # 窗口内至少完成 limit 个任务，避免只凭个别文件做判断
+            if elapsed < WINDOW_SECONDS or self._window_files < self.limit:
+                return
+            rate = self._window_cost / elapsed
+            if rate > self.best_rate:
+                self.best_rate, self.best_limit = rate, self.limit
+            if self._previous_rate is None or rate >= self._previous_rate * (1 - TOLERANCE):
+                self.limit = min(self.limit + 1, self.max_workers)
+                self._previous_rate = rate
+            else:
+                self._decrease()
+            self._reset_window()
+
+    def _decrease(self) -> None:
+        self.limit = max(int(self.limit * DECREASE_FACTOR), self.min_workers)
+        # 减少并发后以新窗口的吞吐量作为比较基准
+        self._previous_rate = None
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._window_start = time.perf_counter()
+        self._window_cost = 0
+        self._window_files = 0
+
+    def save(self) -> None:
+        """记录本次观察到的最佳并发数，没有完整统计窗口时不记录"""
+        if self.adaptive and self.mount and self.store and self.best_rate:
+            self.store.update(self.mount, self.best_limit, self.best_rate)
+
+
+def make_controller(path: str, workers: Optional[int] = None,
+                    store: Optional[ConcurrencyStore] = None) -> AimdController:
+    """
+    :param path: 写入目标路径，用于确定挂载点
+    :param workers: 指定时使用固定并发数，None 时从该挂载点上次的最佳值开始自适应调整
+    """
+    if workers:
+        return AimdController(workers, workers, workers)
+    store = store or ConcurrencyStore()
+    mount = mount_point(path)
+    return AimdController(store.get(mount) or INITIAL_WORKERS, mount=mount, store=store)
+
+
+def run_adaptive(items: Iterable[T], func: Callable[[T], R], controller: AimdController,
+                 weight: Callable[[T, Optional[R]], int] = lambda item, result: 0
+                 ) -> Iterator[Tuple[T, Optional[R], Optional[OSError]]]:
+    """
+    按控制器当前的并发数逐步提交任务，任务完成后再补充，结果按完成顺序返回
+    :param items: 任务参数，按需逐个取出，可以是生成器
+    :param func: 在线程池中执行的函数
+    :param weight: 根据任务与结果返回本次实际处理的字节数
+    :return: (任务参数, 结果, OSError 或 None)
+    """
+    iterator = iter(items)
+    pending = {}
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=controller.max_workers) as executor:
+        while True:
+            while not exhausted and len(pending) < controller.limit:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = item
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result, error = future.result(), None
+                except OSError as e:
+                    result, error = None, e
+                controller.record(weight(item, result), error)
+                yield item, result, error
+    controller.save()
@@ -0,0 +1,226 @@
+# backup_engine.py
+"""
+增量备份：保留源目录的相对路径结构，跳过大小与修改时间一致的文件，
+用日志记录已完成的复制以便中断后继续，并可对照上一次快照为未变化的文件创建硬链接（类似 rsync --link-dest）
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from adaptive_workers import make_controller, run_adaptive
+from fast_copy import COPY_BUFFER_SIZE, copy_file as fast_copy_file
+from folder_walker import FileFilter, walk_files
+
+JOURNAL_NAME = ".backup_journal.jsonl"
+PARTIAL_SUFFIX = ".part"
+
+ACTION_COPY = "copy"
+ACTION_LINK = "link"
+ACTION_SKIP = "skip"
+ACTION_RESUME = "resume"
+
+# 回调参数：(相对路径, 动作, 错误信息或 None, 复制策略, 文件字节数)，复制策略仅在动作为 copy 时非空
+BackupCallback = Callable[[str, str, Optional[str], str, int], None]
+
+
+@dataclass
+class BackupReport:
+    """一次备份的统计信息"""
+    files_copied: int = 0
+    bytes_copied: int = 0
+    files_linked: int = 0
+    bytes_linked: int = 0
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    files_failed: int = 0
+    seconds: float = 0.0
+
+    def add(self, action: str, size: int) -> None:
+        if action == ACTION_COPY:
+            self.files_copied += 1
+            self.bytes_copied += size
+        elif action == ACTION_LINK:
+            self.files_linked += 1
+            self.bytes_linked += size
+        else:
+            self.files_skipped += 1
+            self.bytes_skipped += size
+
+    def summary(self) -> str:
+        mb = 1024 ** 2
+        speed = self.bytes_copied / mb / self.seconds if self.seconds else 0.0
+        return (f"复制 {self.files_copied} 个文件 ({self.bytes_copied / mb:.1f} MB, {speed:.1f} MB/秒), "
+                f"硬链接 {self.files_linked} 个 ({self.bytes_linked / mb:.1f} MB), "
+                f"跳过 {self.files_skipped} 个 ({self.bytes_skipped / mb:.1f} MB), "
+                f"失败 {self.files_failed} 个, 用时 {self.seconds:.2f} 秒")
+
+
+def is_unchanged(src_stat: os.stat_result, other_path: str) -> bool:
+    """大小与修改时间（精确到秒）都一致时认为文件未变化"""
+    try:
+        other_stat = os.stat(other_path)
+    except OSError:
+        return False
+    return other_stat.st_size == src_stat.st_size and int(other_stat.st_mtime) == int(src_stat.st_mtime)
+
+
+class BackupJournal:
+    """
+    以 JSON Lines 记录已完成的文件及其备份时源文件的大小与修改时间，每完成一个文件立即写入，中断后可据此继续
+    备份全部完成后删除日志文件
+    """
+
+    def __init__(self, journal_path: str) -> None:
+        self.path = journal_path
+        self.completed: Dict[str, Tuple[int, int]] = {}  # 相对路径 -> (大小, 修改时间（秒）)
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.completed[entry["path"]] = (entry["size"], entry["mtime"])
+                    except (ValueError, KeyError):
+                        # 中断时最后一行可能只写了一半；旧版本日志没有 mtime，按未完成处理
+                        continue
+        self._file = open(journal_path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def is_completed(self, rel_path: str, src_stat: os.stat_result) -> bool:
+        """日志中已完成，且源文件的大小与修改时间与当时一致"""
+        return self.completed.get(rel_path) == (src_stat.st_size, int(src_stat.st_mtime))
+
+    def record(self, rel_path: str, action: str, src_stat: os.stat_result, strategy: str = "") -> None:
+        line = json.dumps({"path": rel_path, "action": action, "size": src_stat.st_size,
+                           "mtime": int(src_stat.st_mtime), "strategy": strategy}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self, finished: bool) -> None:
+        self._file.close()
+        if finished:
+            os.remove(self.path)
+
+
+def iter_source_files(src_dir: str, file_filter: Optional[FileFilter] = None,
+                      walk_workers: int = 1) -> Iterator[Tuple[str, os.stat_result]]:
+    """递归列出源目录中的文件，返回 (相对路径, stat 结果)"""
+    for entry in walk_files(src_dir, file_filter=file_filter, workers=walk_workers):
+        try:
+            yield os.path.relpath(entry.path, src_dir), entry.stat()
+        except OSError:
+            continue
+
+
+def copy_file(src_file: str, dest_file: str, buffer_size: int = COPY_BUFFER_SIZE) -> str:
+    """
+    先复制到临时文件再原子替换，中断时不会留下看似完整的目标文件
+    :return: fast_copy 实际使用的复制策略
+    """
+    temp_file = dest_file + PARTIAL_SUFFIX
+    try:
+        strategy = fast_copy_file(src_file, temp_file, buffer_size=buffer_size)
+        os.replace(temp_file, dest_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return strategy
+
+
+class BackupEngine:
+    """
+    增量备份引擎
+    :param src_dir: 源目录
+    :param dest_dir: 备份目录（使用 link_dest 时即本次快照目录）
+    :param link_dest: 上一次快照目录，未变化的文件在本次快照中以硬链接代替复制
+    :param workers: 固定的并发复制线程数，None 时按备份目录所在挂载点自适应调整
+    :param on_file: 每个文件处理完成后的回调
+    :param file_filter: 只备份符合条件的文件
+    :param walk_workers: 并行遍历源目录的线程数
+    :param buffer_size: 无法使用内核态复制时的缓冲区大小
+    """
+
+    def __init__(self, src_dir: str, dest_dir: str, link_dest: Optional[str] = None, workers: Optional[int] = None,
+                 on_file: Optional[BackupCallback] = None, file_filter: Optional[FileFilter] = None,
+                 walk_workers: int = 1, buffer_size: int = COPY_BUFFER_SIZE) -> None:
+        self.src_dir = os.path.abspath(src_dir)
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.link_dest = os.path.abspath(link_dest) if link_dest else None
+        self.workers = workers
+        self.on_file = on_file
+        self.file_filter = file_filter
+        self.walk_workers = walk_workers
+        self.buffer_size = buffer_size
+        self.report = BackupReport()
+        self._report_lock = threading.Lock()
+
+    def _backup_one(self, rel_path: str, src_stat: os.stat_result) -> Tuple[str, str]:
+        """:return: (动作, 复制策略)"""
+        src_file = os.path.join(self.src_dir, rel_path)
+        dest_file = os.path.join(self.dest_dir, rel_path)
+        if is_unchanged(src_stat, dest_file):
+            return ACTION_SKIP, ""
+        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+        if self.link_dest:
+            previous = os.path.join(self.link_dest, rel_path)
+            if is_unchanged(src_stat, previous):
+                try:
+                    if os.path.lexists(dest_file):
+                        os.remove(dest_file)
+                    os.link(previous, dest_file)
+                    return ACTION_LINK, ""
+                except OSError:
+                    pass  # 跨设备或文件系统不支持硬链接时退回复制
+        return ACTION_COPY, copy_file(src_file, dest_file, self.buffer_size)
+
+    def _finish(self, rel_path: str, action: str, size: int, error: Optional[str], strategy: str = "") -> None:
+        with self._report_lock:
+            if error:
+                self.report.files_failed += 1
+            else:
+                self.report.add(action, size)
+        if self.on_file:
+            self.on_file(rel_path, action, error, strategy, size)
+
+    def run(self) -> BackupReport:
+        """执行备份，返回统计信息；中断后再次运行会跳过日志中已完成且之后未变化的文件"""
+        start = time.perf_counter()
+        os.makedirs(self.dest_dir, exist_ok=True)
+        journal = BackupJournal(os.path.join(self.dest_dir, JOURNAL_NAME))
+
+        def pending_files() -> Iterator[Tuple[str, os.stat_result]]:
+            for rel_path, src_stat in iter_source_files(self.src_dir, self.file_filter, self.walk_workers):
+                # 中断后源文件可能被修改，或备份中的副本被改动，两者都一致时才跳过
+                if (journal.is_completed(rel_path, src_stat)
+                        and is_unchanged(src_stat, os.path.join(self.dest_dir, rel_path))):
+                    self._finish(rel_path, ACTION_RESUME, src_stat.st_size, None)
+                    continue
+                yield rel_path, src_stat
+
+        def copied_bytes(item: Tuple[str, os.stat_result], result: Optional[Tuple[str, str]]) -> int:
+            # 跳过与硬链接不产生数据复制，不计入吞吐量
+            return item[1].st_size if result and result[0] == ACTION_COPY else 0
+
+        finished = False
+        try:
+            controller = make_controller(self.dest_dir, self.workers)
+            results = run_adaptive(pending_files(), lambda item: self._backup_one(*item), controller, copied_bytes)
+            for (rel_path, src_stat), outcome, error in results:
+                if error:
+                    self._finish(rel_path, ACTION_COPY, src_stat.st_size, str(error))
+                    continue
+                action, strategy = outcome
+                journal.record(rel_path, action, src_stat, strategy)
+                self._finish(rel_path, action, src_stat.st_size, None, strategy)
+            finished = self.report.files_failed == 0
+        finally:
+            journal.close(finished)
+            self.report.seconds = time.perf_counter() - start
+        return self.report
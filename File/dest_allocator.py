@@ -0,0 +1,106 @@
+# dest_allocator.py
+"""
+目标文件名分配：在整个计划范围内预留文件名，同名文件依次追加 _1、_2 或内容哈希后缀
+每个目标目录只列一次目录，不再逐个文件调用 os.path.exists；可选以 O_EXCL 原子创建占位文件，
+防止并发的其他进程在计划执行前写入同名文件
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Optional, Set
+
+# 哈希核心位于 Other/md5_checker_core.py，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from md5_checker_core import calculate_md5
+
+SUFFIX_COUNTER = "counter"
+SUFFIX_HASH = "hash"
+HASH_SUFFIX_LENGTH = 8
+
+
+class DestinationAllocator:
+    """
+    为一批文件分配不冲突的目标路径，线程安全
+    :param suffix_mode: "counter" 使用 _1、_2 递增后缀；"hash" 使用源文件内容哈希前 8 位
+    :param claim: 为 True 时以独占方式创建空占位文件，执行移动/复制时覆盖该占位文件
+    """
+
+    def __init__(self, suffix_mode: str = SUFFIX_COUNTER, claim: bool = True) -> None:
+        if suffix_mode not in (SUFFIX_COUNTER, SUFFIX_HASH):
+            raise ValueError(f"未知的后缀模式: {suffix_mode}")
+        self.suffix_mode = suffix_mode
+        self.claim = claim
+        self._names: Dict[str, Set[str]] = {}  # 目录 -> 已存在或已预留的文件名
+        self._counters: Dict[str, int] = {}  # 目标路径 -> 下一个递增后缀
+        self._claimed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _dir_names(self, directory: str) -> Set[str]:
+        names = self._names.get(directory)
+        if names is None:
+            try:
+                names = {entry.name for entry in os.scandir(directory)}
+            except FileNotFoundError:
+                names = set()
+            self._names[directory] = names
+        return names
+
+    def _candidates(self, dest_path: str, src_path: Optional[str]):
+        yield dest_path
+        base, extension = os.path.splitext(dest_path)
+        if self.suffix_mode == SUFFIX_HASH and src_path:
+            digest = calculate_md5(src_path)[:HASH_SUFFIX_LENGTH]
+            base = f"{base}_{digest}"
+            yield f"{base}{extension}"
+        counter = self._counters.get(dest_path, 1)
+        while True:
+            self._counters[dest_path] = counter + 1
+            yield f"{base}_{counter}{extension}"
+            counter += 1
+
+    def allocate(self, dest_path: str, src_path: Optional[str] = None) -> str:
+        """
+        为 dest_path 分配一个未被占用的路径并预留
+        :param dest_path: 期望的目标路径
+        :param src_path: 源文件路径，仅在哈希后缀模式下需要
+        :return: 实际使用的目标路径
+        :raises OSError: 计算哈希后缀或创建占位文件失败（文件已存在除外）时抛出
+        """
+        directory = os.path.dirname(dest_path)
+        with self._lock:
+            names = self._dir_names(directory)
+            for candidate in self._candidates(dest_path, src_path):
+                name = os.path.basename(candidate)
+                if name in names:
+                    continue
+                names.add(name)
+                if self.claim and not self._claim(candidate):
+                    continue
+                return candidate
+
+    def _claim(self, path: str) -> bool:
+        """以 O_EXCL 创建占位文件，文件已被其他进程创建时返回 False"""
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        self._claimed.add(path)
+        return True
+
+    def is_claimed(self, path: str) -> bool:
+        return path in self._claimed
+
+    def release(self, path: str) -> None:
+        """操作失败时删除仍为空的占位文件"""
+        with self._lock:
+            if path not in self._claimed:
+                return
+            self._claimed.discard(path)
+            try:
+                if os.path.getsize(path) == 0:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,251 @@
+# duplicate_finder.py
+"""
+重复文件查找：复用 MD5 校验器的哈希核心，分三步筛选以避免读取大部分字节
+1. 按文件大小分组，大小唯一的文件直接排除
+2. 对剩余文件抽样头、中、尾三段计算指纹，指纹唯一的文件排除
+3. 仅对仍然冲突的文件计算完整哈希
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from folder_walker import FileFilter, walk_files
+
+# 哈希核心位于 Other/md5_checker_core.py，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from md5_checker_core import iter_hash_files
+
+SAMPLE_SIZE = 64 * 1024  # 抽样指纹每段读取的字节数
+
+
+@dataclass
+class DuplicateGroup:
+    """一组内容完全相同的文件，paths[0] 为保留的文件，已互为硬链接的路径排在末尾"""
+    size: int
+    digest: str
+    paths: List[str]
+
+    @property
+    def wasted_bytes(self) -> int:
+        return self.size * (len(self.paths) - 1)
+
+
+@dataclass
+class ScanStats:
+    """各阶段的统计信息"""
+    files_scanned: int = 0
+    bytes_total: int = 0
+    size_candidates: int = 0
+    sample_candidates: int = 0
+    bytes_read: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def sample_fingerprint(file_path: str, size: int, sample_size: int = SAMPLE_SIZE,
+                       algorithm: str = "md5") -> Tuple[str, int]:
+    """
+    读取文件头、中、尾三段计算抽样指纹
+    :return: (指纹, 实际读取的字节数)；文件不超过三段时读取的就是全部内容，指纹即完整哈希
+    """
+    digest = hashlib.new(algorithm)
+    read = 0
+    with open(file_path, 'rb') as f:
+        if size <= sample_size * 3:
+            data = f.read()
+            digest.update(data)
+            return digest.hexdigest(), len(data)
+        for offset in (0, (size - sample_size) // 2, size - sample_size):
+            f.seek(offset)
+            data = f.read(sample_size)
+            digest.update(data)
+            read += len(data)
+    return digest.hexdigest(), read
+
+
+def _group_by_size(paths: Iterable[str], min_size: int, stats: ScanStats,
+                   aliases: Dict[str, List[str]]) -> Dict[int, List[str]]:
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    seen_inodes: Dict[Tuple[int, int], str] = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            stats.errors.append(f"{path}: {e}")
+            continue
+        stats.files_scanned += 1
+        stats.bytes_total += st.st_size
+        if st.st_size < min_size:
+            continue
+        # 互为硬链接的文件只计算一次，其余路径记为别名
+        inode = (st.st_dev, st.st_ino)
+        if st.st_ino and inode in seen_inodes:
+            aliases[seen_inodes[inode]].append(path)
+            continue
+        seen_inodes[inode] = path
+        by_size[st.st_size].append(path)
+    return {size: group for size, group in by_size.items() if len(group) > 1}
+
+
+def iter_files(root_dir: str, file_filter: Optional[FileFilter] = None, walk_workers: int = 1) -> Iterable[str]:
+    """递归列出目录中的文件（不跟随符号链接）"""
+    for entry in walk_files(root_dir, file_filter=file_filter, workers=walk_workers):
+        yield entry.path
+
+
+def find_duplicates(paths: Iterable[str], algorithm: str = "md5", min_size: int = 1, jobs: int = 4,
+                    sample_size: int = SAMPLE_SIZE,
+                    progress: Optional[Callable[[str, int, int], None]] = None) -> Tuple[List[DuplicateGroup], ScanStats]:
+    """
+    在给定的文件中查找重复文件
+    :param paths: 文件路径列表
+    :param algorithm: 完整哈希使用的算法
+    :param min_size: 小于该大小的文件不参与比较（默认忽略空文件）
+    :param jobs: 抽样与完整哈希的并发线程数
+    :param sample_size: 抽样指纹每段读取的字节数
+    :param progress: 回调 (阶段名, 已完成数, 总数)
+    :return: (重复文件组列表, 统计信息)
+    """
+    stats = ScanStats()
+    aliases: Dict[str, List[str]] = defaultdict(list)
+    by_size = _group_by_size(paths, min_size, stats, aliases)
+    stats.size_candidates = sum(len(group) for group in by_size.values())
+
+    # 第二步：抽样指纹
+    sample_tasks = [(size, path) for size, group in by_size.items() for path in group]
+    by_sample: Dict[Tuple[int, str], List[str]] = defaultdict(list)
+    fully_read = set()  # 抽样时已读取全部内容的文件，无需再计算完整哈希
+
+    def _sample(task):
+        size, path = task
+        try:
+            return size, path, sample_fingerprint(path, size, sample_size, algorithm), None
+        except OSError as e:
+            return size, path, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for done, (size, path, result, error) in enumerate(executor.map(_sample, sample_tasks), start=1):
+            if error is not None:
+                stats.errors.append(f"{path}: {error}")
+            else:
+                fingerprint, read = result
+                stats.bytes_read += read
+                if read == size:
+                    fully_read.add(path)
+                by_sample[(size, fingerprint)].append(path)
+            if progress:
+                progress("sample", done, len(sample_tasks))
+
+    candidates = {key: group for key, group in by_sample.items() if len(group) > 1}
+    stats.sample_candidates = sum(len(group) for group in candidates.values())
+
+    # 第三步：完整哈希
+    groups: List[DuplicateGroup] = []
+    need_full = [path for group in candidates.values() for path in group if path not in fully_read]
+    full_digests: Dict[str, str] = {}
+    for done, result in enumerate(iter_hash_files(need_full, algorithm, jobs=jobs), start=1):
+        if result.error:
+            stats.errors.append(f"{result.path}: {result.error}")
+        else:
+            full_digests[result.path] = result.digest
+            stats.bytes_read += os.path.getsize(result.path)
+        if progress:
+            progress("hash", done, len(need_full))
+
+    for (size, fingerprint), group in candidates.items():
+        by_digest: Dict[str, List[str]] = defaultdict(list)
+        for path in group:
+            # 小文件的抽样指纹就是完整内容的哈希
+            digest = fingerprint if path in fully_read else full_digests.get(path)
+            if digest:
+                by_digest[digest].append(path)
+        for digest, same in by_digest.items():
+            if len(same) > 1:
+                same = sorted(same)
+                groups.append(DuplicateGroup(size, digest, same + [a for path in same for a in aliases.get(path, [])]))
+
+    groups.sort(key=lambda g: g.wasted_bytes, reverse=True)
+    return groups, stats
+
+
+def find_duplicates_in_dir(root_dir: str, file_filter: Optional[FileFilter] = None, walk_workers: int = 1,
+                           **kwargs) -> Tuple[List[DuplicateGroup], ScanStats]:
+    """在目录中递归查找重复文件，其余参数同 find_duplicates"""
+    return find_duplicates(iter_files(root_dir, file_filter, walk_workers), **kwargs)
+
+
+def _link_temp(src: str, dest: str) -> str:
+    """在 dest 所在目录以唯一的临时文件名创建指向 src 的硬链接，不会覆盖已有文件"""
+    while True:
+        temp_path = f"{dest}.{uuid.uuid4().hex[:8]}.duplink"
+        try:
+            os.link(src, temp_path)
+            return temp_path
+        except FileExistsError:
+            continue
+
+
+def hardlink_duplicates(groups: List[DuplicateGroup]) -> List[Tuple[str, str]]:
+    """
+    将每组中除保留文件外的重复文件替换为指向保留文件的硬链接
+    先在同目录创建临时硬链接再原子替换，失败时原文件保持不变
+    :return: [(被替换的文件, 错误信息或空字符串)]
+    """
+    results = []
+    for group in groups:
+        keep = group.paths[0]
+        for dup in group.paths[1:]:
+            temp_path = None  # 仅删除本函数创建的临时链接
+            try:
+                if os.path.samefile(keep, dup):
+                    continue
+                temp_path = _link_temp(keep, dup)
+                os.replace(temp_path, dup)
+                results.append((dup, ""))
+            except OSError as e:
+                if temp_path is not None and os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                results.append((dup, str(e)))
+    return results
+
+
+def move_duplicates(groups: List[DuplicateGroup], dest_dir: str, root_dir: str) -> List[Tuple[str, str]]:
+    """
+    将重复文件移动到 dest_dir，保留其相对 root_dir 的目录结构
+    :return: [(被移动的文件, 错误信息或空字符串)]
+    """
+    results = []
+    for group in groups:
+        for dup in group.paths[1:]:
+            target = os.path.join(dest_dir, os.path.relpath(dup, root_dir))
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(dup, target)
+                results.append((dup, ""))
+            except OSError as e:
+                results.append((dup, str(e)))
+    return results
+
+
+def write_report(groups: List[DuplicateGroup], report_path: str) -> None:
+    """将重复文件组写入报告，扩展名为 .csv 时输出 CSV，否则输出 JSON"""
+    if report_path.lower().endswith(".csv"):
+        with open(report_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["group", "digest", "size", "path", "keep"])
+            for index, group in enumerate(groups, start=1):
+                for i, path in enumerate(group.paths):
+                    writer.writerow([index, group.digest, group.size, path, i == 0])
+    else:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump([{"digest": g.digest, "size": g.size, "paths": g.paths} for g in groups], f,
+                      ensure_ascii=False, indent=2)
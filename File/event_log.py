@@ -0,0 +1,166 @@
+# event_log.py
+"""
+批量、限频的日志输出：工作线程只把事件放入队列，由单独的消费线程成批取出，
+驱动进度条与结束时的汇总，按日志级别限频输出到控制台，
+并把逐个文件的完整日志写入 gzip 压缩的 JSON Lines 文件，控制台输出不再拖慢大量小文件的处理
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from rich.console import Console
+from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn, TimeElapsedColumn
+
+LOG_SIMPLE = "simple"  # 只显示进度条、错误与汇总
+LOG_DETAILED = "detailed"  # 另外逐个显示已处理的文件（限频）
+
+LOG_DIR = os.path.join(os.path.expanduser("~"), ".openpreptools", "logs")
+BATCH_SIZE = 512  # 消费线程每次最多取出的事件数
+MAX_LINES_PER_SECOND = 20  # 控制台每秒最多输出的日志行数，超出部分只写入日志文件
+
+
+@dataclass
+class LogEvent:
+    """
+    :param message: 控制台显示的文本
+    :param size: 处理的字节数
+    :param error: 错误信息
+    :param counted: 是否计入进度
+    :param fields: 写入日志文件的其他字段
+    """
+    message: str
+    size: int = 0
+    error: Optional[str] = None
+    counted: bool = True
+    fields: dict = field(default_factory=dict)
+
+
+_STOP = object()
+
+
+def default_log_path(name: str) -> str:
+    return os.path.join(LOG_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+
+
+class EventLog:
+    """
+    在 with 块内使用，put() 可在任意线程调用且不会阻塞
+    :param console: Rich 控制台
+    :param description: 进度条说明
+    :param total: 事件总数，未知时进度条不显示百分比
+    :param level: LOG_SIMPLE 或 LOG_DETAILED
+    :param log_path: 完整日志路径（.jsonl.gz），None 时不写日志文件
+    """
+
+    def __init__(self, console: Console, description: str, total: Optional[int] = None,
+                 level: str = LOG_SIMPLE, log_path: Optional[str] = None) -> None:
+        self.console = console
+        self.description = description
+        self.total = total
+        self.level = level
+        self.log_path = log_path
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._progress = Progress(TextColumn("{task.description}"), BarColumn(), TaskProgressColumn(),
+                                  TextColumn("{task.completed} 项"), TimeElapsedColumn(), console=console)
+        self._task = None
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._log_file = None
+        self._start = 0.0
+        self._window_start = 0.0
+        self._window_lines = 0
+        self._suppressed = 0
+
+    def put(self, message: str, size: int = 0, error: Optional[str] = None, counted: bool = True,
+            **fields) -> None:
+        self._queue.put(LogEvent(message, size, error, counted, fields))
+
+    def __enter__(self) -> "EventLog":
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            # 同一秒内的多次运行追加为新的 gzip 成员，不会覆盖之前的日志
+            self._log_file = gzip.open(self.log_path, 'at', encoding='utf-8')
+        self._start = self._window_start = time.perf_counter()
+        self._progress.start()
+        self._task = self._progress.add_task(self.description, total=self.total)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._flush_suppressed()
+        self._progress.stop()
+        if self._log_file:
+            self._log_file.close()
+        self.console.log(self.summary())
+
+    def _consume(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = batch[-1] is _STOP
+            events = [event for event in batch if event is not _STOP]
+            self._handle(events)
+            if stop:
+                return
+
+    def _handle(self, events) -> None:
+        lines = []
+        for event in events:
+            if event.counted:
+                if event.error:
+                    self.failed += 1
+                else:
+                    self.files += 1
+                    self.bytes += event.size
+            if self._log_file:
+                record = {"time": round(time.time(), 3), "message": event.message, "size": event.size,
+                          "error": event.error, **event.fields}
+                lines.append(json.dumps(record, ensure_ascii=False))
+            if event.error:
+                self._print(f"[red]{event.message}: {event.error}[/red]")
+            elif self.level == LOG_DETAILED:
+                self._print(event.message)
+        if lines:
+            self._log_file.write("\n".join(lines) + "\n")
+        self._progress.update(self._task, completed=self.files + self.failed)
+
+    def _print(self, text: str) -> None:
+        now = time.perf_counter()
+        if now - self._window_start >= 1.0:
+            self._flush_suppressed()
+            self._window_start, self._window_lines = now, 0
+        if self._window_lines < MAX_LINES_PER_SECOND:
+            self._window_lines += 1
+            self.console.log(text)
+        else:
+            self._suppressed += 1
+
+    def _flush_suppressed(self) -> None:
+        if self._suppressed:
+            hint = f"，完整日志见 {self.log_path}" if self.log_path else ""
+            self.console.log(f"[dim]已省略 {self._suppressed} 条日志{hint}[/dim]")
+            self._suppressed = 0
+
+    def summary(self) -> str:
+        seconds = time.perf_counter() - self._start
+        mb = self.bytes / 1024 ** 2
+        text = f"{self.description}: 完成 {self.files} 项, 失败 {self.failed} 项, {mb:.1f} MB, 用时 {seconds:.2f} 秒"
+        if seconds:
+            text += f", {self.files / seconds:.1f} 文件/秒, {mb / seconds:.1f} MB/秒"
+        return text + (f"\n完整日志: {self.log_path}" if self.log_path else "")
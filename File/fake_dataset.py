@@ -0,0 +1,194 @@
+# fake_dataset.py
+"""
+可重现的伪文件数据集：文件名、大小、目录结构与内容都只由生成参数和种子决定。
+生成时写出清单（JSON Lines：首行为生成参数，其后每行一个文件的路径、大小与哈希），
+之后可据此逐字节重新生成同一数据集，或在传输、备份之后校验目标位置的文件
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fake_file_core import (CONTENT_TEXT, CREATE_WORKERS, ProgressCallback, SizeDistribution, TreeShape, create_files,
+                            plan_tree)
+from stage_report import StageReport
+from unique_names import NameSpace, UniqueNameGenerator
+
+# 哈希核心位于 Other/md5_checker_core.py，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from md5_checker_core import (STATUS_ERROR, STATUS_FAILED, STATUS_MISSING, STATUS_OK, VerifyResult,
+                              iter_hash_files)
+
+MANIFEST_VERSION = 1
+DEFAULT_ALGORITHM = "md5"
+
+
+@dataclass
+class DatasetSpec:
+    """
+    数据集的全部生成参数
+    :param roots: 根目录，目录树的顶层目录轮流分布到各个根目录
+    :param file_details: 扩展名 -> 文件数
+    :param seed: 种子，决定文件名、大小与内容
+    :param name_alphabet: 随机文件名使用的字符，为空时使用 fake_file_1 形式的文件名
+    :param max_name_length: 随机文件名的最大长度
+    """
+    roots: List[str]
+    file_details: Dict[str, int]
+    seed: int
+    name_alphabet: str = ""
+    max_name_length: int = 10
+    size_distribution: SizeDistribution = field(default_factory=SizeDistribution)
+    content: str = CONTENT_TEXT
+    tree_shape: TreeShape = field(default_factory=TreeShape)
+
+    def __post_init__(self) -> None:
+        """:raises ValueError: 随机文件名的名称空间不足时在创建任何文件之前抛出"""
+        if self.name_alphabet:
+            space = NameSpace(self.name_alphabet, self.max_name_length)
+            if space.size < self.total_files:
+                raise ValueError(f"字符 \"{space.alphabet}\" 组成的长度不超过 {self.max_name_length} 的名称"
+                                 f"只有 {space.size} 个，无法生成 {self.total_files} 个不重复的文件名")
+
+    @property
+    def total_files(self) -> int:
+        return sum(self.file_details.values())
+
+    def names(self) -> List[str]:
+        names = []
+        if self.name_alphabet:
+            stems = UniqueNameGenerator(self.name_alphabet, self.max_name_length, self.seed).names(self.total_files)
+            for ext, count in self.file_details.items():
+                names.extend(f"{next(stems)}.{ext}" for _ in range(count))
+        else:
+            for ext, count in self.file_details.items():
+                names.extend(f"fake_file_{i + 1}.{ext}" for i in range(count))
+        return names
+
+    def build(self) -> List[Tuple[str, int]]:
+        """:return: [(文件路径, 大小)]"""
+        sizes = self.size_distribution.sizes(self.total_files, random.Random(self.seed))
+        return plan_tree(self.names(), sizes, self.tree_shape, self.roots)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DatasetSpec":
+        data = dict(data)
+        data["size_distribution"] = SizeDistribution(**data["size_distribution"])
+        data["tree_shape"] = TreeShape(**data["tree_shape"])
+        return cls(**data)
+
+
+def _locate(path: str, roots: Sequence[str]) -> Tuple[int, str]:
+    """返回 (根目录序号, 相对路径)"""
+    for index, root in enumerate(roots):
+        if os.path.commonpath([os.path.abspath(root), os.path.abspath(path)]) == os.path.abspath(root):
+            return index, os.path.relpath(path, root)
+    raise ValueError(f"文件不在任何根目录中: {path}")
+
+
+def write_manifest(manifest_path: str, spec: DatasetSpec, files: Sequence[Tuple[str, int]],
+                   checksums: Sequence[str], algorithm: str = DEFAULT_ALGORITHM) -> None:
+    """写出清单，先写入临时文件再替换，中断时不会留下不完整的清单"""
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        header = {"version": MANIFEST_VERSION, "algorithm": algorithm, "spec": spec.to_dict()}
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for (path, size), digest in zip(files, checksums):
+            root, rel_path = _locate(path, spec.roots)
+            entry = {"root": root, "path": rel_path.replace(os.sep, "/"), "size": size, algorithm: digest}
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(temp_path, manifest_path)
+
+
+def read_manifest(manifest_path: str) -> Tuple[DatasetSpec, str, List[dict]]:
+    """
+    :return: (生成参数, 哈希算法, 文件条目)
+    :raises ValueError: 清单版本不受支持时抛出
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"不支持的清单版本: {header.get('version')}")
+        entries = [json.loads(line) for line in f if line.strip()]
+    return DatasetSpec.from_dict(header["spec"]), header["algorithm"], entries
+
+
+def generate_dataset(spec: DatasetSpec, manifest_path: Optional[str] = None, workers: int = CREATE_WORKERS,
+                     on_progress: Optional[ProgressCallback] = None, errors: Optional[List[Tuple[str, str]]] = None,
+                     algorithm: str = DEFAULT_ALGORITHM) -> List[StageReport]:
+    """
+    生成数据集，提供 manifest_path 时在写入的同时计算哈希并写出清单
+    :return: [创建目录阶段, 创建文件阶段] 的统计
+    """
+    files = spec.build()
+    checksums: List[str] = []
+    reports = create_files(files, spec.content, spec.seed, workers, on_progress, errors,
+                           algorithm if manifest_path else None, checksums)
+    if manifest_path:
+        write_manifest(manifest_path, spec, files, checksums, algorithm)
+    return reports
+
+
+def _check_roots(spec: DatasetSpec, roots: Sequence[str]) -> None:
+    """
+    顶层目录按顺序轮流分配到各根目录，根目录数量不同会得到与清单不同的布局
+    :raises ValueError: 新根目录的数量与清单中的不一致时抛出
+    """
+    if len(roots) != len(spec.roots):
+        raise ValueError(f"根目录数量必须与清单一致：清单中有 {len(spec.roots)} 个，指定了 {len(roots)} 个")
+
+
+def regenerate_dataset(manifest_path: str, roots: Optional[List[str]] = None, workers: int = CREATE_WORKERS,
+                       on_progress: Optional[ProgressCallback] = None,
+                       errors: Optional[List[Tuple[str, str]]] = None) -> List[StageReport]:
+    """
+    按清单中的生成参数重新生成同一数据集，可指定新的根目录
+    :raises ValueError: roots 的数量与清单中的根目录数量不一致时抛出
+    """
+    spec, _, _ = read_manifest(manifest_path)
+    if roots:
+        _check_roots(spec, roots)
+        spec.roots = roots
+    return generate_dataset(spec, None, workers, on_progress, errors)
+
+
+def verify_dataset(manifest_path: str, roots: Optional[List[str]] = None,
+                   jobs: int = os.cpu_count() or 1) -> Iterator[VerifyResult]:
+    """
+    按清单校验数据集：先比较大小，大小一致的文件再并行计算哈希
+    :param roots: 数据集被传输到的新根目录，默认为生成时的根目录
+    :return: 按完成顺序返回各文件的校验结果
+    :raises ValueError: roots 的数量与清单中的根目录数量不一致时抛出
+    """
+    spec, algorithm, entries = read_manifest(manifest_path)
+    if roots:
+        _check_roots(spec, roots)
+    roots = roots or spec.roots
+    expected = {}
+    for entry in entries:
+        path = os.path.join(roots[entry["root"]], *entry["path"].split("/"))
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            yield VerifyResult(path, STATUS_MISSING, entry[algorithm])
+            continue
+        except OSError as e:
+            yield VerifyResult(path, STATUS_ERROR, entry[algorithm], error=str(e))
+            continue
+        if size != entry["size"]:
+            yield VerifyResult(path, STATUS_FAILED, entry[algorithm], error=f"大小不一致: {size} != {entry['size']}")
+            continue
+        expected[path] = entry[algorithm]
+    for result in iter_hash_files(expected, algorithm, jobs=jobs):
+        if result.error:
+            yield VerifyResult(result.path, STATUS_ERROR, expected[result.path], error=result.error)
+        else:
+            status = STATUS_OK if result.digest == expected[result.path] else STATUS_FAILED
+            yield VerifyResult(result.path, status, expected[result.path], result.digest)
@@ -0,0 +1,333 @@
+# fake_file_core.py
+"""
+伪文件生成核心：文件大小分布（固定、均匀、对数正态、按总字节数分配）与内容模式
+（全零、稀疏文件、伪随机不可压缩数据、可压缩文本），用于对传输与备份流程做压力测试。
+写入时复用预分配的大缓冲区，并先用 posix_fallocate 为文件分配磁盘空间；
+可按目录树形状（深度、分支数、每个叶子目录的文件数）分布到多个根目录，并用线程池并行创建，
+结束时的统计（文件/秒、MB/秒）也可作为文件系统元数据性能的基准
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from stage_report import StageReport
+
+SIZE_FIXED = "fixed"
+SIZE_UNIFORM = "uniform"
+SIZE_LOGNORMAL = "lognormal"
+SIZE_BUDGET = "budget"
+SIZE_MODES = (SIZE_FIXED, SIZE_UNIFORM, SIZE_LOGNORMAL, SIZE_BUDGET)
+
+CONTENT_ZEROS = "zeros"
+CONTENT_SPARSE = "sparse"
+CONTENT_RANDOM = "random"
+CONTENT_TEXT = "text"
+CONTENT_MODES = (CONTENT_ZEROS, CONTENT_SPARSE, CONTENT_RANDOM, CONTENT_TEXT)
+
+WRITE_CHUNK_SIZE = 4 * 1024 * 1024
+TEXT_PATTERN_SIZE = 64 * 1024
+RANDOM_POOL_CHUNKS = 2  # random 模式的随机数据池为单次写入字节数的倍数
+CREATE_WORKERS = 8
+CREATE_BATCH_SIZE = 256  # 每个线程池任务创建的文件数，避免为上百万个文件各提交一个任务
+FAKE_TEXT = "This is a fake file."
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do",
+         "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore", "magna", "aliqua", "fake",
+         "file", "backup", "transfer", "test", "data", "block", "stream", "archive")
+
+
+@dataclass
+class SizeDistribution:
+    """
+    文件大小分布
+    :param mode: fixed 固定大小; uniform 在 [min_size, max_size] 均匀分布;
+                 lognormal 以 size 为中位数的对数正态分布（截断到 [min_size, max_size]）;
+                 budget 按对数正态权重把 total_bytes 分给所有文件，总和恰好等于 total_bytes
+    :param size: 固定大小，或对数正态分布的中位数
+    :param min_size: 最小字节数
+    :param max_size: 最大字节数
+    :param sigma: 对数正态分布的形状参数，越大大小差异越悬殊
+    :param total_bytes: budget 模式下所有文件的总字节数
+    """
+    mode: str = SIZE_FIXED
+    size: int = len(FAKE_TEXT)
+    min_size: int = 0
+    max_size: int = 64 * 1024 * 1024
+    sigma: float = 1.0
+    total_bytes: int = 0
+
+    def __post_init__(self) -> None:
+        if self.mode not in SIZE_MODES:
+            raise ValueError(f"未知的大小分布: {self.mode}")
+        if self.min_size < 0 or self.max_size < self.min_size:
+            raise ValueError("文件大小范围无效")
+
+    def sizes(self, count: int, rng: random.Random) -> List[int]:
+        """生成 count 个文件的大小"""
+        if self.mode == SIZE_FIXED:
+            return [self.size] * count
+        if self.mode == SIZE_UNIFORM:
+            return [rng.randint(self.min_size, self.max_size) for _ in range(count)]
+        if self.mode == SIZE_LOGNORMAL:
+            mu = math.log(max(self.size, 1))
+            return [min(max(int(rng.lognormvariate(mu, self.sigma)), self.min_size), self.max_size)
+                    for _ in range(count)]
+        if count == 0:
+            return []
+        weights = [rng.lognormvariate(0.0, self.sigma) for _ in range(count)]
+        scale = self.total_bytes / sum(weights)
+        sizes = [int(w * scale) for w in weights]
+        # 向下取整剩余的字节依次补给前面的文件
+        remainder = self.total_bytes - sum(sizes)
+        for i in range(remainder):
+            sizes[i % count] += 1
+        return sizes
+
+
+def _text_block(size: int, rng: random.Random) -> bytearray:
+    """生成以 FAKE_TEXT 开头、由随机单词组成的可压缩文本块，先生成 64 KB 再重复填满"""
+    lines = [FAKE_TEXT]
+    length = len(FAKE_TEXT) + 1
+    while length < min(size, TEXT_PATTERN_SIZE):
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))) + "."
+        lines.append(line)
+        length += len(line) + 1
+    pattern = ("\n".join(lines) + "\n").encode("ascii")
+    return bytearray((pattern * (size // len(pattern) + 1))[:size])
+
+
+def preallocate(fd: int, size: int) -> bool:
+    """用 posix_fallocate 预先分配磁盘空间，平台或文件系统不支持时返回 False"""
+    if not hasattr(os, "posix_fallocate") or size <= 0:
+        return False
+    try:
+        os.posix_fallocate(fd, 0, size)
+        return True
+    except OSError as e:
+        if e.errno in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS):
+            return False
+        raise
+
+
+class ContentWriter:
+    """
+    按内容模式写入伪文件，每个线程应使用各自的实例
+    :param mode: zeros 全零; sparse 只用 truncate 设置大小，不写入数据;
+                 random 从 random.Random（Mersenne Twister）生成的随机数据池中按随机偏移截取，每次写入的块不可压缩;
+                 text 可压缩的英文文本
+    :param seed: 伪随机数种子，相同种子生成相同内容
+    :param chunk_size: 预分配缓冲区大小（random 模式为其 RANDOM_POOL_CHUNKS 倍），也是单次写入的字节数
+    :param fallocate: 写入前是否用 posix_fallocate 分配空间
+    """
+
+    def __init__(self, mode: str = CONTENT_TEXT, seed: Optional[int] = None,
+                 chunk_size: int = WRITE_CHUNK_SIZE, fallocate: bool = True) -> None:
+        if mode not in CONTENT_MODES:
+            raise ValueError(f"未知的内容模式: {mode}")
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.fallocate = fallocate
+        if mode == CONTENT_TEXT:
+            self._buffer = _text_block(chunk_size, self.rng)
+        elif mode == CONTENT_ZEROS:
+            self._buffer = bytearray(chunk_size)
+        elif mode == CONTENT_RANDOM:
+            # 随机数据只在创建时生成一次，写入时按文件种子选取偏移，大文件的每个块都不再分配内存
+            self._buffer = bytearray(self.rng.randbytes(chunk_size * RANDOM_POOL_CHUNKS))
+        else:
+            self._buffer = bytearray()
+
+    def _chunks(self, size: int):
+        view = memoryview(self._buffer)
+        remaining = size
+        while remaining > 0:
+            length = min(remaining, self.chunk_size)
+            if self.mode == CONTENT_RANDOM:
+                offset = self.rng.randrange(len(self._buffer) - length + 1)
+                yield view[offset:offset + length]
+            else:
+                yield view[:length]
+            remaining -= length
+
+    def write(self, path: str, size: int, seed: Optional[int] = None, algorithm: Optional[str] = None) -> str:
+        """
+        创建（或覆盖）文件并写入 size 字节
+        :param seed: 提供时以此重置随机数种子，使文件内容与写入顺序、所在线程无关
+        :param algorithm: 提供时在写入的同时计算内容哈希
+        :return: 内容哈希的十六进制字符串，未指定算法时为空字符串
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        hasher = hashlib.new(algorithm) if algorithm else None
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            if self.mode == CONTENT_SPARSE:
+                os.ftruncate(fd, size)
+                if hasher:
+                    zeros = memoryview(bytes(min(size, self.chunk_size)))
+                    for offset in range(0, size, self.chunk_size):
+                        hasher.update(zeros[:min(self.chunk_size, size - offset)])
+            else:
+                if self.fallocate:
+                    preallocate(fd, size)
+                for chunk in self._chunks(size):
+                    if hasher:
+                        hasher.update(chunk)
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        return hasher.hexdigest() if hasher else ""
+
+
+def file_seed(seed: int, index: int) -> int:
+    """数据集中第 index 个文件的内容种子"""
+    return (seed << 32) + index
+
+
+@dataclass
+class TreeShape:
+    """
+    目录树形状，depth 为 0 时所有文件直接放在根目录中
+    :param depth: 目录层数
+    :param fan_out: 每个目录的子目录数
+    :param files_per_leaf: 每个叶子目录最多放置的文件数，None 时把文件平均分到所有叶子目录
+    """
+    depth: int = 0
+    fan_out: int = 1
+    files_per_leaf: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.depth < 0 or self.fan_out < 1 or (self.files_per_leaf is not None and self.files_per_leaf < 1):
+            raise ValueError("目录树参数无效")
+
+    @property
+    def leaf_count(self) -> int:
+        return self.fan_out ** self.depth
+
+    def leaf_path(self, leaf: int) -> str:
+        """叶子目录编号对应的相对路径，如 d01/d00/d02"""
+        width = len(str(self.fan_out - 1))
+        parts = []
+        for _ in range(self.depth):
+            leaf, digit = divmod(leaf, self.fan_out)
+            parts.append(f"d{digit:0{width}d}")
+        return os.path.join(*reversed(parts)) if parts else ""
+
+    def leaf_of(self, index: int) -> int:
+        """第 index 个文件所在的叶子目录编号"""
+        if self.files_per_leaf:
+            return index // self.files_per_leaf
+        return index % self.leaf_count
+
+
+def plan_tree(names: Sequence[str], sizes: Sequence[int], shape: TreeShape,
+              roots: Sequence[str]) -> List[Tuple[str, int]]:
+    """
+    按目录树形状为文件分配路径，叶子目录按顶层目录轮流分布到各个根目录
+    :param names: 文件名
+    :param sizes: 与 names 一一对应的文件大小
+    :param roots: 目标根目录，可以位于不同的磁盘
+    :return: [(文件路径, 大小)]
+    :raises ValueError: 文件数超过目录树可容纳的数量时抛出
+    """
+    if shape.files_per_leaf and len(names) > shape.leaf_count * shape.files_per_leaf:
+        raise ValueError(f"目录树最多容纳 {shape.leaf_count * shape.files_per_leaf} 个文件，"
+                         f"请求创建 {len(names)} 个")
+    top_level = shape.fan_out ** max(shape.depth - 1, 0)
+    files = []
+    for index, (name, size) in enumerate(zip(names, sizes)):
+        leaf = shape.leaf_of(index)
+        # 没有子目录时按文件轮流分布到各个根目录
+        spread = leaf // top_level if shape.depth else index
+        root = roots[spread % len(roots)]
+        files.append((os.path.join(root, shape.leaf_path(leaf), name), size))
+    return files
+
+
+# 回调参数：(本批完成的文件数, 本批写入的字节数)
+ProgressCallback = Callable[[int, int], None]
+
+
+def create_files(files: Sequence[Tuple[str, int]], content: str = CONTENT_TEXT, seed: Optional[int] = None,
+                 workers: int = CREATE_WORKERS, on_progress: Optional[ProgressCallback] = None,
+                 errors: Optional[List[Tuple[str, str]]] = None, algorithm: Optional[str] = None,
+                 checksums: Optional[List[str]] = None) -> List[StageReport]:
+    """
+    先并行创建所有目录，再按批并行创建文件，每个线程使用各自的 ContentWriter
+    :param files: plan_tree 的结果
+    :param seed: 提供时第 i 个文件的内容只由 file_seed(seed, i) 决定，相同种子可逐字节重现
+    :param errors: 提供时收集 (路径, 错误信息)
+    :param algorithm: 提供时在写入的同时计算每个文件的哈希
+    :param checksums: 提供时按 files 的顺序填入哈希，失败的文件为空字符串
+    :return: [创建目录阶段, 创建文件阶段] 的统计
+    """
+    local = threading.local()
+    if checksums is not None:
+        checksums[:] = [""] * len(files)
+
+    def writer() -> ContentWriter:
+        if not hasattr(local, "writer"):
+            # 各线程使用相同的种子，文本模式的内容块因此一致
+            local.writer = ContentWriter(content, seed)
+        return local.writer
+
+    def make_dir(path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+
+    def create_batch(first: int) -> Tuple[int, int, List[Tuple[str, str]]]:
+        created = written = 0
+        failed = []
+        for index in range(first, min(first + CREATE_BATCH_SIZE, len(files))):
+            path, size = files[index]
+            try:
+                digest = writer().write(path, size, None if seed is None else file_seed(seed, index), algorithm)
+            except OSError as e:
+                failed.append((path, str(e)))
+                continue
+            if checksums is not None:
+                checksums[index] = digest
+            created += 1
+            written += size
+        return created, written, failed
+
+    directories = sorted({os.path.dirname(path) for path, _ in files})
+    dir_report = StageReport("mkdir", workers=workers)
+    file_report = StageReport("create", workers=workers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        start = time.perf_counter()
+        futures = {executor.submit(make_dir, d): d for d in directories}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                dir_report.files += 1
+            except OSError as e:
+                dir_report.failed += 1
+                if errors is not None:
+                    errors.append((futures[future], str(e)))
+        dir_report.seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batches = [executor.submit(create_batch, first) for first in range(0, len(files), CREATE_BATCH_SIZE)]
+        for future in as_completed(batches):
+            created, written, failed = future.result()
+            file_report.files += created
+            file_report.bytes += written
+            file_report.failed += len(failed)
+            if errors is not None:
+                errors.extend(failed)
+            if on_progress:
+                on_progress(created + len(failed), written)
+        file_report.seconds = time.perf_counter() - start
+    return [dir_report, file_report]
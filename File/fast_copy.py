@@ -0,0 +1,146 @@
+# fast_copy.py
+"""
+文件复制后端：依次尝试 FICLONE 写时复制（btrfs/xfs 等）、内核态复制（os.copy_file_range / os.sendfile），
+最后退回大缓冲区 readinto 复制；复制完成后与 shutil.copy2 一样保留权限与时间戳等元数据
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import sys
+import threading
+from typing import Callable, Dict, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+KERNEL_COPY_CHUNK = 1024 * 1024 * 1024  # 单次内核态复制的最大字节数
+
+STRATEGY_REFLINK = "reflink"
+STRATEGY_COPY_FILE_RANGE = "copy_file_range"
+STRATEGY_SENDFILE = "sendfile"
+STRATEGY_READINTO = "readinto"
+
+# 表示策略不适用于该平台或这对设备的错误码，只有这些错误才会换用下一种策略并记住；
+# 磁盘已满、读写错误等其他错误直接抛出，不影响后续文件继续使用快速策略
+UNSUPPORTED_ERRNOS = frozenset(getattr(errno, name) for name in
+                               ("EXDEV", "EINVAL", "EOPNOTSUPP", "ENOTSUP", "ENOSYS", "EBADF", "ENOTTY")
+                               if hasattr(errno, name))
+
+
+def _unsupported(message: str) -> OSError:
+    return OSError(errno.ENOTSUP, message)
+
+
+def _reflink(src_fd: int, dst_fd: int, size: int, buffer_size: int) -> None:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise _unsupported("当前平台不支持 FICLONE")
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int, buffer_size: int) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise _unsupported("当前平台不支持 copy_file_range")
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src_fd, dst_fd, min(KERNEL_COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+    if copied == 0 and size > 0:
+        # 部分文件系统（如 procfs、某些网络文件系统）返回 0 而不报错
+        raise _unsupported("copy_file_range 未复制任何数据")
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int, buffer_size: int) -> None:
+    if not sys.platform.startswith("linux"):
+        raise _unsupported("当前平台的 sendfile 不支持写入普通文件")
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(dst_fd, src_fd, copied, min(KERNEL_COPY_CHUNK, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+    if copied == 0 and size > 0:
+        raise _unsupported("sendfile 未复制任何数据")
+
+
+def _readinto(src_fd: int, dst_fd: int, size: int, buffer_size: int) -> None:
+    # 小文件不必分配完整的大缓冲区
+    buffer = bytearray(min(buffer_size, max(size, 64 * 1024)))
+    view = memoryview(buffer)
+    with open(src_fd, 'rb', buffering=0, closefd=False) as fsrc, \
+            open(dst_fd, 'wb', buffering=0, closefd=False) as fdst:
+        while True:
+            read_size = fsrc.readinto(buffer)
+            if not read_size:
+                break
+            fdst.write(view[:read_size])
+
+
+COPY_STRATEGIES: Dict[str, Callable[[int, int, int, int], None]] = {
+    STRATEGY_REFLINK: _reflink,
+    STRATEGY_COPY_FILE_RANGE: _copy_file_range,
+    STRATEGY_SENDFILE: _sendfile,
+    STRATEGY_READINTO: _readinto,
+}
+
+# 某对设备上已确认不支持的策略，后续文件不再尝试
+_failed_strategies: Set[Tuple[int, int, str]] = set()
+_failed_lock = threading.Lock()
+
+
+def copy_data(src: str, dst: str, strategy: str = "auto", buffer_size: int = COPY_BUFFER_SIZE) -> str:
+    """
+    复制文件内容（不含元数据）
+    :param src: 源文件
+    :param dst: 目标文件，已存在时会被截断覆盖
+    :param strategy: "auto" 按 reflink -> copy_file_range -> sendfile -> readinto 依次尝试，或指定单一策略
+    :param buffer_size: readinto 方式的缓冲区大小
+    :return: 实际使用的策略名
+    :raises ValueError: 策略名无效时抛出
+    :raises OSError: 复制失败且不是“策略不支持”类错误，或最后一种策略也失败时抛出
+    """
+    if strategy != "auto" and strategy not in COPY_STRATEGIES:
+        raise ValueError(f"未知的复制策略: {strategy}")
+    candidates = list(COPY_STRATEGIES) if strategy == "auto" else [strategy]
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        src_stat = os.fstat(src_fd)
+        devices = (src_stat.st_dev, os.fstat(dst_fd).st_dev)
+        for name in candidates:
+            key = devices + (name,)
+            if strategy == "auto" and name != STRATEGY_READINTO and key in _failed_strategies:
+                continue
+            try:
+                COPY_STRATEGIES[name](src_fd, dst_fd, src_stat.st_size, buffer_size)
+                return name
+            except OSError as e:
+                if name == candidates[-1] or e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                with _failed_lock:
+                    _failed_strategies.add(key)
+                # 失败的策略可能已写入部分数据，清空后再尝试下一种
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+    raise OSError(f"无法复制文件: {src}")
+
+
+def copy_file(src: str, dst: str, strategy: str = "auto", buffer_size: int = COPY_BUFFER_SIZE) -> str:
+    """
+    复制文件内容与元数据，行为与 shutil.copy2 一致
+    :return: 实际使用的策略名
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    used = copy_data(src, dst, strategy, buffer_size)
+    shutil.copystat(src, dst)
+    return used
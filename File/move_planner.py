@@ -0,0 +1,180 @@
+# move_planner.py
+"""
+文件移动规划：同一文件系统内的移动只是元数据操作，直接顺序 rename；
+跨设备移动才需要真正复制数据，交给线程池以大缓冲区并行复制后删除源文件，
+并发数默认按目标挂载点自适应调整（见 adaptive_workers）
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from adaptive_workers import make_controller, run_adaptive
+from dest_allocator import DestinationAllocator
+from fast_copy import copy_file
+from stage_report import StageReport
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024  # 跨设备复制的缓冲区大小
+
+# 回调参数：(源文件, 目标文件, 错误信息或 None)
+FileCallback = Callable[[str, str, Optional[str]], None]
+
+
+@dataclass
+class MoveTask:
+    """claimed 为 True 表示目标路径已由 DestinationAllocator 创建了占位文件"""
+    src: str
+    dest: str
+    size: int = 0
+    claimed: bool = False
+
+
+@dataclass
+class MovePlan:
+    """renames 为同设备移动，copies 为跨设备移动"""
+    renames: List[MoveTask] = field(default_factory=list)
+    copies: List[MoveTask] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def plan_moves(tasks: Iterable[Tuple[str, str]], allocator: Optional[DestinationAllocator] = None) -> MovePlan:
+    """
+    根据源文件与目标目录所在设备（st_dev）将移动任务分为 rename 与跨设备复制两类
+    :param tasks: [(源文件, 目标文件)]
+    :param allocator: 提供时由其为同名目标分配不冲突的路径
+    """
+    plan = MovePlan()
+    dest_devices: Dict[str, int] = {}
+    for src, dest in tasks:
+        try:
+            src_stat = os.stat(src)
+            dest_dir = os.path.dirname(dest) or os.curdir
+            if dest_dir not in dest_devices:
+                dest_devices[dest_dir] = os.stat(dest_dir).st_dev
+            claimed = False
+            # 创建占位文件时的权限不足、空间不足、文件名过长等错误只影响当前文件
+            if allocator is not None:
+                dest = allocator.allocate(dest, src)
+                claimed = allocator.is_claimed(dest)
+        except OSError as e:
+            plan.errors.append((src, str(e)))
+            continue
+        task = MoveTask(src, dest, src_stat.st_size, claimed)
+        if src_stat.st_dev == dest_devices[dest_dir]:
+            plan.renames.append(task)
+        else:
+            plan.copies.append(task)
+    return plan
+
+
+def discard_placeholder(task: MoveTask) -> None:
+    """任务失败时删除仍为空的占位文件"""
+    if task.claimed:
+        try:
+            if os.path.getsize(task.dest) == 0:
+                os.remove(task.dest)
+        except OSError:
+            pass
+
+
+def copy_and_unlink(src: str, dest: str, buffer_size: int = COPY_BUFFER_SIZE) -> str:
+    """
+    复制文件并保留元数据（内核态复制不可用时使用大缓冲区），成功后删除源文件；失败时删除不完整的目标文件
+    :return: fast_copy 实际使用的复制策略
+    """
+    try:
+        strategy = copy_file(src, dest, buffer_size=buffer_size)
+    except BaseException:
+        if os.path.exists(dest):
+            os.remove(dest)
+        raise
+    os.remove(src)
+    return strategy
+
+
+def run_rename_stage(tasks: List[MoveTask], on_file: Optional[FileCallback] = None) -> Tuple[StageReport, List[MoveTask]]:
+    """
+    顺序执行 rename
+    :return: (阶段统计, 因实际跨设备而需要改为复制的任务)
+    """
+    report = StageReport("rename")
+    fallback: List[MoveTask] = []
+    start = time.perf_counter()
+    for task in tasks:
+        try:
+            # 占位文件由本次计划独占创建，可以直接覆盖
+            if task.claimed:
+                os.replace(task.src, task.dest)
+            else:
+                os.rename(task.src, task.dest)
+        except OSError as e:
+            # 绑定挂载等情况下 st_dev 相同但仍无法 rename
+            if e.errno == errno.EXDEV:
+                fallback.append(task)
+                continue
+            discard_placeholder(task)
+            report.failed += 1
+            if on_file:
+                on_file(task.src, task.dest, str(e))
+            continue
+        report.files += 1
+        report.bytes += task.size
+        if on_file:
+            on_file(task.src, task.dest, None)
+    report.seconds = time.perf_counter() - start
+    return report, fallback
+
+
+def run_copy_stage(tasks: List[MoveTask], workers: Optional[int] = None, buffer_size: int = COPY_BUFFER_SIZE,
+                   on_file: Optional[FileCallback] = None) -> StageReport:
+    """
+    并行执行跨设备的复制并删除源文件
+    :param workers: 固定并发数，None 时按目标挂载点自适应调整
+    """
+    report = StageReport("copy")
+    start = time.perf_counter()
+    if tasks:
+        controller = make_controller(os.path.dirname(tasks[0].dest), workers)
+        results = run_adaptive(tasks, lambda t: copy_and_unlink(t.src, t.dest, buffer_size), controller,
+                               weight=lambda t, _: t.size)
+        for task, _, error in results:
+            if error:
+                discard_placeholder(task)
+                report.failed += 1
+                if on_file:
+                    on_file(task.src, task.dest, str(error))
+                continue
+            report.files += 1
+            report.bytes += task.size
+            if on_file:
+                on_file(task.src, task.dest, None)
+        report.workers = controller.limit
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def execute_plan(plan: MovePlan, workers: Optional[int] = None, buffer_size: int = COPY_BUFFER_SIZE,
+                 on_file: Optional[FileCallback] = None) -> List[StageReport]:
+    """
+    执行移动计划：先批量 rename，再并行复制跨设备文件
+    :return: 各阶段的吞吐统计
+    """
+    if on_file:
+        for src, error in plan.errors:
+            on_file(src, "", error)
+    rename_report, fallback = run_rename_stage(plan.renames, on_file)
+    copy_report = run_copy_stage(plan.copies + fallback, workers, buffer_size, on_file)
+    return [rename_report, copy_report]
+
+
+def move_tasks(tasks: Iterable[Tuple[str, str]], workers: Optional[int] = None, buffer_size: int = COPY_BUFFER_SIZE,
+               on_file: Optional[FileCallback] = None,
+               allocator: Optional[DestinationAllocator] = None) -> List[StageReport]:
+    """规划并执行一批移动任务，默认为同名目标自动追加 _1、_2 后缀"""
+    if allocator is None:
+        allocator = DestinationAllocator()
+    return execute_plan(plan_moves(tasks, allocator), workers, buffer_size, on_file)
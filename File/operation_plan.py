@@ -0,0 +1,473 @@
+# operation_plan.py
+"""
+操作计划：先用 os.scandir 遍历一次目录树生成计划（创建目录、移动、复制、重命名），
+可保存为 JSON 供人工检查，再并行执行；执行时写入撤销日志，任何已执行的计划都可以撤销
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from adaptive_workers import make_controller, run_adaptive
+from backup_engine import copy_file
+from dest_allocator import DestinationAllocator
+from folder_walker import FileFilter, list_subdirs, walk_files
+from move_planner import COPY_BUFFER_SIZE, move_tasks
+from stage_report import StageReport
+
+OP_MKDIR = "mkdir"
+OP_MOVE = "move"
+OP_COPY = "copy"
+OP_RENAME = "rename"
+OPS = (OP_MKDIR, OP_MOVE, OP_COPY, OP_RENAME)
+
+SPLIT_BY_COUNT = "count"
+SPLIT_BY_BYTES = "bytes"
+
+PLAN_VERSION = 1
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".openpreptools", "journals")
+
+# 回调参数：(操作, 错误信息或 None)
+OperationCallback = Callable[["Operation", Optional[str]], None]
+
+
+@dataclass
+class Operation:
+    """
+    :param backup: 复制覆盖了目标中的旧文件时，旧文件改名后的隐藏备份路径（与目标位于同一目录）
+    """
+    op: str
+    src: str
+    dest: str
+    size: int = 0
+    backup: str = ""
+
+
+@dataclass
+class OperationPlan:
+    """一组待执行的操作，description 用于在预览与日志中说明计划来源"""
+    description: str = ""
+    operations: List[Operation] = field(default_factory=list)
+
+    def add(self, op: str, src: str, dest: str, size: int = 0) -> None:
+        self.operations.append(Operation(op, src, dest, size))
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(o.size for o in self.operations if o.op in (OP_MOVE, OP_COPY))
+
+    @property
+    def total_files(self) -> int:
+        return sum(1 for o in self.operations if o.op in (OP_MOVE, OP_COPY))
+
+    def counts(self) -> dict:
+        result = {OP_MKDIR: 0, OP_MOVE: 0, OP_COPY: 0, OP_RENAME: 0}
+        for operation in self.operations:
+            result[operation.op] += 1
+        return result
+
+    def summary(self) -> str:
+        counts = self.counts()
+        return (f"{self.description}: 创建目录 {counts[OP_MKDIR]} 个, 移动 {counts[OP_MOVE]} 个, "
+                f"复制 {counts[OP_COPY]} 个, 重命名 {counts[OP_RENAME]} 个, "
+                f"共 {self.total_files} 个文件 {self.total_bytes / 1024 ** 2:.1f} MB")
+
+    def save(self, plan_path: str) -> None:
+        data = {
+            "version": PLAN_VERSION,
+            "description": self.description,
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "operations": [asdict(o) for o in self.operations],
+        }
+        with open(plan_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, plan_path: str) -> "OperationPlan":
+        """:raises ValueError: 计划版本不受支持或包含未知的操作类型时抛出"""
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"不支持的计划版本: {data.get('version')}")
+        for o in data["operations"]:
+            if o.get("op") not in OPS:
+                raise ValueError(f"计划中包含未知的操作类型: {o.get('op')}")
+        return cls(data.get("description", ""), [Operation(**o) for o in data["operations"]])
+
+
+# ---------------------------------------------------------------------------
+# 生成计划
+# ---------------------------------------------------------------------------
+
+def _entry_size(entry: os.DirEntry) -> int:
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return 0
+
+
+def _plan_gather(plan: OperationPlan, entries, dest_dir: str) -> OperationPlan:
+    allocator = DestinationAllocator(claim=False)
+    if not os.path.isdir(dest_dir):
+        plan.add(OP_MKDIR, "", dest_dir)
+    for entry in entries:
+        dest = allocator.allocate(os.path.join(dest_dir, entry.name), entry.path)
+        plan.add(OP_MOVE, entry.path, dest, _entry_size(entry))
+    return plan
+
+
+def plan_move_files(src_dir: str, dest_dir: str, file_filter: Optional[FileFilter] = None,
+                    walk_workers: int = 1) -> OperationPlan:
+    """将源文件夹（含子文件夹）中的所有文件移动到目标文件夹，同名文件追加 _1、_2 后缀"""
+    src_dir, dest_dir = os.path.abspath(src_dir), os.path.abspath(dest_dir)
+    entries = walk_files(src_dir, file_filter=file_filter, workers=walk_workers)
+    return _plan_gather(OperationPlan(f"移动 {src_dir} 中的文件到 {dest_dir}"), entries, dest_dir)
+
+
+def plan_flatten(parent_dir: str, file_filter: Optional[FileFilter] = None, walk_workers: int = 1) -> OperationPlan:
+    """将子文件夹内的文件移动到父文件夹"""
+    parent_dir = os.path.abspath(parent_dir)
+    plan = OperationPlan(f"将 {parent_dir} 子文件夹内的文件移动到父文件夹")
+    entries = (entry for folder in list_subdirs(parent_dir)
+               for entry in walk_files(folder.path, file_filter=file_filter, workers=walk_workers))
+    return _plan_gather(plan, entries, parent_dir)
+
+
+def _split_units(entries: List[os.DirEntry], group_by_stem: bool) -> List[Tuple[int, List[os.DirEntry]]]:
+    """
+    将文件划分为不可拆分的单元
+    :param group_by_stem: 为 True 时同名不同扩展名的文件（如 a.jpg 与 a.xml）组成一个单元
+    :return: [(单元总字节数, 单元内的文件)]，按首个文件名排序
+    """
+    groups: Dict[str, List[os.DirEntry]] = {}
+    for entry in sorted(entries, key=lambda e: e.name):
+        key = os.path.splitext(entry.name)[0] if group_by_stem else entry.name
+        groups.setdefault(key, []).append(entry)
+    return [(sum(_entry_size(e) for e in members), members) for members in groups.values()]
+
+
+def _assign_by_count(units: List[Tuple[int, List[os.DirEntry]]], bin_count: int) -> List[List[int]]:
+    """按单元数量连续均分，与原先的 divmod 分配一致"""
+    per_bin, remainder = divmod(len(units), bin_count)
+    bins, index = [], 0
+    for i in range(bin_count):
+        size = per_bin + (1 if i < remainder else 0)
+        bins.append(list(range(index, index + size)))
+        index += size
+    return bins
+
+
+def _assign_by_bytes(units: List[Tuple[int, List[os.DirEntry]]], bin_count: int) -> List[List[int]]:
+    """从大到小依次放入当前总字节数最小的子文件夹（LPT 贪心），用最小堆维护各子文件夹的负载"""
+    heap = [(0, i) for i in range(bin_count)]
+    bins: List[List[int]] = [[] for _ in range(bin_count)]
+    for index in sorted(range(len(units)), key=lambda i: units[i][0], reverse=True):
+        load, target = heapq.heappop(heap)
+        bins[target].append(index)
+        heapq.heappush(heap, (load + units[index][0], target))
+    return bins
+
+
+def _assign_with_cap(units: List[Tuple[int, List[os.DirEntry]]], bin_count: int, max_bytes: int) -> List[List[int]]:
+    """
+    从大到小依次放入剩余空间最小且仍能容纳的子文件夹（最佳适应递减），放不下时新建子文件夹
+    单个单元超过上限时独占一个子文件夹
+    """
+    loads = [0] * bin_count
+    bins: List[List[int]] = [[] for _ in range(bin_count)]
+    for index in sorted(range(len(units)), key=lambda i: units[i][0], reverse=True):
+        size = units[index][0]
+        # 超过上限的单元放入尚为空的子文件夹
+        fits = [i for i, load in enumerate(loads) if load + size <= max_bytes or not bins[i]]
+        if fits:
+            target = max(fits, key=lambda i: loads[i])
+        else:
+            loads.append(0)
+            bins.append([])
+            target = len(bins) - 1
+        bins[target].append(index)
+        loads[target] += size
+    return bins
+
+
+SPLIT_STRATEGIES = {
+    SPLIT_BY_COUNT: _assign_by_count,
+    SPLIT_BY_BYTES: _assign_by_bytes,
+}
+SPLIT_LABELS = {SPLIT_BY_COUNT: "数量", SPLIT_BY_BYTES: "字节数"}
+
+
+def plan_split(folder_path: str, subfolder_count: int, file_filter: Optional[FileFilter] = None,
+               strategy: str = SPLIT_BY_COUNT, max_bytes: Optional[int] = None,
+               group_by_stem: bool = False) -> OperationPlan:
+    """
+    将文件夹中的文件分配到 1..N 号子文件夹
+    :param subfolder_count: 子文件夹数量；指定 max_bytes 时为最少数量，不够放时自动追加
+    :param strategy: "count" 按文件数量均分，"bytes" 按字节数均衡（大文件优先放入最空的子文件夹）
+    :param max_bytes: 每个子文件夹的字节数上限，适用于按光盘或上传限额分卷
+    :param group_by_stem: 同名不同扩展名的文件（如图片与 XML 标注）放入同一个子文件夹
+    :raises ValueError: 策略名无效或数量、上限不是正数时抛出
+    """
+    if strategy not in SPLIT_STRATEGIES:
+        raise ValueError(f"未知的分配策略: {strategy}")
+    if subfolder_count < 1 or (max_bytes is not None and max_bytes < 1):
+        raise ValueError("子文件夹数量与字节数上限必须为正数")
+    folder_path = os.path.abspath(folder_path)
+    units = _split_units(list(walk_files(folder_path, recursive=False, file_filter=file_filter)), group_by_stem)
+    if max_bytes is not None:
+        bins = _assign_with_cap(units, subfolder_count, max_bytes)
+        description = f"将 {folder_path} 中的文件按每个子文件夹不超过 {max_bytes / 1024 ** 2:.1f} MB 分配"
+    else:
+        bins = SPLIT_STRATEGIES[strategy](units, subfolder_count)
+        description = f"将 {folder_path} 中的文件平均分配到 {subfolder_count} 个子文件夹（按{SPLIT_LABELS[strategy]}）"
+
+    plan = OperationPlan(description)
+    for i, unit_indexes in enumerate(bins):
+        subfolder_path = os.path.join(folder_path, f"{i + 1}")
+        if not os.path.isdir(subfolder_path):
+            plan.add(OP_MKDIR, "", subfolder_path)
+        members = sorted((e for index in unit_indexes for e in units[index][1]), key=lambda e: e.name)
+        for entry in members:
+            plan.add(OP_MOVE, entry.path, os.path.join(subfolder_path, entry.name), _entry_size(entry))
+    return plan
+
+
+def plan_rename_folders(base_dir: str, start_number: int) -> OperationPlan:
+    """将文件夹按名称排序后依次重命名为三位编号"""
+    base_dir = os.path.abspath(base_dir)
+    plan = OperationPlan(f"重命名 {base_dir} 中的文件夹（从 {start_number:03d} 开始）")
+    folders = [entry.name for entry in list_subdirs(base_dir)]
+    for offset, folder_name in enumerate(folders):
+        new_name = f"{start_number + offset:03d}"
+        if new_name != folder_name:
+            plan.add(OP_RENAME, os.path.join(base_dir, folder_name), os.path.join(base_dir, new_name))
+    return plan
+
+
+def plan_backup(src_dir: str, dest_dir: str, file_filter: Optional[FileFilter] = None,
+                walk_workers: int = 1) -> OperationPlan:
+    """保留目录结构复制文件，跳过目标中大小与修改时间一致的文件"""
+    src_dir, dest_dir = os.path.abspath(src_dir), os.path.abspath(dest_dir)
+    plan = OperationPlan(f"备份 {src_dir} 到 {dest_dir}")
+    planned_dirs = set()
+    for entry in walk_files(src_dir, file_filter=file_filter, workers=walk_workers):
+        src_stat = entry.stat()
+        dest = os.path.join(dest_dir, os.path.relpath(entry.path, src_dir))
+        try:
+            dest_stat = os.stat(dest)
+            if dest_stat.st_size == src_stat.st_size and int(dest_stat.st_mtime) == int(src_stat.st_mtime):
+                continue
+        except OSError:
+            pass
+        dest_parent = os.path.dirname(dest)
+        if dest_parent not in planned_dirs and not os.path.isdir(dest_parent):
+            plan.add(OP_MKDIR, "", dest_parent)
+        planned_dirs.add(dest_parent)
+        plan.add(OP_COPY, entry.path, dest, src_stat.st_size)
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# 执行与撤销
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ExecutionResult:
+    """计划执行结果，stages 为移动与复制各阶段的吞吐统计"""
+    journal_path: str
+    succeeded: int = 0
+    failed: int = 0
+    stages: List[StageReport] = field(default_factory=list)
+
+
+class UndoJournal:
+    """
+    以 JSON Lines 记录每个已完成的操作（含实际目标路径），用于撤销；
+    复制覆盖的旧文件在原目录内改名为隐藏的备份文件，撤销时放回原处。
+    备份始终留在目标所在的文件系统上，只是一次 rename，不会把数据复制到日志所在的磁盘
+    """
+
+    def __init__(self, journal_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        self.path = journal_path
+        self._file = open(journal_path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._backup_ids = itertools.count(1)
+        self._backup_tag = os.path.splitext(os.path.basename(journal_path))[0]
+
+    def backup(self, path: str) -> str:
+        """把将被覆盖的文件改名为同目录下唯一的隐藏文件 .<文件名>.<日志名>_<序号>.undo，返回其新路径"""
+        directory, name = os.path.split(path)
+        while True:
+            with self._lock:
+                backup_id = next(self._backup_ids)
+            backup_path = os.path.join(directory, f".{name}.{self._backup_tag}_{backup_id}.undo")
+            if not os.path.lexists(backup_path):
+                break
+        os.rename(path, backup_path)
+        return backup_path
+
+    def record(self, operation: Operation) -> None:
+        line = json.dumps(asdict(operation), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def default_journal_path() -> str:
+    return os.path.join(JOURNAL_DIR, f"undo_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+
+def _copy_one(operation: Operation, journal: UndoJournal, buffer_size: int) -> Operation:
+    # 复制操作来自备份计划，目标中的旧副本先就地改名备份以便撤销，复制失败时放回
+    if os.path.lexists(operation.dest):
+        operation.backup = journal.backup(operation.dest)
+    try:
+        copy_file(operation.src, operation.dest, buffer_size)
+    except BaseException:
+        if operation.backup:
+            os.replace(operation.backup, operation.dest)
+            operation.backup = ""
+        raise
+    return operation
+
+
+def execute_plan(plan: OperationPlan, journal_path: Optional[str] = None, workers: Optional[int] = None,
+                 on_operation: Optional[OperationCallback] = None,
+                 buffer_size: int = COPY_BUFFER_SIZE) -> ExecutionResult:
+    """
+    执行计划：依次创建目录、重命名，再执行移动（同设备 rename、跨设备并行复制）与并行复制
+    移动时已存在的目标不会被覆盖，而是追加 _1、_2 后缀，实际路径写入撤销日志；
+    复制会替换目标中的旧副本，旧副本就地改名为隐藏文件并记入撤销日志
+    :param journal_path: 撤销日志路径，默认写入 ~/.openpreptools/journals
+    :param workers: 跨设备移动与复制的固定并发数，None 时按目标挂载点自适应调整
+    :param buffer_size: 无法使用内核态复制时的缓冲区大小
+    """
+    result = ExecutionResult(journal_path or default_journal_path())
+    journal = UndoJournal(result.journal_path)
+    lock = threading.Lock()
+
+    def _done(operation: Operation, error: Optional[str]) -> None:
+        with lock:
+            if error:
+                result.failed += 1
+            else:
+                result.succeeded += 1
+                journal.record(operation)
+        if on_operation:
+            on_operation(operation, error)
+
+    try:
+        by_op = {OP_MKDIR: [], OP_RENAME: [], OP_MOVE: [], OP_COPY: []}
+        for operation in plan.operations:
+            by_op[operation.op].append(operation)
+
+        for operation in by_op[OP_MKDIR]:
+            if os.path.isdir(operation.dest):
+                continue
+            try:
+                os.makedirs(operation.dest)
+                _done(operation, None)
+            except OSError as e:
+                _done(operation, str(e))
+
+        for operation in by_op[OP_RENAME]:
+            try:
+                if os.path.exists(operation.dest):
+                    raise FileExistsError(f"目标已存在: {operation.dest}")
+                os.rename(operation.src, operation.dest)
+                _done(operation, None)
+            except OSError as e:
+                _done(operation, str(e))
+
+        sizes = {o.src: o.size for o in by_op[OP_MOVE]}
+        if by_op[OP_MOVE]:
+            result.stages = move_tasks(
+                [(o.src, o.dest) for o in by_op[OP_MOVE]], workers, buffer_size,
+                on_file=lambda src, dest, error: _done(Operation(OP_MOVE, src, dest, sizes.get(src, 0)), error))
+
+        copy_report = StageReport("copy")
+        start = time.perf_counter()
+        if by_op[OP_COPY]:
+            controller = make_controller(by_op[OP_COPY][0].dest, workers)
+            results = run_adaptive(by_op[OP_COPY], lambda o: _copy_one(o, journal, buffer_size), controller,
+                                   weight=lambda o, _: o.size)
+            for operation, _, error in results:
+                if error:
+                    copy_report.failed += 1
+                    _done(operation, str(error))
+                    continue
+                _done(operation, None)
+                copy_report.files += 1
+                copy_report.bytes += operation.size
+            copy_report.workers = controller.limit
+        if by_op[OP_COPY]:
+            copy_report.seconds = time.perf_counter() - start
+            result.stages.append(copy_report)
+    finally:
+        journal.close()
+    return result
+
+
+def undo_journal(journal_path: str, on_operation: Optional[OperationCallback] = None) -> Tuple[int, int]:
+    """
+    按相反顺序撤销日志中记录的操作：移动与重命名移回原处，复制删除副本并放回被覆盖的旧文件，
+    创建的目录在为空时删除。全部成功时日志改名为 .undone；有失败时日志只保留未能撤销的操作，
+    处理原因后可以再次撤销
+    :return: (成功数, 失败数)
+    """
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        operations = []
+        for line in f:
+            try:
+                operation = Operation(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            if operation.op in OPS:
+                operations.append(operation)
+
+    succeeded = failed = 0
+    remaining: List[Operation] = []
+    for operation in reversed(operations):
+        try:
+            if operation.op in (OP_MOVE, OP_RENAME):
+                if os.path.exists(operation.src):
+                    raise FileExistsError(f"原位置已存在: {operation.src}")
+                os.makedirs(os.path.dirname(operation.src), exist_ok=True)
+                shutil.move(operation.dest, operation.src)
+            elif operation.op == OP_COPY:
+                if os.path.lexists(operation.dest):
+                    os.remove(operation.dest)
+                if operation.backup:
+                    os.replace(operation.backup, operation.dest)
+            elif operation.op == OP_MKDIR:
+                os.rmdir(operation.dest)
+            succeeded += 1
+            error = None
+        except OSError as e:
+            failed += 1
+            remaining.append(operation)
+            error = str(e)
+        if on_operation:
+            on_operation(operation, error)
+    if remaining:
+        temp_path = journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for operation in reversed(remaining):
+                f.write(json.dumps(asdict(operation), ensure_ascii=False) + "\n")
+        os.replace(temp_path, journal_path)
+    else:
+        os.rename(journal_path, journal_path + ".undone")
+    return succeeded, failed
@@ -0,0 +1,213 @@
+# organizer_cli.py
+"""
+文件夹综合整理工具的命令行版本，可用于定时任务或批量处理大量目录
+进度以 JSON Lines 事件输出到标准输出，每行一个事件，包含文件/秒与 MB/秒
+
+用法:
+    python organizer_cli.py move /data/in /data/out --workers 16 --buffer-size 16M
+    python organizer_cli.py backup /data /mnt/backup/today --link-dest /mnt/backup/yesterday
+    python organizer_cli.py flatten /data/parent --ext jpg,xml
+    python organizer_cli.py split /data/images 8 --strategy bytes --group-stems
+    python organizer_cli.py rename /data/folders --start 100 --dry-run
+
+事件: start（计划规模）、file（--verbose 时逐个文件）、progress（按 --interval 限频）、stage（各阶段吞吐）、done
+退出码: 0 全部成功; 1 部分文件失败; 2 参数或读写错误; 130 被中断
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Optional, TextIO
+
+from backup_engine import BackupEngine
+from folder_walker import FileFilter, parse_extensions
+from move_planner import COPY_BUFFER_SIZE
+from operation_plan import (OP_COPY, OP_MOVE, SPLIT_BY_BYTES, SPLIT_BY_COUNT, OperationPlan, execute_plan,
+                            plan_flatten, plan_move_files, plan_rename_folders, plan_split)
+
+# 大小解析与事件输出位于 Other/，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from event_stream import EventStream
+from size_units import parse_size
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+class ProgressEmitter(EventStream):
+    """
+    整理操作的进度事件，progress 事件按时间间隔限频，避免大量小文件时刷屏
+    :param stream: 输出流
+    :param interval: 两次 progress 事件的最小间隔（秒）
+    :param verbose: 是否为每个文件输出 file 事件
+    """
+
+    def __init__(self, stream: TextIO, interval: float = 1.0, verbose: bool = False) -> None:
+        super().__init__(stream, interval)
+        self.verbose = verbose
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.total_files: Optional[int] = None
+        self.total_bytes: Optional[int] = None
+
+    def start(self, command: str, total_files: Optional[int] = None, total_bytes: Optional[int] = None,
+              **fields) -> None:
+        self.total_files, self.total_bytes = total_files, total_bytes
+        super().start(command, total_files=total_files, total_bytes=total_bytes, **fields)
+
+    def rates(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "failed": self.failed,
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "elapsed": round(elapsed, 3),
+            "files_per_sec": round(self.files / elapsed, 2) if elapsed else 0.0,
+            "mb_per_sec": round(self.bytes / 1024 ** 2 / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def advance(self, files: int = 1, size: int = 0, error: Optional[str] = None, **fields) -> None:
+        """记录一个已处理的文件，到达间隔时输出 progress 事件"""
+        with self._lock:
+            if error:
+                self.failed += files
+            else:
+                self.files += files
+                self.bytes += size
+            due = self._due()
+        if self.verbose or error:
+            self.emit("file", error=error, size=size, **fields)
+        if due:
+            self.emit("progress", **self.rates())
+
+
+def build_filter(args) -> Optional[FileFilter]:
+    extensions = parse_extensions(args.ext) if args.ext else None
+    if not extensions and args.min_size is None and args.max_size is None:
+        return None
+    return FileFilter(extensions=extensions,
+                      min_size=parse_size(args.min_size) if args.min_size else None,
+                      max_size=parse_size(args.max_size) if args.max_size else None)
+
+
+def build_plan(args) -> OperationPlan:
+    file_filter = build_filter(args)
+    if args.command == "move":
+        return plan_move_files(args.src, args.dest, file_filter, args.walk_workers)
+    if args.command == "flatten":
+        return plan_flatten(args.parent, file_filter, args.walk_workers)
+    if args.command == "split":
+        max_bytes = parse_size(args.max_size_per_folder) if args.max_size_per_folder else None
+        return plan_split(args.folder, args.count, file_filter, args.strategy, max_bytes, args.group_stems)
+    return plan_rename_folders(args.base_dir, args.start)
+
+
+def run_plan_command(args, emitter: ProgressEmitter) -> int:
+    plan = build_plan(args)
+    if args.save_plan:
+        plan.save(args.save_plan)
+    emitter.start(args.command, plan.total_files, plan.total_bytes, description=plan.description,
+                  operations=len(plan.operations), dry_run=args.dry_run)
+    if args.dry_run:
+        emitter.done(succeeded=0, dry_run=True)
+        return EXIT_OK
+
+    def on_operation(operation, error):
+        # 创建目录与重命名文件夹不计入文件数，使进度与计划的 total_files 对应
+        files = 1 if operation.op in (OP_MOVE, OP_COPY) else 0
+        emitter.advance(files, operation.size, error, op=operation.op, src=operation.src, dest=operation.dest)
+
+    result = execute_plan(plan, args.journal, args.workers, on_operation, args.buffer_size)
+    for report in result.stages:
+        emitter.emit("stage", name=report.name, files=report.files, bytes=report.bytes,
+                     seconds=round(report.seconds, 3), failed=report.failed, workers=report.workers,
+                     files_per_sec=round(report.files_per_second, 2), mb_per_sec=round(report.mb_per_second, 2))
+    emitter.done(succeeded=result.succeeded, journal=result.journal_path)
+    return EXIT_FAILED if result.failed else EXIT_OK
+
+
+def run_backup_command(args, emitter: ProgressEmitter) -> int:
+    emitter.start("backup", src=args.src, dest=args.dest, link_dest=args.link_dest, dry_run=False)
+
+    def on_file(rel_path, action, error, strategy, size):
+        emitter.advance(1, size, error, path=rel_path, action=action, strategy=strategy)
+
+    report = BackupEngine(args.src, args.dest, args.link_dest, args.workers, on_file, build_filter(args),
+                          args.walk_workers, args.buffer_size).run()
+    emitter.done(copied=report.files_copied, linked=report.files_linked, skipped=report.files_skipped,
+                 bytes_copied=report.bytes_copied)
+    return EXIT_FAILED if report.files_failed else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="文件夹综合整理工具命令行版本（JSON Lines 进度输出）")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", "-w", type=int, default=None,
+                        help="固定的并发复制线程数，默认按目标挂载点自适应调整")
+    common.add_argument("--buffer-size", type=parse_size, default=COPY_BUFFER_SIZE,
+                        help="无法使用内核态复制时的缓冲区大小，支持 K/M/G 后缀")
+    common.add_argument("--walk-workers", type=int, default=1, help="并行遍历目录的线程数")
+    common.add_argument("--ext", default=None, help="仅处理这些扩展名的文件，逗号分隔")
+    common.add_argument("--min-size", default=None, help="仅处理不小于该大小的文件")
+    common.add_argument("--max-size", default=None, help="仅处理不大于该大小的文件")
+    common.add_argument("--interval", type=float, default=1.0, help="progress 事件的最小间隔（秒）")
+    common.add_argument("--verbose", "-v", action="store_true", help="为每个文件输出 file 事件")
+    planned = argparse.ArgumentParser(add_help=False)
+    planned.add_argument("--dry-run", action="store_true", help="只生成计划并输出规模，不执行")
+    planned.add_argument("--save-plan", default=None, help="将操作计划保存为 JSON")
+    planned.add_argument("--journal", default=None, help="撤销日志路径，默认写入 ~/.openpreptools/journals")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    move = subparsers.add_parser("move", parents=[common, planned], help="移动源文件夹（含子文件夹）中的所有文件")
+    move.add_argument("src", help="源文件夹")
+    move.add_argument("dest", help="目标文件夹")
+    move.set_defaults(func=run_plan_command)
+
+    backup = subparsers.add_parser("backup", parents=[common], help="增量备份，保留目录结构")
+    backup.add_argument("src", help="源文件夹")
+    backup.add_argument("dest", help="备份目录")
+    backup.add_argument("--link-dest", default=None, help="上一次快照目录，未变化的文件创建硬链接")
+    backup.set_defaults(func=run_backup_command)
+
+    flatten = subparsers.add_parser("flatten", parents=[common, planned], help="将子文件夹内的文件移动到父文件夹")
+    flatten.add_argument("parent", help="父文件夹")
+    flatten.set_defaults(func=run_plan_command)
+
+    split = subparsers.add_parser("split", parents=[common, planned], help="将文件分配到 1..N 号子文件夹")
+    split.add_argument("folder", help="需要分配的文件夹")
+    split.add_argument("count", type=int, help="子文件夹数量（指定容量上限时为最少数量）")
+    split.add_argument("--strategy", choices=[SPLIT_BY_COUNT, SPLIT_BY_BYTES], default=SPLIT_BY_COUNT,
+                       help="按文件数量或按字节数均衡")
+    split.add_argument("--max-size-per-folder", default=None, help="每个子文件夹的容量上限，支持 K/M/G 后缀")
+    split.add_argument("--group-stems", action="store_true", help="同名不同扩展名的文件放在同一子文件夹")
+    split.set_defaults(func=run_plan_command)
+
+    rename = subparsers.add_parser("rename", parents=[common, planned], help="将文件夹按名称排序后重命名为三位编号")
+    rename.add_argument("base_dir", help="文件夹所在的基本路径")
+    rename.add_argument("--start", type=int, default=100, help="编号起始数字")
+    rename.set_defaults(func=run_plan_command)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    emitter = ProgressEmitter(sys.stdout, args.interval, args.verbose)
+    try:
+        return args.func(args, emitter)
+    except KeyboardInterrupt:
+        emitter.emit("interrupted", **emitter.rates())
+        return EXIT_INTERRUPTED
+    except (OSError, ValueError) as e:
+        emitter.emit("error", error=str(e))
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+# stage_report.py
+"""
+分阶段操作的吞吐统计，整理工具（移动、复制）与伪文件生成（创建目录、创建文件）共用
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass
+class StageReport:
+    """单个阶段的吞吐统计"""
+    name: str
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    failed: int = 0
+    workers: int = 0  # 阶段结束时的并发数，顺序执行的阶段为 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1024 ** 2 / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.name}: {self.files} 个文件, {self.bytes / 1024 ** 2:.1f} MB, {self.seconds:.2f} 秒, "
+                f"{self.files_per_second:.1f} 文件/秒, {self.mb_per_second:.1f} MB/秒, 失败 {self.failed} 个"
+                + (f", 并发 {self.workers}" if self.workers else ""))
@@ -0,0 +1,122 @@
+# unique_names.py
+"""
+不重复的随机文件名：把 "由给定字符组成、长度 1..max_length 的所有名称" 编号为 0..N-1，
+再用由种子确定的 Feistel 置换把 0, 1, 2 ... 打乱后映射回名称。
+置换是双射，因此名称天然不重复，每个名称的生成耗时固定，不会因名称空间快被占满而反复重试；
+相同的种子总是得到相同的名称序列
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Iterator, List, Tuple
+
+FEISTEL_ROUNDS = 4
+MASK64 = (1 << 64) - 1
+
+
+class NameSpace:
+    """
+    由 alphabet 中的字符组成、长度在 [min_length, max_length] 的全部名称，按长度再按字典序编号
+    :raises ValueError: 字符集为空或长度范围无效时抛出
+    """
+
+    def __init__(self, alphabet: str, max_length: int, min_length: int = 1) -> None:
+        self.alphabet = "".join(dict.fromkeys(alphabet))  # 去掉重复字符，否则不同编号会得到相同名称
+        if not self.alphabet or min_length < 1 or max_length < min_length:
+            raise ValueError("名称字符集为空或长度范围无效")
+        self.max_length = max_length
+        base = len(self.alphabet)
+        self._buckets: List[Tuple[int, int]] = []  # (长度, 该长度第一个名称的编号)
+        self.size = 0
+        for length in range(min_length, max_length + 1):
+            self._buckets.append((length, self.size))
+            self.size += base ** length
+
+    def name(self, index: int) -> str:
+        if not 0 <= index < self.size:
+            raise IndexError(f"名称编号超出范围: {index}")
+        for length, start in reversed(self._buckets):
+            if index >= start:
+                break
+        value = index - start
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(length):
+            value, digit = divmod(value, base)
+            chars.append(self.alphabet[digit])
+        return "".join(reversed(chars))
+
+
+class IndexPermutation:
+    """
+    [0, size) 上由种子确定的置换：在不小于 size 的 2 的偶数次幂范围内做 Feistel 变换，
+    结果超出 size 时继续变换（cycle walking），平均不超过 4 次
+    """
+
+    def __init__(self, size: int, seed: int) -> None:
+        if size < 1:
+            raise ValueError("置换范围必须为正数")
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        self._byte_length = (self._half + 7) // 8
+        self._digest_size = min(max(self._byte_length, 8), 64)
+        self._keys = [hashlib.blake2b(f"{seed}:{r}".encode(), digest_size=16).digest()
+                      for r in range(FEISTEL_ROUNDS)]
+        # 半块不超过 64 位时用整数混合函数代替 blake2b，速度快数倍
+        self._int_keys = [int.from_bytes(key[:8], "little") for key in self._keys]
+        self._round = self._mix_round if self._half <= 64 else self._hash_round
+
+    def _mix_round(self, value: int, r: int) -> int:
+        # splitmix64 的终结函数
+        value = ((value ^ self._int_keys[r]) * 0x9E3779B97F4A7C15) & MASK64
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+        return (value ^ (value >> 31)) & self._mask
+
+    def _hash_round(self, value: int, r: int) -> int:
+        digest = hashlib.blake2b(value.to_bytes(self._byte_length, "little"), digest_size=self._digest_size,
+                                 key=self._keys[r]).digest()
+        return int.from_bytes(digest, "little") & self._mask
+
+    def __call__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(f"编号超出范围: {index}")
+        value = index
+        while True:
+            left, right = value >> self._half, value & self._mask
+            for r in range(FEISTEL_ROUNDS):
+                left, right = right, left ^ self._round(right, r)
+            value = (left << self._half) | right
+            if value < self.size:
+                return value
+
+
+class UniqueNameGenerator:
+    """
+    :param alphabet: 名称使用的字符
+    :param max_length: 名称最大长度
+    :param seed: 种子，相同的种子与参数生成相同的名称序列
+    """
+
+    def __init__(self, alphabet: str, max_length: int, seed: int = 0) -> None:
+        self.space = NameSpace(alphabet, max_length)
+        self.seed = seed
+        self._permutation = IndexPermutation(self.space.size, seed)
+
+    def name(self, index: int) -> str:
+        """第 index 个名称"""
+        return self.space.name(self._permutation(index))
+
+    def names(self, count: int) -> Iterator[str]:
+        """
+        依次生成 count 个不重复的名称
+        :raises ValueError: count 超过名称空间大小时在生成前抛出
+        """
+        if count > self.space.size:
+            raise ValueError(f"字符 \"{self.space.alphabet}\" 组成的长度不超过 {self.space.max_length} 的名称"
+                             f"只有 {self.space.size} 个，无法生成 {count} 个不重复的名称")
+        return (self.name(index) for index in range(count))
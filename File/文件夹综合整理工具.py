@@ -1,18 +1,24 @@
 import os
-import shutil
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
 
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.progress import track
 from rich.prompt import Prompt
+from rich.table import Table
 from rich.text import Text
 from rich.traceback import install
 
+from backup_engine import ACTION_COPY, ACTION_LINK, BackupEngine
+from duplicate_finder import find_duplicates_in_dir, hardlink_duplicates, move_duplicates, write_report
+from event_log import LOG_DETAILED, LOG_SIMPLE, EventLog, default_log_path
+from folder_walker import FileFilter, parse_extensions
+from operation_plan import (OP_COPY, OP_MOVE, OP_RENAME, SPLIT_BY_BYTES, SPLIT_BY_COUNT, OperationPlan,
+                            execute_plan, plan_backup, plan_flatten, plan_move_files, plan_rename_folders, plan_split,
+                            undo_journal)
+
 install()
 console = Console()
+log_level = LOG_SIMPLE
 
 GITHUB_URL = "https://gist.github.com/Hellohistory/54b529cfc4d53c3041f3d005785a8e77"
 AUTHOR_NAME = "Hellohistory"
@@ -37,81 +43,111 @@ def display_footer():
     console.print(Panel(footer_text, style="green"))
 
 
-def handle_duplicate_file(dest_file):
-    """处理目标文件夹中的同名文件"""
-    base, extension = os.path.splitext(dest_file)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    new_dest_file = f"{base}_{timestamp}{extension}"
-    return new_dest_file
+def describe_operation(operation):
+    if operation.op == OP_MOVE:
+        return f"文件 {operation.src} 已移动到 {operation.dest}"
+    if operation.op == OP_COPY:
+        return f"文件 {operation.src} 已复制到 {operation.dest}"
+    if operation.op == OP_RENAME:
+        return f"文件夹 {operation.src} 重命名为 {operation.dest}"
+    return f"已创建文件夹 {operation.dest}"
 
 
-def move_file(src_file, dest_file):
-    try:
-        shutil.move(src_file, dest_file)
-        console.log(f"文件 {src_file} 已移动到 {dest_file}")
-    except Exception as e:
-        console.log(f"无法移动文件 {src_file}: {e}")
+def run_plan(plan):
+    """执行操作计划：同设备的文件直接 rename，跨设备的文件并行复制，显示进度并输出各阶段吞吐量与撤销日志路径"""
+    if plan is None:
+        return
+    console.log(plan.summary())
+    if not plan.operations:
+        return
+    with EventLog(console, "正在执行计划", len(plan.operations), log_level, default_log_path("plan")) as event_log:
+        def on_operation(operation, error):
+            message = f"无法处理 {operation.src or operation.dest}" if error else describe_operation(operation)
+            event_log.put(message, operation.size, error, op=operation.op, src=operation.src, dest=operation.dest)
 
+        result = execute_plan(plan, on_operation=on_operation)
+    for report in result.stages:
+        if report.files or report.failed:
+            console.log(report.summary())
+    console.log(f"撤销日志: {result.journal_path}")
 
-def move_files():
-    """移动文件的功能实现"""
-    src_dir = Prompt.ask("请输入源文件夹路径", console=console)
-    dest_dir = Prompt.ask("请输入目标文件夹路径", console=console)
 
-    src_dir = os.path.abspath(src_dir)
-    dest_dir = os.path.abspath(dest_dir)
-    file_tasks = []
+def prompt_file_filter():
+    """询问需要处理的扩展名，留空表示处理全部文件"""
+    extensions = parse_extensions(Prompt.ask("仅处理以下扩展名的文件（逗号分隔，留空表示全部）", default="",
+                                             console=console))
+    return FileFilter(extensions=extensions) if extensions else None
 
-    for root, _, files in os.walk(src_dir):
-        for name in files:
-            src_file = os.path.join(root, name)
-            dest_file = os.path.join(dest_dir, name)
-            if os.path.exists(dest_file):
-                dest_file = handle_duplicate_file(dest_file)
-            file_tasks.append((src_file, dest_file))
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for src_file, dest_file in file_tasks:
-            executor.submit(move_file, src_file, dest_file)
+def prompt_move_plan():
+    src_dir = Prompt.ask("请输入源文件夹路径", console=console)
+    dest_dir = Prompt.ask("请输入目标文件夹路径", console=console)
+    return plan_move_files(src_dir, dest_dir, prompt_file_filter())
 
 
-def rename_folders():
-    """重命名文件夹的功能实现，去掉'_'和后续数字"""
+def prompt_rename_plan():
     base_dir = Prompt.ask("请输入文件夹所在的基本路径", console=console)
     start_number_str = Prompt.ask("请输入文件夹编号起始数字", default="100", console=console)
-    start_number = int(start_number_str)
+    return plan_rename_folders(base_dir, int(start_number_str))
+
+
+def prompt_backup_plan():
+    src_dir = Prompt.ask("请输入需要备份的源文件夹路径", console=console)
+    dest_dir = Prompt.ask("请输入备份文件的目标文件夹路径", console=console)
+    return plan_backup(src_dir, dest_dir, prompt_file_filter())
+
+
+def prompt_flatten_plan():
+    parent_dir = os.path.abspath(Prompt.ask("请输入父文件夹路径", console=console))
+    if not os.path.isdir(parent_dir):
+        console.log(f"指定的路径不是一个文件夹: {parent_dir}")
+        return None
+    return plan_flatten(parent_dir, prompt_file_filter())
+
+
+def prompt_split_plan():
+    folder_path = Prompt.ask("请输入需要分配的文件夹路径", console=console)
+    subfolder_count = int(Prompt.ask("请输入子文件夹数量", console=console))
+    mode = Prompt.ask("请选择分配方式 (1-按文件数量, 2-按字节数均衡, 3-按每个子文件夹容量上限)",
+                      choices=["1", "2", "3"], default="1", console=console)
+    max_bytes = None
+    if mode == "3":
+        max_bytes = int(float(Prompt.ask("请输入每个子文件夹的容量上限 (MB)", console=console)) * 1024 ** 2)
+    group_by_stem = Prompt.ask("同名不同扩展名的文件（如图片与 XML 标注）是否放在同一子文件夹 (y/n)",
+                               choices=["y", "n"], default="y", console=console) == "y"
+    strategy = SPLIT_BY_COUNT if mode == "1" else SPLIT_BY_BYTES
+    return plan_split(folder_path, subfolder_count, prompt_file_filter(), strategy, max_bytes, group_by_stem)
+
+
+def move_files():
+    """移动文件的功能实现"""
+    run_plan(prompt_move_plan())
 
-    folders = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
-    for folder_name in track(sorted(folders), description="正在重命名文件夹..."):
-        old_path = os.path.join(base_dir, folder_name)
-        new_folder_name = f"{start_number:03d}"  # 去掉'_'和后续数字
-        new_path = os.path.join(base_dir, new_folder_name)
-        os.rename(old_path, new_path)
-        console.log(f"文件夹 {old_path} 重命名为 {new_path}")
-        start_number += 1
+
+def rename_folders():
+    """重命名文件夹的功能实现，按名称排序后依次重命名为三位编号"""
+    run_plan(prompt_rename_plan())
 
 
 def select_log_level():
-    """选择日志级别"""
-    level = Prompt.ask("请选择日志级别 (1-简单, 2-详细)", choices=["1", "2"], default="1", console=console)
+    """选择日志级别：简单级别只显示进度条、错误与汇总，详细级别另外逐个显示已处理的文件（限频）"""
+    global log_level
+    level = Prompt.ask("请选择日志级别 (1-简单, 2-详细)", choices=["1", "2"],
+                       default="2" if log_level == LOG_DETAILED else "1", console=console)
     if level == "1":
+        log_level = LOG_SIMPLE
         console.log("已设置为简单日志级别")
     else:
+        log_level = LOG_DETAILED
         console.log("已设置为详细日志级别")
 
 
-def backup_file(src_file, dest_file):
-    try:
-        shutil.copy2(src_file, dest_file)
-        console.log(f"文件 {src_file} 已备份到 {dest_file}")
-    except Exception as e:
-        console.log(f"无法备份文件 {src_file}: {e}")
-
-
 def backup_files():
-    """备份文件的功能实现"""
+    """增量备份：保留目录结构，跳过未变化的文件，中断后再次运行可继续"""
     src_dir = Prompt.ask("请输入需要备份的源文件夹路径", console=console)
     dest_dir = Prompt.ask("请输入备份文件的目标文件夹路径", console=console)
+    link_dest = Prompt.ask("请输入上一次备份的快照路径（未变化的文件将创建硬链接，可留空）",
+                           default="", console=console)
 
     src_dir = os.path.abspath(src_dir)
     dest_dir = os.path.abspath(dest_dir)
@@ -120,74 +156,128 @@ def backup_files():
         os.makedirs(dest_dir)
         console.log(f"已创建备份目标文件夹 {dest_dir}")
 
-    file_tasks = []
+    file_filter = prompt_file_filter()
+    with EventLog(console, "正在备份", level=log_level, log_path=default_log_path("backup")) as event_log:
+        def on_file(rel_path, action, error, strategy, size):
+            if error:
+                message = f"无法备份文件 {rel_path}"
+            elif action == ACTION_COPY:
+                message = f"文件 {rel_path} 已备份 ({strategy})"
+            elif action == ACTION_LINK:
+                message = f"文件 {rel_path} 未变化，已硬链接到上一次快照"
+            else:
+                message = f"文件 {rel_path} 未变化，已跳过"
+            event_log.put(message, size, error=error, path=rel_path, action=action, strategy=strategy)
 
-    for root, _, files in os.walk(src_dir):
-        for name in files:
-            src_file = os.path.join(root, name)
-            dest_file = os.path.join(dest_dir, name)
-            if os.path.exists(dest_file):
-                dest_file = handle_duplicate_file(dest_file)
-            file_tasks.append((src_file, dest_file))
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for src_file, dest_file in file_tasks:
-            executor.submit(backup_file, src_file, dest_file)
+        report = BackupEngine(src_dir, dest_dir, link_dest or None, on_file=on_file, file_filter=file_filter).run()
+    console.log(report.summary())
 
 
 def move_subfolder_files_to_parent():
     """将子文件夹内的文件移动到父文件夹"""
-    parent_dir = Prompt.ask("请输入父文件夹路径", console=console)
-    parent_dir = os.path.abspath(parent_dir)
+    run_plan(prompt_flatten_plan())
 
-    if not os.path.isdir(parent_dir):
-        console.log(f"指定的路径不是一个文件夹: {parent_dir}")
+
+def split_folder(folder_path, subfolder_count, strategy=SPLIT_BY_COUNT, max_bytes=None, group_by_stem=False):
+    """将文件夹中的文件均匀分配到指定数量的子文件夹中，可按字节数均衡或限制每个子文件夹的容量"""
+    run_plan(plan_split(folder_path, subfolder_count, strategy=strategy, max_bytes=max_bytes,
+                        group_by_stem=group_by_stem))
+
+
+def move_all_files(source_folder, destination_folder):
+    """将源文件夹中的所有文件移动到目标文件夹，包括子文件夹中的文件"""
+    run_plan(plan_move_files(source_folder, destination_folder))
+
+
+PLAN_BUILDERS = {
+    "1": ("移动文件", prompt_move_plan),
+    "2": ("重命名文件夹", prompt_rename_plan),
+    "3": ("备份文件", prompt_backup_plan),
+    "4": ("将子文件夹内的文件移动到父文件夹", prompt_flatten_plan),
+    "5": ("文件夹中文件平均分配到子文件夹", prompt_split_plan),
+}
+
+
+def preview_plan():
+    """生成操作计划并保存为 JSON，仅预览不执行"""
+    for key, (desc, _) in PLAN_BUILDERS.items():
+        console.print(Text.assemble((f"{key}: ", "bold cyan"), (desc, "bold white")))
+    choice = Prompt.ask("请选择需要生成计划的操作", choices=list(PLAN_BUILDERS.keys()), console=console)
+    plan = PLAN_BUILDERS[choice][1]()
+    if plan is None:
         return
+    console.log(plan.summary())
+    plan_path = Prompt.ask("请输入计划文件保存路径", default="organizer_plan.json", console=console)
+    plan.save(plan_path)
+    console.log(f"计划已保存到 {os.path.abspath(plan_path)}，检查无误后可选择“执行已保存的操作计划”")
 
-    file_tasks = []
 
-    subfolders = [d for d in os.listdir(parent_dir) if os.path.isdir(os.path.join(parent_dir, d))]
-    for folder in subfolders:
-        folder_path = os.path.join(parent_dir, folder)
-        for root, _, files in os.walk(folder_path):
-            for name in files:
-                src_file = os.path.join(root, name)
-                dest_file = os.path.join(parent_dir, name)
-                if os.path.exists(dest_file):
-                    dest_file = handle_duplicate_file(dest_file)
-                file_tasks.append((src_file, dest_file))
+def execute_saved_plan():
+    """执行已保存的操作计划"""
+    plan_path = Prompt.ask("请输入计划文件路径", default="organizer_plan.json", console=console)
+    run_plan(OperationPlan.load(plan_path))
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for src_file, dest_file in file_tasks:
-            executor.submit(move_file, src_file, dest_file)
 
+def undo_executed_plan():
+    """根据撤销日志还原已执行的操作"""
+    journal_path = Prompt.ask("请输入撤销日志路径", console=console)
 
-def split_folder(folder_path, subfolder_count):
-    """将文件夹中的文件均匀分配到指定数量的子文件夹中"""
-    files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-    total_files = len(files)
-    files_per_subfolder, remainder = divmod(total_files, subfolder_count)
+    def log_undo(operation, error):
+        if error:
+            console.log(f"无法撤销 {operation.op} {operation.dest}: {error}")
 
-    current_file_index = 0
-    for i in range(subfolder_count):
-        subfolder_path = os.path.join(folder_path, f"{i + 1}")
-        os.makedirs(subfolder_path, exist_ok=True)
-        for j in range(files_per_subfolder + (1 if i < remainder else 0)):
-            shutil.move(os.path.join(folder_path, files[current_file_index]), subfolder_path)
-            current_file_index += 1
-    console.log("文件移动完成！")
+    succeeded, failed = undo_journal(journal_path, on_operation=log_undo)
+    console.log(f"已撤销 {succeeded} 项，失败 {failed} 项")
+    if failed:
+        console.log(f"撤销日志已保留，只包含未能撤销的操作，处理后可再次撤销: {journal_path}")
 
 
-def move_all_files(source_folder, destination_folder):
-    """将源文件夹中的所有文件移动到目标文件夹，包括子文件夹中的文件"""
-    files = os.listdir(source_folder)
-    for filename in files:
-        file_path = os.path.join(source_folder, filename)
-        if os.path.isfile(file_path):
-            shutil.move(file_path, destination_folder)
-        elif os.path.isdir(file_path):
-            move_all_files(file_path, destination_folder)
-    console.log("文件移动完成！")
+def find_duplicate_files():
+    """查找重复文件，并可选择生成报告、替换为硬链接或移动到指定文件夹"""
+    root_dir = os.path.abspath(Prompt.ask("请输入需要查找重复文件的文件夹路径", console=console))
+    if not os.path.isdir(root_dir):
+        console.log(f"指定的路径不是一个文件夹: {root_dir}")
+        return
+
+    with console.status("正在查找重复文件...") as status:
+        groups, stats = find_duplicates_in_dir(
+            root_dir, progress=lambda stage, done, total: status.update(f"正在查找重复文件 ({stage} {done}/{total})"))
+
+    console.log(f"共扫描 {stats.files_scanned} 个文件 ({stats.bytes_total / 1024 ** 2:.1f} MB)，"
+                f"实际读取 {stats.bytes_read / 1024 ** 2:.1f} MB")
+    for error in stats.errors:
+        console.log(f"[red]{error}[/red]")
+    if not groups:
+        console.log("未发现重复文件")
+        return
+
+    table = Table(title=f"重复文件 ({len(groups)} 组)")
+    table.add_column("组", justify="right", style="cyan")
+    table.add_column("大小", justify="right")
+    table.add_column("文件", style="magenta")
+    for index, group in enumerate(groups, start=1):
+        table.add_row(str(index), f"{group.size / 1024:.1f} KB", "\n".join(group.paths))
+    console.print(table)
+    console.log(f"可释放空间约 {sum(g.wasted_bytes for g in groups) / 1024 ** 2:.1f} MB")
+
+    action = Prompt.ask("请选择操作 (0-不处理, 1-保存报告, 2-替换为硬链接, 3-移动重复文件)",
+                        choices=["0", "1", "2", "3"], default="0", console=console)
+    if action == "1":
+        report_path = Prompt.ask("请输入报告路径 (.json 或 .csv)", default="duplicates.json", console=console)
+        write_report(groups, report_path)
+        console.log(f"报告已保存到 {report_path}")
+        return
+    if action == "2":
+        results = hardlink_duplicates(groups)
+    elif action == "3":
+        dest_dir = os.path.abspath(Prompt.ask("请输入存放重复文件的文件夹路径", console=console))
+        results = move_duplicates(groups, dest_dir, root_dir)
+    else:
+        return
+    for path, error in results:
+        if error:
+            console.log(f"无法处理文件 {path}: {error}")
+    console.log(f"已处理 {sum(1 for _, error in results if not error)} 个重复文件")
 
 
 def main():
@@ -201,7 +291,11 @@ def main():
         "4": ("备份文件", backup_files),
         "5": ("将子文件夹内的文件移动到父文件夹", move_subfolder_files_to_parent),
         "6": ("文件夹中文件平均分配到子文件夹", lambda: split_folder_prompt()),
-        "7": ("移动源文件夹中的所有文件到目标文件夹", lambda: move_all_files_prompt())
+        "7": ("移动源文件夹中的所有文件到目标文件夹", lambda: move_all_files_prompt()),
+        "8": ("查找重复文件", find_duplicate_files),
+        "9": ("生成操作计划（仅预览，不执行）", preview_plan),
+        "10": ("执行已保存的操作计划", execute_saved_plan),
+        "11": ("撤销已执行的操作计划", undo_executed_plan)
     }
 
     while True:
@@ -221,9 +315,7 @@ def main():
 
 
 def split_folder_prompt():
-    folder_path = Prompt.ask("请输入需要分配的文件夹路径", console=console)
-    subfolder_count = int(Prompt.ask("请输入子文件夹数量", console=console))
-    split_folder(folder_path, subfolder_count)
+    run_plan(prompt_split_plan())
 
 
 def move_all_files_prompt():
@@ -1,8 +1,15 @@
-import os
 import random
 from rich.console import Console
 from rich.table import Table
-from rich.progress import track
+from rich.progress import Progress
+
+from fake_dataset import STATUS_OK, DatasetSpec, generate_dataset, read_manifest, regenerate_dataset, verify_dataset
+from fake_file_core import (CONTENT_RANDOM, CONTENT_SPARSE, CONTENT_TEXT, CONTENT_ZEROS, CREATE_WORKERS, SIZE_BUDGET,
+                            SIZE_FIXED, SIZE_LOGNORMAL, SIZE_UNIFORM, SizeDistribution, TreeShape)
+
+# 大小解析位于 Other/size_units.py，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from size_units import parse_size
 
 
 def display_intro():
@@ -20,32 +27,134 @@ def display_intro():
     console.print(table)
 
 
-def generate_random_name(base_text, max_length, existing_names):
-    while True:
-        random_name = ''.join(random.choice(base_text) for _ in range(random.randint(1, max_length)))
-        if random_name not in existing_names:
-            return random_name
-
-
-def create_fake_files(directory, file_details, use_random_names=False, base_text="", max_length=10):
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    total_files = sum(file_details.values())
-    existing_names = set()
-
-    for ext, num_files in file_details.items():
-        for i in track(range(num_files), description=f"正在创建 .{ext} 文件..."):
-            if use_random_names:
-                random_name = generate_random_name(base_text, max_length, existing_names)
-                filename = f"{random_name}.{ext}"
-                existing_names.add(random_name)
-            else:
-                filename = f"fake_file_{i + 1}.{ext}"
-            filepath = os.path.join(directory, filename)
-            with open(filepath, 'w') as f:
-                f.write("This is a fake file.")
-    console.print(f"[green]{total_files} 个伪文件已成功创建在 {directory} 中。[/green]")
+def report_creation(reports, errors, roots):
+    for path, error in errors[:20]:
+        console.print(f"[red]无法创建 {path}: {error}[/red]")
+    for report in reports:
+        console.print(report.summary())
+    console.print(f"[green]{reports[1].files} 个伪文件（共 {reports[1].bytes / 1024 ** 2:.1f} MB）"
+                  f"已成功创建在 {', '.join(roots)} 中。[/green]")
+
+
+def create_fake_files(directory, file_details, use_random_names=False, base_text="", max_length=10,
+                      size_distribution=None, content=CONTENT_TEXT, seed=None, tree_shape=None, extra_roots=(),
+                      workers=CREATE_WORKERS, manifest_path=None):
+    """
+    :param size_distribution: 文件大小分布，默认每个文件 20 字节
+    :param content: 内容模式（zeros、sparse、random、text）
+    :param seed: 随机种子，相同种子与参数生成逐字节相同的数据集，默认随机选取
+    :param tree_shape: 目录树形状，默认所有文件直接放在 directory 中
+    :param extra_roots: 其他根目录，目录树的顶层目录轮流分布到 directory 与这些目录
+    :param workers: 并行创建文件的线程数
+    :param manifest_path: 提供时写出包含生成参数与每个文件路径、大小、哈希的清单
+    """
+    spec = DatasetSpec([directory, *extra_roots], file_details,
+                       random.SystemRandom().randrange(2 ** 32) if seed is None else seed,
+                       base_text if use_random_names else "", max_length,
+                       size_distribution or SizeDistribution(), content, tree_shape or TreeShape())
+    errors = []
+    with Progress(console=console) as progress:
+        task = progress.add_task("正在创建伪文件...", total=spec.total_files)
+        reports = generate_dataset(spec, manifest_path, workers, lambda count, _: progress.advance(task, count),
+                                   errors)
+    report_creation(reports, errors, spec.roots)
+    console.print(f"种子: {spec.seed}" + (f"，清单已保存到 {manifest_path}" if manifest_path else ""))
+
+
+def regenerate_from_manifest(manifest_path, roots=None, workers=CREATE_WORKERS):
+    """按清单中的生成参数逐字节重新生成数据集"""
+    spec, _, _ = read_manifest(manifest_path)
+    errors = []
+    with Progress(console=console) as progress:
+        task = progress.add_task("正在重新生成伪文件...", total=spec.total_files)
+        reports = regenerate_dataset(manifest_path, roots, workers, lambda count, _: progress.advance(task, count),
+                                     errors)
+    report_creation(reports, errors, roots or spec.roots)
+
+
+def verify_from_manifest(manifest_path, roots=None):
+    """按清单校验数据集（例如传输或备份之后）"""
+    _, _, entries = read_manifest(manifest_path)
+    counts = {}
+    with Progress(console=console) as progress:
+        task = progress.add_task("正在校验伪文件...", total=len(entries))
+        for result in verify_dataset(manifest_path, roots):
+            counts[result.status] = counts.get(result.status, 0) + 1
+            if result.status != STATUS_OK:
+                console.print(f"[red]{result.status} {result.path} {result.error or ''}[/red]")
+            progress.advance(task)
+    console.print("校验结果: " + ", ".join(f"{status} {count} 个" for status, count in counts.items()))
+
+
+def prompt_roots(prompt):
+    roots_input = console.input(prompt)
+    return [root.strip() for root in roots_input.replace("，", ",").split(",") if root.strip()]
+
+
+def prompt_tree_shape():
+    depth_input = console.input("请输入目录树的层数（0 表示所有文件放在同一目录）[默认为0]：").strip()
+    depth = int(depth_input) if depth_input else 0
+    if depth == 0:
+        return TreeShape()
+    fan_out = int(console.input("请输入每个目录的子目录数：") or "10")
+    per_leaf_input = console.input("请输入每个叶子目录的文件数（留空表示平均分配）：").strip()
+    return TreeShape(depth, fan_out, int(per_leaf_input) if per_leaf_input else None)
+
+
+def prompt_size_distribution():
+    mode = console.input("请选择文件大小分布 (1-固定, 2-均匀, 3-对数正态, 4-按总大小分配)[默认为1]：").strip() or "1"
+    if mode == "2":
+        return SizeDistribution(SIZE_UNIFORM, min_size=parse_size(console.input("请输入最小文件大小（如 1K）：")),
+                                max_size=parse_size(console.input("请输入最大文件大小（如 10M）：")))
+    if mode == "3":
+        median = parse_size(console.input("请输入文件大小的中位数（如 256K）："))
+        max_size = parse_size(console.input("请输入最大文件大小（如 1G）："))
+        return SizeDistribution(SIZE_LOGNORMAL, size=median, max_size=max_size)
+    if mode == "4":
+        return SizeDistribution(SIZE_BUDGET, total_bytes=parse_size(console.input("请输入所有文件的总大小（如 10G）：")))
+    size_input = console.input("请输入每个文件的大小（如 4K）[默认为20字节]：").strip()
+    return SizeDistribution(SIZE_FIXED, size=parse_size(size_input)) if size_input else SizeDistribution()
+
+
+def prompt_content_mode():
+    choice = console.input("请选择文件内容 (1-文本, 2-全零, 3-稀疏文件, 4-随机数据)[默认为1]：").strip() or "1"
+    return {"1": CONTENT_TEXT, "2": CONTENT_ZEROS, "3": CONTENT_SPARSE, "4": CONTENT_RANDOM}.get(choice, CONTENT_TEXT)
+
+
+def prompt_create():
+    directory = console.input("请输入要创建文件的目录路径：")
+    use_random_names = console.input("是否使用随机文件名？(y/n)：").lower() == 'y'
+    base_text = ""
+    max_length = 10
+    if use_random_names:
+        base_text = console.input("请输入用于生成文件名的文字：")
+        max_length = int(console.input("请输入文件名的最大长度："))
+
+    extensions_input = console.input("请输入文件的扩展名（用逗号分隔）：")
+    if extensions_input.strip() == "":
+        file_details = {"txt": 1000}
+    else:
+        extensions = [ext.strip() for ext in extensions_input.replace("，", ",").split(",")]
+        file_details = {}
+        for ext in extensions:
+            num_input = console.input(f"请输入要为 .{ext} 文件创建的数量[默认为1000]：")
+            num_files = int(num_input) if num_input.strip() != "" else 1000
+            file_details[ext] = num_files
+
+    size_distribution = prompt_size_distribution()
+    content = prompt_content_mode()
+    tree_shape = prompt_tree_shape()
+    extra_roots = prompt_roots("请输入其他根目录（逗号分隔，留空表示只使用上面的目录）：")
+    workers_input = console.input(f"请输入并行创建的线程数[默认为{CREATE_WORKERS}]：").strip()
+    workers = int(workers_input) if workers_input else CREATE_WORKERS
+    seed_input = console.input("请输入随机种子（留空表示随机）：").strip()
+    manifest_path = console.input("请输入清单保存路径（留空表示不保存）：").strip() or None
+    try:
+        create_fake_files(directory, file_details, use_random_names, base_text, max_length, size_distribution,
+                          content, int(seed_input) if seed_input else None, tree_shape, extra_roots, workers,
+                          manifest_path)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
 
 
 if __name__ == "__main__":
@@ -53,28 +162,21 @@ if __name__ == "__main__":
     display_intro()
 
     while True:
-        directory = console.input("请输入要创建文件的目录路径：")
-        use_random_names = console.input("是否使用随机文件名？(y/n)：").lower() == 'y'
-        base_text = ""
-        max_length = 10
-        if use_random_names:
-            base_text = console.input("请输入用于生成文件名的文字：")
-            max_length = int(console.input("请输入文件名的最大长度："))
-
-        extensions_input = console.input("请输入文件的扩展名（用逗号分隔）：")
-        if extensions_input.strip() == "":
-            file_details = {"txt": 1000}
-        else:
-            extensions = [ext.strip() for ext in extensions_input.replace("，", ",").split(",")]
-            file_details = {}
-            for ext in extensions:
-                num_input = console.input(f"请输入要为 .{ext} 文件创建的数量[默认为1000]：")
-                num_files = int(num_input) if num_input.strip() != "" else 1000
-                file_details[ext] = num_files
-
-        create_fake_files(directory, file_details, use_random_names, base_text, max_length)
-
-        continue_choice = console.input("是否继续创建文件？(y/n)：")
+        mode = console.input("请选择操作 (1-生成伪文件, 2-按清单重新生成, 3-按清单校验)[默认为1]：").strip() or "1"
+        try:
+            if mode == "2":
+                regenerate_from_manifest(console.input("请输入清单路径："),
+                                         prompt_roots("请输入新的根目录（逗号分隔，留空表示使用清单中的目录）：") or None)
+            elif mode == "3":
+                verify_from_manifest(console.input("请输入清单路径："),
+                                     prompt_roots("请输入数据集现在所在的根目录（逗号分隔，留空表示使用清单中的目录）：")
+                                     or None)
+            else:
+                prompt_create()
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+
+        continue_choice = console.input("是否继续？(y/n)：")
         if continue_choice.lower() != "y":
             console.print("[bold magenta]程序已退出。[/bold magenta]")
             break
@@ -0,0 +1,16 @@
+# _paths.py
+"""
+黑白转换与 PDF 转长图共用上一级 Graph 中的渲染缓存。
+convert2blackwhite_core 在导入 render_cache 之前 import _paths，Graph 目录只在这里加入 sys.path 一次，
+且追加在末尾，不会遮蔽标准库或本目录中的同名模块
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+GRAPH_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+if GRAPH_DIR not in sys.path:
+    sys.path.append(GRAPH_DIR)
@@ -6,6 +6,13 @@ from skimage.filters import threshold_sauvola
 import os
 import shutil
 
+# 渲染缓存位于 Graph/render_cache.py，与 PDF 转长图共用，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from render_cache import RenderCache, document_hash, render_cached
+
+SOURCE_IMAGES = "images"  # 提取 PDF 中嵌入的图片
+SOURCE_RENDER = "render"  # 按缩放倍数渲染整页
+
 
 # 提取图片
 def extract_images_from_pdf(pdf_path, temp_folder):
@@ -35,6 +42,22 @@ def extract_images_from_pdf(pdf_path, temp_folder):
     return image_counter
 
 
+# 渲染整页，提供缓存时与 PDF 转长图共用相同缩放倍数下的渲染结果
+def render_pages_from_pdf(pdf_path, temp_folder, zoom_factor=2, cache=None):
+    doc_hash = document_hash(pdf_path) if cache else None
+    with fitz.open(pdf_path) as pdf_document:
+        page_count = len(pdf_document)
+        for page_num in range(page_count):
+            page = render_cached(pdf_document, page_num, zoom_factor, cache=cache, doc_hash=doc_hash)
+            pixels = np.frombuffer(page.samples, dtype=np.uint8).reshape(page.height, page.width, page.channels)
+            image_path = os.path.join(temp_folder, f"page_{page_num:04d}.png")
+            if not cv2.imwrite(image_path, cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)):
+                raise FileNotFoundError(f"页面渲染失败: {image_path}")
+    if cache:
+        cache.trim()
+    return page_count
+
+
 # 处理图像（黑白转换等）
 def process_image(image_path, scale_percent, window_size, k):
     image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
@@ -94,12 +117,16 @@ def clean_temp_folder(temp_folder):
 
 
 # 核心处理函数
-def process_pdf(input_pdf_path, output_pdf_path, scale_percent=75, window_size=25, k=0.08):
+def process_pdf(input_pdf_path, output_pdf_path, scale_percent=75, window_size=25, k=0.08,
+                source=SOURCE_IMAGES, zoom_factor=2, cache=None):
     temp_dir = "temp_images"
     os.makedirs(temp_dir, exist_ok=True)
 
     try:
-        image_count = extract_images_from_pdf(input_pdf_path, temp_dir)
+        if source == SOURCE_RENDER:
+            image_count = render_pages_from_pdf(input_pdf_path, temp_dir, zoom_factor, cache)
+        else:
+            image_count = extract_images_from_pdf(input_pdf_path, temp_dir)
         if image_count == 0:
             print("没有提取到任何图片")
             return
@@ -124,5 +151,7 @@ def process_pdf(input_pdf_path, output_pdf_path, scale_percent=75, window_size=2
 
 
 # 在GUI中调用核心处理函数
-def start_processing(input_pdf_path, output_pdf_path, scale_percent, window_size, k):
-    process_pdf(input_pdf_path, output_pdf_path, scale_percent, window_size, k)
+def start_processing(input_pdf_path, output_pdf_path, scale_percent, window_size, k,
+                     source=SOURCE_IMAGES, zoom_factor=2, use_cache=False):
+    process_pdf(input_pdf_path, output_pdf_path, scale_percent, window_size, k, source, zoom_factor,
+                RenderCache() if use_cache else None)
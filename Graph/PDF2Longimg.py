@@ -1,16 +1,20 @@
 import json
+import multiprocessing
+from dataclasses import asdict
 import os
 import sys
-import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import fitz  # PyMuPDF
-from PIL import Image
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
                              QFileDialog, QProgressBar, QSpinBox, QHBoxLayout, QLineEdit,
-                             QMessageBox, QTextEdit)
+                             QMessageBox, QTextEdit, QComboBox, QCheckBox)
+
+from long_image_writer import FORMAT_LABELS, SUBSAMPLING_OPTIONS, OutputOptions
+from page_selection import THUMBNAIL_ZOOM, PageSelection
+from pdf2longimg_batch import DEFAULT_DOCUMENTS, collect_pdfs, convert_batch
+from pdf2longimg_core import DEFAULT_WORKERS
+from render_cache import RenderCache
 
 
 class PDFToLongImageApp(QWidget):
@@ -21,7 +25,6 @@ class PDFToLongImageApp(QWidget):
         self.pdf_files = []
         self.pdf_folders = []
         self.output_folder_path = ""
-        self.temp_dir = tempfile.mkdtemp()
 
         # 设置应用程序图标和版本号
         self.setWindowIcon(QIcon('logo_6.ico'))
@@ -63,11 +66,80 @@ class PDFToLongImageApp(QWidget):
         hbox_images_per_long = QHBoxLayout()
         hbox_images_per_long.addWidget(QLabel("每张长图的图片数量:", self))
         self.images_per_long_spinbox = QSpinBox(self)
-        self.images_per_long_spinbox.setRange(1, 100)
+        self.images_per_long_spinbox.setRange(0, 100000)
+        self.images_per_long_spinbox.setSpecialValueText("全部")  # 0 表示所有页面拼为一张
         self.images_per_long_spinbox.setValue(10)  # 默认值为10张图片拼接一张长图
         hbox_images_per_long.addWidget(self.images_per_long_spinbox)
         layout.addLayout(hbox_images_per_long)
 
+        # 页面选择：只渲染选中的页面
+        hbox_pages = QHBoxLayout()
+        hbox_pages.addWidget(QLabel("页码范围:", self))
+        self.page_ranges_line_edit = QLineEdit(self)
+        self.page_ranges_line_edit.setPlaceholderText("全部页面，例如 1-20,45,100-")
+        hbox_pages.addWidget(self.page_ranges_line_edit)
+        hbox_pages.addWidget(QLabel("每隔几页取一页:", self))
+        self.page_step_spinbox = QSpinBox(self)
+        self.page_step_spinbox.setRange(1, 1000)
+        hbox_pages.addWidget(self.page_step_spinbox)
+        self.thumbnail_checkbox = QCheckBox(f"缩略图模式（{THUMBNAIL_ZOOM} 倍）", self)
+        hbox_pages.addWidget(self.thumbnail_checkbox)
+        layout.addLayout(hbox_pages)
+
+        # 输出格式选择
+        hbox_format = QHBoxLayout()
+        hbox_format.addWidget(QLabel("输出格式:", self))
+        self.format_combobox = QComboBox(self)
+        for output_format, label in FORMAT_LABELS.items():
+            self.format_combobox.addItem(label, output_format)
+        hbox_format.addWidget(self.format_combobox)
+        layout.addLayout(hbox_format)
+
+        # 输出质量选择
+        defaults = OutputOptions()
+        hbox_quality = QHBoxLayout()
+        hbox_quality.addWidget(QLabel("JPEG/WebP 质量:", self))
+        self.quality_spinbox = QSpinBox(self)
+        self.quality_spinbox.setRange(1, 100)
+        self.quality_spinbox.setValue(defaults.quality)
+        hbox_quality.addWidget(self.quality_spinbox)
+        hbox_quality.addWidget(QLabel("JPEG 色度抽样:", self))
+        self.subsampling_combobox = QComboBox(self)
+        self.subsampling_combobox.addItems(SUBSAMPLING_OPTIONS)
+        self.subsampling_combobox.setCurrentText(defaults.subsampling)
+        hbox_quality.addWidget(self.subsampling_combobox)
+        hbox_quality.addWidget(QLabel("PNG/TIFF 压缩级别:", self))
+        self.compress_level_spinbox = QSpinBox(self)
+        self.compress_level_spinbox.setRange(0, 9)
+        self.compress_level_spinbox.setValue(defaults.compress_level)
+        hbox_quality.addWidget(self.compress_level_spinbox)
+        self.grayscale_checkbox = QCheckBox("灰度（纯文字 PDF）", self)
+        hbox_quality.addWidget(self.grayscale_checkbox)
+        layout.addLayout(hbox_quality)
+
+        # 渲染进程数选择
+        hbox_workers = QHBoxLayout()
+        hbox_workers.addWidget(QLabel("渲染进程数:", self))
+        self.workers_spinbox = QSpinBox(self)
+        self.workers_spinbox.setRange(1, max(DEFAULT_WORKERS, 32))
+        self.workers_spinbox.setValue(DEFAULT_WORKERS)
+        hbox_workers.addWidget(self.workers_spinbox)
+        layout.addLayout(hbox_workers)
+
+        # 同时处理的文档数选择
+        hbox_documents = QHBoxLayout()
+        hbox_documents.addWidget(QLabel("同时处理的文档数:", self))
+        self.documents_spinbox = QSpinBox(self)
+        self.documents_spinbox.setRange(1, 32)
+        self.documents_spinbox.setValue(DEFAULT_DOCUMENTS)
+        hbox_documents.addWidget(self.documents_spinbox)
+        layout.addLayout(hbox_documents)
+
+        # 渲染缓存：只修改每张长图的图片数量或输出格式重新转换时，不必再次渲染页面
+        self.cache_checkbox = QCheckBox("使用渲染缓存", self)
+        self.cache_checkbox.setChecked(True)
+        layout.addWidget(self.cache_checkbox)
+
         # 保存文件夹选择
         file_save_layout = QHBoxLayout()
         self.save_path_line_edit = QLineEdit(self)
@@ -113,7 +185,7 @@ class PDFToLongImageApp(QWidget):
                 color: #4a4a4a;
                 font-size: 14px;
             }
-            QLineEdit, QSpinBox, QTextEdit {
+            QLineEdit, QSpinBox, QTextEdit, QComboBox {
                 border: 1px solid #ccc;
                 border-radius: 4px;
                 padding: 4px;
@@ -154,12 +226,9 @@ class PDFToLongImageApp(QWidget):
 
         for file in files:
             if os.path.isdir(file):
-                for root, _, filenames in os.walk(file):
-                    for filename in filenames:
-                        if filename.endswith(".pdf"):
-                            pdf_files.append(os.path.join(root, filename))
+                pdf_files.extend(collect_pdfs([file]))
                 pdf_folders.append(file)
-            elif file.endswith(".pdf"):
+            elif file.lower().endswith(".pdf"):
                 pdf_files.append(file)
 
         if pdf_files:
@@ -200,24 +269,28 @@ class PDFToLongImageApp(QWidget):
             QMessageBox.warning(self, '错误', '所选的保存文件夹不存在！', QMessageBox.Ok)
             return
 
-        pdf_files = self.pdf_files if self.pdf_files else []
-        for folder in self.pdf_folders:
-            for root, _, filenames in os.walk(folder):
-                for filename in filenames:
-                    if filename.endswith(".pdf"):
-                        pdf_files.append(os.path.join(root, filename))
+        pdf_files = collect_pdfs(self.pdf_files + self.pdf_folders)
 
         if not pdf_files:
             QMessageBox.warning(self, '错误', '没有找到PDF文件！', QMessageBox.Ok)
             return
 
+        try:
+            selection = self.page_selection()
+        except ValueError as e:
+            QMessageBox.warning(self, '错误', str(e), QMessageBox.Ok)
+            return
+
         zoom_factor = self.zoom_factor_spinbox.value()
 
         self.btn_start.setEnabled(False)
         self.log_text_edit.clear()
 
         # 启动后台线程进行批量PDF转长图
-        self.thread = BatchConvertThread(pdf_files, output_folder_path, zoom_factor, self.temp_dir, self.images_per_long_spinbox.value())
+        self.thread = BatchConvertThread(pdf_files, output_folder_path, zoom_factor,
+                                         self.images_per_long_spinbox.value(), self.workers_spinbox.value(),
+                                         self.output_options(), self.documents_spinbox.value(),
+                                         RenderCache() if self.cache_checkbox.isChecked() else None, selection)
         self.thread.update_progress.connect(self.progress.setValue)
         self.thread.log_message.connect(self.log_text_edit.append)
         self.thread.completed.connect(self.on_batch_conversion_completed)
@@ -230,12 +303,36 @@ class PDFToLongImageApp(QWidget):
             QMessageBox.information(self, '转换完成', '批量PDF转换为长图成功！', QMessageBox.Ok)
         self.btn_start.setEnabled(True)
 
+    def output_options(self):
+        return OutputOptions(format=self.format_combobox.currentData(), quality=self.quality_spinbox.value(),
+                             subsampling=self.subsampling_combobox.currentText(),
+                             compress_level=self.compress_level_spinbox.value(),
+                             grayscale=self.grayscale_checkbox.isChecked())
+
+    def page_selection(self):
+        return PageSelection(self.page_ranges_line_edit.text(), self.page_step_spinbox.value(),
+                             self.thumbnail_checkbox.isChecked())
+
+    def set_output_options(self, options):
+        self.format_combobox.setCurrentIndex(max(self.format_combobox.findData(options.format), 0))
+        self.quality_spinbox.setValue(options.quality)
+        self.subsampling_combobox.setCurrentText(options.subsampling)
+        self.compress_level_spinbox.setValue(options.compress_level)
+        self.grayscale_checkbox.setChecked(options.grayscale)
+
     def load_settings(self):
         try:
             with open("settings.json", "r") as f:
                 settings = json.load(f)
                 self.save_path_line_edit.setText(settings.get("save_path", ""))
                 self.zoom_factor_spinbox.setValue(settings.get("zoom_factor", 2))
+                self.workers_spinbox.setValue(settings.get("workers", DEFAULT_WORKERS))
+                self.documents_spinbox.setValue(settings.get("max_documents", DEFAULT_DOCUMENTS))
+                self.cache_checkbox.setChecked(settings.get("use_cache", True))
+                self.page_ranges_line_edit.setText(settings.get("page_ranges", ""))
+                self.page_step_spinbox.setValue(settings.get("page_step", 1))
+                self.thumbnail_checkbox.setChecked(settings.get("thumbnail", False))
+                self.set_output_options(OutputOptions(**settings.get("output_options", {})))
         except FileNotFoundError:
             pass
 
@@ -243,6 +340,13 @@ class PDFToLongImageApp(QWidget):
         settings = {
             "save_path": self.save_path_line_edit.text(),
             "zoom_factor": self.zoom_factor_spinbox.value(),
+            "workers": self.workers_spinbox.value(),
+            "max_documents": self.documents_spinbox.value(),
+            "use_cache": self.cache_checkbox.isChecked(),
+            "page_ranges": self.page_ranges_line_edit.text(),
+            "page_step": self.page_step_spinbox.value(),
+            "thumbnail": self.thumbnail_checkbox.isChecked(),
+            "output_options": asdict(self.output_options()),
         }
         with open("settings.json", "w") as f:
             json.dump(settings, f)
@@ -252,163 +356,40 @@ class PDFToLongImageApp(QWidget):
         event.accept()
 
 
-def concatenate_images_vertically(image_paths, output_image_base_path, images_per_long):
-    MAX_IMAGE_DIMENSION = 65500  # Pillow的最大支持尺寸
-
-    total_images = len(image_paths)
-    part = 0
-
-    for i in range(0, total_images, images_per_long):
-        part += 1
-        current_images = image_paths[i:i + images_per_long]
-
-        total_height = sum(Image.open(img).height for img in current_images)
-        max_width = max(Image.open(img).width for img in current_images)
-
-        # 如果总高度超过最大值，则分割处理
-        if total_height > MAX_IMAGE_DIMENSION:
-            current_part_images = []
-            current_part_height = 0
-            sub_part = 1
-
-            for img_path in current_images:
-                img_height = Image.open(img_path).height
-                if current_part_height + img_height > MAX_IMAGE_DIMENSION:
-                    # 保存当前分片
-                    long_image = Image.new("RGB", (max_width, current_part_height))
-                    y_offset = 0
-                    for part_img in current_part_images:
-                        img = Image.open(part_img)
-                        long_image.paste(img, (0, y_offset))
-                        y_offset += img.height
-                    output_image_path = f"{output_image_base_path}_part{part}_sub{sub_part}.jpg"
-                    long_image.save(output_image_path)
-                    sub_part += 1
-                    current_part_images.clear()
-                    current_part_height = 0
-
-                # 添加图片到当前分片
-                current_part_images.append(img_path)
-                current_part_height += img_height
-
-            # 保存最后的分片
-            if current_part_images:
-                long_image = Image.new("RGB", (max_width, current_part_height))
-                y_offset = 0
-                for part_img in current_part_images:
-                    img = Image.open(part_img)
-                    long_image.paste(img, (0, y_offset))
-                    y_offset += img.height
-                output_image_path = f"{output_image_base_path}_part{part}_sub{sub_part}.jpg"
-                long_image.save(output_image_path)
-
-        else:
-            # 正常处理
-            long_image = Image.new("RGB", (max_width, total_height))
-
-            y_offset = 0
-            for img_path in current_images:
-                img = Image.open(img_path)
-                long_image.paste(img, (0, y_offset))
-                y_offset += img.height
-
-            output_image_path = f"{output_image_base_path}_part{part}.jpg"
-            long_image.save(output_image_path)
-
-        # 清理临时文件
-        for img_path in current_images:
-            os.remove(img_path)
-
-
-def process_page(pdf_doc, page_num, zoom_matrix, temp_dir):
-    try:
-        page = pdf_doc.load_page(page_num)
-        pix = page.get_pixmap(matrix=zoom_matrix)
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-
-        # 使用数字序列命名每个页面的图片，避免复杂命名
-        image_path = os.path.join(temp_dir, f"{page_num + 1}.png")
-        img.save(image_path, format='PNG')
-        return image_path
-    except Exception as e:
-        return None, f"页面 {page_num} 处理失败: {e}"
-
-
-def extract_images_from_pdf(pdf_path, zoom_factor, temp_dir, log_func):
-    try:
-        log_func(f"开始处理文件: {pdf_path}")
-        pdf_doc = fitz.open(pdf_path)
-        zoom_matrix = fitz.Matrix(zoom_factor, zoom_factor)
-
-        # 创建一个字典用于存储页面的图片路径和对应的页码
-        images_with_page_num = []
-        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            futures = {
-                executor.submit(process_page, pdf_doc, page_num, zoom_matrix, temp_dir): page_num
-                for page_num in range(len(pdf_doc))}
-            for future in as_completed(futures):
-                result = future.result()
-                page_num = futures[future]
-                if result:
-                    # 将页码和图片路径一起存储
-                    images_with_page_num.append((page_num, result))
-                else:
-                    log_func(f"页面 {page_num} 处理失败")
-        log_func(f"文件处理完成: {pdf_path}")
-
-        # 按页码排序
-        images_with_page_num.sort(key=lambda x: x[0])
-
-        # 只返回图片路径的列表
-        return [img_path for _, img_path in images_with_page_num]
-    except Exception as e:
-        log_func(f"处理PDF失败: {e}")
-        return []
-
-
 class BatchConvertThread(QThread):
     update_progress = pyqtSignal(int)
     log_message = pyqtSignal(str)
     completed = pyqtSignal(dict)
 
-    def __init__(self, pdf_files, output_folder_path, zoom_factor, temp_dir, images_per_long):
+    def __init__(self, pdf_files, output_folder_path, zoom_factor, images_per_long, workers=DEFAULT_WORKERS,
+                 options=None, max_documents=DEFAULT_DOCUMENTS, cache=None, selection=None):
         super().__init__()
         self.pdf_files = pdf_files
         self.output_folder_path = output_folder_path
         self.zoom_factor = zoom_factor
-        self.temp_dir = temp_dir
         self.images_per_long = images_per_long
+        self.workers = workers
+        self.options = options
+        self.max_documents = max_documents
+        self.cache = cache
+        self.selection = selection
 
     def run(self):
-        total_files = len(self.pdf_files)
-        failed_files = []
-
-        for i, pdf_file in enumerate(self.pdf_files):
-            try:
-                # 长图文件名使用原PDF文件名
-                output_image_base_path = os.path.join(self.output_folder_path,
-                                                      os.path.splitext(os.path.basename(pdf_file))[0])
-
-                images = extract_images_from_pdf(pdf_file, self.zoom_factor, self.temp_dir, self.log_message.emit)
-                if images:
-                    concatenate_images_vertically(images, output_image_base_path, self.images_per_long)
-                    self.log_message.emit(f"文件转换成功: {pdf_file}")
-                else:
-                    raise ValueError("未生成图像")
-            except Exception as e:
-                failed_files.append(pdf_file)
-                self.log_message.emit(f"文件 {pdf_file} 转换失败: {e}")
-
-            progress_value = int((i + 1) / total_files * 100)
-            self.update_progress.emit(progress_value)
-
-        summary = {
-            "failed": failed_files,
-        }
-        self.completed.emit(summary)
+        def on_progress(done_pages, total_pages):
+            if total_pages:
+                self.update_progress.emit(int(done_pages / total_pages * 100))
+
+        summary = convert_batch(self.pdf_files, self.output_folder_path, self.zoom_factor, self.images_per_long,
+                                self.log_message.emit, self.workers, self.options, self.max_documents,
+                                on_progress=on_progress, cache=self.cache, selection=self.selection)
+        self.update_progress.emit(100)
+        self.log_message.emit(f"共 {summary.pages} 页，用时 {summary.seconds:.1f} 秒")
+        self.completed.emit(summary.to_dict())
 
 
 if __name__ == '__main__':
+    # 打包后的程序以 spawn 方式启动渲染进程时需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     ex = PDFToLongImageApp()
     ex.show()
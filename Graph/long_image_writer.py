@@ -0,0 +1,430 @@
+# long_image_writer.py
+"""
+长图输出：逐条写入页面图像，再由各格式的写入器编码。
+JPEG 与 WebP 受格式本身的尺寸限制，仍在内存中拼出画布后保存；
+PNG 与 TIFF 边写入边压缩，内存占用与长图总高度无关，整个文档可以输出为一个文件。
+编码在后台线程中进行，拼接线程可以继续处理下一页或下一张长图
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Type
+
+from PIL import Image, ImageChops
+
+FORMAT_JPEG = "jpg"
+FORMAT_WEBP = "webp"
+FORMAT_PNG = "png"
+FORMAT_TIFF = "tiff"
+
+SUBSAMPLING_OPTIONS = ("4:4:4", "4:2:2", "4:2:0")
+# 等待后台编码的整张画布数：一张在编码的同时拼接下一张，同时存在的画布不超过两张
+# （JPEG 满高 65500 像素的 RGB 画布约 500MB）
+ENCODE_WORKERS = 1
+MAX_PENDING_STRIPS = 2  # 逐条写入时等待后台压缩的条带数上限
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTER_UP = 2
+IDAT_CHUNK_SIZE = 1024 * 1024  # 压缩数据累积到该大小时写出一个 IDAT 块
+TIFF_ROWS_PER_STRIP = 64
+TIFF_MAX_SIZE = 2 ** 32 - 1  # 经典 TIFF 使用 32 位偏移
+
+
+@dataclass
+class OutputOptions:
+    """
+    :param format: 输出格式，见 WRITERS
+    :param quality: JPEG 与 WebP 的质量（1-100）
+    :param subsampling: JPEG 色度抽样，文字较多时 4:4:4 更清晰
+    :param progressive: 是否输出渐进式 JPEG
+    :param optimize: 是否为 JPEG 计算最优的哈夫曼表，文件略小、编码略慢
+    :param compress_level: PNG 与 TIFF 的 zlib 压缩级别（0-9）
+    :param grayscale: 以灰度渲染与输出，适合纯文字的 PDF，像素数据只有 RGB 的三分之一
+    """
+    format: str = FORMAT_JPEG
+    quality: int = 75
+    subsampling: str = "4:2:0"
+    progressive: bool = False
+    optimize: bool = True
+    compress_level: int = 6
+    grayscale: bool = False
+
+    @property
+    def mode(self) -> str:
+        return "L" if self.grayscale else "RGB"
+
+    @property
+    def max_height(self) -> Optional[int]:
+        return WRITERS[self.format].max_height
+
+
+class LongImageWriter:
+    """
+    长图写入器基类，按从上到下的顺序逐条写入，宽度不足的条带右侧补黑。
+    close() 可能只是把剩余的编码工作交给后台，wait() 返回后文件才写入完成
+    :param path: 输出路径
+    :param width: 长图宽度
+    :param height: 规划的长图高度，实际写入的行数可以更少（有页面失败时）
+    :param options: 输出选项
+    """
+    extension = ""
+    max_height: Optional[int] = None  # 单个文件的最大高度，None 表示不限
+
+    def __init__(self, path: str, width: int, height: int, options: OutputOptions) -> None:
+        self.path = path
+        self.width = width
+        self.height = height
+        self.options = options
+        self.mode = options.mode
+        self.rows = 0
+
+    def write(self, strip: Image.Image) -> None:
+        original = strip
+        if strip.mode != self.mode:
+            strip = strip.convert(self.mode)
+        if strip.width != self.width:
+            padded = Image.new(self.mode, (self.width, strip.height))
+            padded.paste(strip, (0, 0))
+            strip = padded
+        if strip is original and self._background:
+            # 调用方在 write 返回后会释放原图，后台编码需要自己的副本
+            strip = strip.copy()
+        self._write(strip)
+        self.rows += strip.height
+
+    @property
+    def _background(self) -> bool:
+        return False
+
+    def _write(self, strip: Image.Image) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def wait(self) -> None:
+        """等待后台编码完成，编码出错时在此抛出"""
+
+    def abort(self) -> None:
+        """放弃写入并释放资源，之后由调用方删除不完整的文件"""
+
+    def __enter__(self) -> "LongImageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CanvasWriter(LongImageWriter):
+    """
+    在内存中拼出整张画布，关闭时由 Pillow 一次编码保存
+    :param encoder: 提供时在该线程池中保存，close() 立即返回
+    """
+    extension = ".jpg"
+    max_height = 65500  # Pillow 能保存的最大尺寸
+
+    def __init__(self, path: str, width: int, height: int, options: OutputOptions,
+                 encoder: Optional[ThreadPoolExecutor] = None) -> None:
+        super().__init__(path, width, height, options)
+        self._canvas: Optional[Image.Image] = None
+        self._encoder = encoder
+        self._future: Optional[Future] = None
+
+    def _write(self, strip: Image.Image) -> None:
+        if self._canvas is None:
+            self._canvas = Image.new(self.mode, (self.width, self.height))
+        self._canvas.paste(strip, (0, self.rows))
+
+    def save_options(self) -> dict:
+        return {"quality": self.options.quality, "subsampling": self.options.subsampling,
+                "progressive": self.options.progressive, "optimize": self.options.optimize}
+
+    def _save(self, canvas: Image.Image) -> None:
+        try:
+            if self.rows < self.height:
+                # 有页面失败时裁掉画布底部的空白
+                with canvas.crop((0, 0, self.width, self.rows)) as cropped:
+                    cropped.save(self.path, **self.save_options())
+            else:
+                canvas.save(self.path, **self.save_options())
+        finally:
+            canvas.close()
+
+    def close(self) -> None:
+        if self._canvas is None:
+            return
+        canvas, self._canvas = self._canvas, None
+        if self._encoder:
+            self._future = self._encoder.submit(self._save, canvas)
+        else:
+            self._save(canvas)
+
+    def wait(self) -> None:
+        if self._future:
+            future, self._future = self._future, None
+            future.result()
+
+    def abort(self) -> None:
+        if self._canvas is not None:
+            self._canvas.close()
+            self._canvas = None
+        if self._future:
+            self._future.cancel()
+            self._future.exception()
+            self._future = None
+
+
+class WebpWriter(CanvasWriter):
+    extension = ".webp"
+    max_height = 16383  # WebP 格式的最大尺寸
+
+    def save_options(self) -> dict:
+        return {"quality": self.options.quality, "method": 4}
+
+
+class StreamWriter(LongImageWriter):
+    """逐条写入的格式共用：条带按顺序交给一个专用的后台线程压缩并写出，最多积压 MAX_PENDING_STRIPS 条"""
+
+    def __init__(self, path: str, width: int, height: int, options: OutputOptions,
+                 encoder: Optional[ThreadPoolExecutor] = None) -> None:
+        super().__init__(path, width, height, options)
+        # 条带之间有先后依赖，不能使用共享线程池，每个写入器一个线程
+        self._executor = ThreadPoolExecutor(max_workers=1) if encoder else None
+        self._futures: Deque[Future] = deque()
+        self._closed = False
+        self._file = None
+
+    @property
+    def _background(self) -> bool:
+        return self._executor is not None
+
+    def _submit(self, func: Callable, *args) -> None:
+        if self._executor is None:
+            func(*args)
+            return
+        self._futures.append(self._executor.submit(func, *args))
+        while len(self._futures) > MAX_PENDING_STRIPS:
+            self._futures.popleft().result()
+
+    def _write(self, strip: Image.Image) -> None:
+        self._submit(self._encode, strip)
+
+    def _encode(self, strip: Image.Image) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self.rows:
+            self._submit(self._finish)
+        if self._executor is None:
+            return
+        # 不等待后台线程，wait() 时再取结果
+        self._executor.shutdown(wait=False)
+
+    def wait(self) -> None:
+        try:
+            while self._futures:
+                self._futures.popleft().result()
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        self._closed = True
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        if self._executor:
+            # 等待正在执行的条带结束，之后才能安全地关闭文件
+            self._executor.shutdown(wait=True)
+        if self._file and not self._file.closed:
+            self._file.close()
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+class PngStripWriter(StreamWriter):
+    """
+    逐行压缩的 PNG：每行使用 Up 过滤（与上一行逐字节相减），由 ImageChops.subtract_modulo 在 C 层完成，
+    压缩数据达到 IDAT_CHUNK_SIZE 即写出。实际行数少于规划时结束前回写 IHDR 中的高度
+    """
+    extension = ".png"
+    max_height = 2 ** 31 - 1
+
+    def __init__(self, path: str, width: int, height: int, options: OutputOptions,
+                 encoder: Optional[ThreadPoolExecutor] = None) -> None:
+        super().__init__(path, width, height, options, encoder)
+        self._compressor = zlib.compressobj(options.compress_level)
+        self._pending = bytearray()
+        self._last_row: Optional[Image.Image] = None
+        self._encoded_rows = 0
+
+    def _ihdr(self, height: int) -> bytes:
+        color_type = 0 if self.mode == "L" else 2
+        return _png_chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, height, 8, color_type, 0, 0, 0))
+
+    def _encode(self, strip: Image.Image) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            self._file.write(PNG_SIGNATURE + self._ihdr(self.height))
+        # 上一行：条带第一行对应前一条带的最后一行，图像第一行对应全零
+        with strip:
+            above = Image.new(self.mode, strip.size)
+            if self._last_row is not None:
+                above.paste(self._last_row, (0, 0))
+            if strip.height > 1:
+                above.paste(strip.crop((0, 0, self.width, strip.height - 1)), (0, 1))
+            filtered = ImageChops.subtract_modulo(strip, above).tobytes()
+            self._last_row = strip.crop((0, strip.height - 1, self.width, strip.height))
+            self._encoded_rows += strip.height
+        stride = self.width * len(self.mode)
+        filter_byte = bytes([PNG_FILTER_UP])
+        data = b"".join(filter_byte + filtered[offset:offset + stride] for offset in range(0, len(filtered), stride))
+        self._pending += self._compressor.compress(data)
+        if len(self._pending) >= IDAT_CHUNK_SIZE:
+            self._file.write(_png_chunk(b"IDAT", bytes(self._pending)))
+            self._pending.clear()
+
+    def _finish(self) -> None:
+        try:
+            self._pending += self._compressor.flush()
+            self._file.write(_png_chunk(b"IDAT", bytes(self._pending)) + _png_chunk(b"IEND", b""))
+            if self._encoded_rows != self.height:
+                self._file.seek(len(PNG_SIGNATURE))
+                self._file.write(self._ihdr(self._encoded_rows))
+        finally:
+            self._file.close()
+
+
+class TiffStripWriter(StreamWriter):
+    """
+    分条带的 TIFF（Deflate 压缩）：条带数据依次写出，结束时在文件末尾写入 IFD 并回写其偏移
+    :raises ValueError: 文件超过经典 TIFF 的 4GB 上限时抛出
+    """
+    extension = ".tif"
+    max_height = 2 ** 32 - 1
+
+    def __init__(self, path: str, width: int, height: int, options: OutputOptions,
+                 encoder: Optional[ThreadPoolExecutor] = None) -> None:
+        super().__init__(path, width, height, options, encoder)
+        self._pending = bytearray()
+        self._offsets = []
+        self._byte_counts = []
+        self._encoded_rows = 0
+
+    def _encode(self, strip: Image.Image) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            self._file.write(b"II" + struct.pack("<HI", 42, 0))
+        with strip:
+            self._pending += strip.tobytes()
+            self._encoded_rows += strip.height
+        strip_size = TIFF_ROWS_PER_STRIP * self.width * len(self.mode)
+        while len(self._pending) >= strip_size:
+            self._write_strip(bytes(self._pending[:strip_size]))
+            del self._pending[:strip_size]
+
+    def _write_strip(self, raw: bytes) -> None:
+        data = zlib.compress(raw, self.options.compress_level)
+        self._offsets.append(self._file.tell())
+        self._byte_counts.append(len(data))
+        self._file.write(data)
+        if self._file.tell() > TIFF_MAX_SIZE:
+            raise ValueError(f"TIFF 文件超过 4GB 上限: {self.path}")
+
+    def _align(self) -> int:
+        if self._file.tell() % 2:
+            self._file.write(b"\0")
+        return self._file.tell()
+
+    def _finish(self) -> None:
+        try:
+            self._write_ifd()
+        finally:
+            self._file.close()
+
+    def _write_ifd(self) -> None:
+        if self._pending:
+            self._write_strip(bytes(self._pending))
+            self._pending.clear()
+        channels = len(self.mode)
+        if channels == 1:
+            bits_count, bits_value = 1, 8
+        else:
+            bits_count, bits_value = 3, self._align()
+            self._file.write(struct.pack("<3H", 8, 8, 8))
+        offsets_offset = self._align()
+        self._file.write(struct.pack(f"<{len(self._offsets)}I", *self._offsets))
+        counts_offset = self._file.tell()
+        self._file.write(struct.pack(f"<{len(self._byte_counts)}I", *self._byte_counts))
+        strip_count = len(self._offsets)
+        # (标签, 类型, 数量, 值或偏移)，类型 3 为 SHORT，4 为 LONG，标签必须升序
+        entries = [
+            (256, 4, 1, self.width),
+            (257, 4, 1, self._encoded_rows),
+            (258, 3, bits_count, bits_value),
+            (259, 3, 1, 8),  # Deflate
+            (262, 3, 1, 1 if channels == 1 else 2),  # BlackIsZero 灰度 / RGB
+            (273, 4, strip_count, offsets_offset if strip_count > 1 else self._offsets[0]),
+            (277, 3, 1, channels),
+            (278, 4, 1, TIFF_ROWS_PER_STRIP),
+            (279, 4, strip_count, counts_offset if strip_count > 1 else self._byte_counts[0]),
+            (284, 3, 1, 1),
+        ]
+        ifd_offset = self._align()
+        self._file.write(struct.pack("<H", len(entries)))
+        for tag, field_type, count, value in entries:
+            packed_value = struct.pack("<HH", value, 0) if field_type == 3 and count == 1 else struct.pack("<I", value)
+            self._file.write(struct.pack("<HHI", tag, field_type, count) + packed_value)
+        self._file.write(struct.pack("<I", 0))
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", ifd_offset))
+
+
+WRITERS: Dict[str, Type[LongImageWriter]] = {
+    FORMAT_JPEG: CanvasWriter,
+    FORMAT_WEBP: WebpWriter,
+    FORMAT_PNG: PngStripWriter,
+    FORMAT_TIFF: TiffStripWriter,
+}
+FORMAT_LABELS = {
+    FORMAT_JPEG: "JPEG（单张不超过 65500 像素，超出时分段）",
+    FORMAT_WEBP: "WebP（单张不超过 16383 像素，超出时分段）",
+    FORMAT_PNG: "PNG（逐行写入，不分段）",
+    FORMAT_TIFF: "TIFF（分条带写入，不分段）",
+}
+
+
+def open_writer(options: OutputOptions, output_base_path: str, width: int, height: int,
+                encoder: Optional[ThreadPoolExecutor] = None) -> LongImageWriter:
+    """
+    :param output_base_path: 不含扩展名的输出路径
+    :param encoder: 后台编码线程池，None 时在调用线程中同步编码
+    :raises ValueError: 格式不受支持时抛出
+    """
+    if options.format not in WRITERS:
+        raise ValueError(f"不支持的输出格式: {options.format}")
+    writer_class = WRITERS[options.format]
+    return writer_class(output_base_path + writer_class.extension, width, height, options, encoder)
+
+
+def remove_output(writer: LongImageWriter) -> None:
+    """删除写入失败时留下的不完整文件"""
+    if os.path.exists(writer.path):
+        os.remove(writer.path)
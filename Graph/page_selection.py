@@ -0,0 +1,69 @@
+# page_selection.py
+"""
+PDF 转长图的页面选择：页码范围表达式、每隔 N 页取一页的预览采样与低清晰度的缩略图模式。
+只有选中的页面会被计算尺寸、渲染和拼接
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+THUMBNAIL_ZOOM = 0.5  # 缩略图模式的缩放倍数，约为 36 DPI
+
+
+def parse_page_ranges(text: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    解析 "1-20,45,100-" 形式的页码范围表达式，页码从 1 开始，"-5" 表示 1-5，"100-" 表示第 100 页到最后一页
+    :return: [(起始页, 结束页)]，结束页为 None 表示到最后一页
+    :raises ValueError: 表达式无效时抛出
+    """
+    spans = []
+    for item in text.replace("，", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        start_text, dash, end_text = item.partition("-")
+        try:
+            start = int(start_text) if start_text.strip() else 1
+            end = (int(end_text) if end_text.strip() else None) if dash else start
+        except ValueError:
+            raise ValueError(f"无效的页码范围: {item}") from None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"无效的页码范围: {item}")
+        spans.append((start, end))
+    return spans
+
+
+@dataclass
+class PageSelection:
+    """
+    :param ranges: 页码范围表达式，如 "1-20,45,100-"，为空时选择全部页面
+    :param step: 在选中的页面中每隔 step 页取一页，用于快速预览
+    :param thumbnail: 缩略图模式，缩放倍数不超过 THUMBNAIL_ZOOM
+    """
+    ranges: str = ""
+    step: int = 1
+    thumbnail: bool = False
+    spans: List[Tuple[int, Optional[int]]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """:raises ValueError: 页码范围无效或 step 小于 1 时在打开任何文档之前抛出"""
+        if self.step < 1:
+            raise ValueError(f"采样间隔必须不小于 1: {self.step}")
+        self.spans = parse_page_ranges(self.ranges)
+
+    def zoom(self, zoom_factor: float) -> float:
+        return min(zoom_factor, THUMBNAIL_ZOOM) if self.thumbnail else zoom_factor
+
+    def pages(self, page_count: int) -> List[int]:
+        """
+        :param page_count: 文档页数
+        :return: 选中的页码（从 0 开始），按页码顺序排列且不重复，超出文档的部分被忽略
+        """
+        if not self.spans:
+            return list(range(0, page_count, self.step))
+        selected = set()
+        for start, end in self.spans:
+            selected.update(range(start - 1, min(end or page_count, page_count)))
+        return sorted(selected)[::self.step]
@@ -0,0 +1,217 @@
+# pdf2longimg_batch.py
+"""
+批量 PDF 转长图：与界面无关的批量接口，图形界面与命令行共用。
+多个文档同时处理，共用一个渲染进程池。
+在途页面与 JPEG、WebP 的整张画布共同受全局页数与内存上限约束，页数少的文档优先处理以尽早产出结果，进度按页数计算
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from long_image_writer import OutputOptions
+from page_selection import PageSelection
+from pdf2longimg_core import (MAX_SHARD_PAGES, PageResult, RenderBudget, canvas_bytes, convert_pdf, page_sizes,
+                              plan_segments, resolve_workers)
+from render_cache import RenderCache
+
+DEFAULT_DOCUMENTS = 4  # 同时处理的文档数
+DEFAULT_MAX_PENDING_BYTES = 1024 ** 3  # 所有文档在途页面的像素数据与画布的上限
+
+ProgressCallback = Callable[[int, int], None]  # (已完成页数, 总页数)
+DocumentCallback = Callable[[str, List[str], Optional[str]], None]  # (PDF 路径, 生成的长图, 错误信息)
+
+
+@dataclass
+class DocumentJob:
+    """
+    :param pdf_path: PDF 路径
+    :param output_base_path: 输出路径前缀
+    :param pages: 选中的页码
+    :param sizes: 选中页面渲染结果的 (宽, 高)
+    """
+    pdf_path: str
+    output_base_path: str
+    pages: List[int]
+    sizes: List[Tuple[int, int]]
+
+    @property
+    def pixels(self) -> int:
+        return sum(width * height for width, height in self.sizes)
+
+
+@dataclass
+class BatchSummary:
+    """
+    :param failed: 转换失败的文件
+    :param outputs: 生成的长图
+    :param pages: 总页数
+    :param seconds: 用时
+    """
+    failed: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    pages: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {"failed": self.failed, "outputs": self.outputs, "pages": self.pages, "seconds": self.seconds}
+
+
+def output_base_path(pdf_path: str, output_folder_path: str) -> str:
+    # 长图文件名使用原PDF文件名
+    return os.path.join(output_folder_path, os.path.splitext(os.path.basename(pdf_path))[0])
+
+
+def _is_pattern(path: str) -> bool:
+    return any(char in path for char in "*?[")
+
+
+def collect_pdfs(inputs: Iterable[str], recursive: bool = True) -> List[str]:
+    """
+    展开输入中的文件、文件夹与通配符（支持 **），去掉重复的文件
+    :param inputs: PDF 文件、文件夹或通配符
+    :param recursive: 是否递归查找文件夹中的 PDF
+    :return: 按输入顺序排列的 PDF 路径；直接指定的文件即使不存在也保留，以便在转换时报告失败
+    """
+    pdf_files = []
+    seen = set()
+
+    def add(path: str) -> None:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            pdf_files.append(path)
+
+    for item in inputs:
+        paths = sorted(glob.glob(item, recursive=True)) if _is_pattern(item) else [item]
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, filenames in os.walk(path):
+                    dirs.sort()
+                    for filename in sorted(filenames):
+                        if filename.lower().endswith(".pdf"):
+                            add(os.path.join(root, filename))
+                    if not recursive:
+                        break
+            elif not _is_pattern(item) or path.lower().endswith(".pdf"):
+                add(path)
+    return pdf_files
+
+
+def plan_jobs(pdf_files: Sequence[str], output_folder_path: str, zoom_factor: float,
+              on_error: Callable[[str, str], None], selection: Optional[PageSelection] = None) -> List[DocumentJob]:
+    """
+    读取各文档选中页面的尺寸并按页数、像素数从少到多排序
+    :param on_error: 无法打开或没有选中任何页面的文件以 (路径, 错误信息) 报告
+    :param selection: 页面选择，zoom_factor 应已按缩略图模式换算
+    """
+    jobs = []
+    for pdf_file in pdf_files:
+        try:
+            pages, sizes = page_sizes(pdf_file, zoom_factor, selection)
+        except Exception as e:
+            on_error(pdf_file, str(e))
+            continue
+        jobs.append(DocumentJob(pdf_file, output_base_path(pdf_file, output_folder_path), pages, sizes))
+    jobs.sort(key=lambda job: (len(job.sizes), job.pixels))
+    return jobs
+
+
+def convert_batch(pdf_files: Sequence[str], output_folder_path: str, zoom_factor: float, images_per_long: int,
+                  log_func: Callable[[str], None], workers: Optional[int] = None,
+                  options: Optional[OutputOptions] = None,
+                  max_documents: int = DEFAULT_DOCUMENTS, max_pending_pages: Optional[int] = None,
+                  max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+                  on_progress: Optional[ProgressCallback] = None, cache: Optional[RenderCache] = None,
+                  on_document: Optional[DocumentCallback] = None,
+                  selection: Optional[PageSelection] = None) -> BatchSummary:
+    """
+    批量转换，log_func、on_progress 与 on_document 会在多个线程中调用
+    :param workers: 渲染进程数，为 1 时逐个文档在当前进程中渲染
+    :param options: 输出选项，None 时使用默认的 JPEG
+    :param max_documents: 同时处理的文档数
+    :param max_pending_pages: 所有文档在途页数上限，None 时为 2 * 进程数 * MAX_SHARD_PAGES
+    :param max_pending_bytes: 所有文档在途页面的像素与画布字节数上限。每个文档开始渲染前预留其画布峰值
+        （见 canvas_bytes），实际占用不超过该值加上一个分片的像素数据，或单个文档的画布预留
+    :param on_progress: 开始时以 (0, 总页数) 调用一次，之后每完成一页调用一次
+    :param cache: 渲染缓存
+    :param on_document: 每个文档转换完成或失败后调用
+    :param selection: 页面选择，只渲染选中的页面，进度按选中的页数计算；None 时为全部页面
+    """
+    start = time.perf_counter()
+    summary = BatchSummary()
+    options = options or OutputOptions()
+
+    def fail(pdf_file: str, error: str) -> None:
+        summary.failed.append(pdf_file)
+        log_func(f"文件 {pdf_file} 转换失败: {error}")
+        if on_document:
+            on_document(pdf_file, [], error)
+
+    if selection:
+        zoom_factor = selection.zoom(zoom_factor)
+    jobs = plan_jobs(pdf_files, output_folder_path, zoom_factor, fail, selection)
+    summary.pages = sum(len(job.sizes) for job in jobs)
+    workers = resolve_workers(workers)
+    done_pages = 0
+    lock = threading.Lock()
+
+    def advance(pages: int) -> None:
+        nonlocal done_pages
+        with lock:
+            done_pages += pages
+            current = done_pages
+        if on_progress:
+            on_progress(current, summary.pages)
+
+    def run_job(job: DocumentJob, executor: Optional[ProcessPoolExecutor], budget: Optional[RenderBudget]) -> None:
+        converted = 0
+
+        def on_page(result: PageResult) -> None:
+            nonlocal converted
+            converted += 1
+            advance(1)
+
+        # 画布在渲染开始前一次预留，预留时文档不持有任何在途页面
+        reserved = canvas_bytes(plan_segments(job.sizes, images_per_long, options.max_height), options) if budget else 0
+        if reserved:
+            budget.reserve(reserved)
+        try:
+            outputs = convert_pdf(job.pdf_path, job.output_base_path, zoom_factor, images_per_long, log_func,
+                                  workers, options, job.sizes, executor, budget, on_page, cache, selection, job.pages)
+            if not outputs:
+                raise ValueError("未生成图像")
+        except Exception as e:
+            fail(job.pdf_path, str(e))
+            # 失败文档剩余的页数也计入进度
+            advance(len(job.sizes) - converted)
+            return
+        finally:
+            if reserved:
+                budget.release(0, reserved)
+        summary.outputs.extend(outputs)
+        log_func(f"文件转换成功: {job.pdf_path}")
+        if on_document:
+            on_document(job.pdf_path, outputs, None)
+
+    advance(0)
+    if workers == 1:
+        # 单进程时在当前进程渲染，PyMuPDF 不能在多个线程中同时使用，文档只能逐个处理
+        for job in jobs:
+            run_job(job, None, None)
+    else:
+        budget = RenderBudget(max_pending_pages or 2 * workers * MAX_SHARD_PAGES, max_pending_bytes)
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                ThreadPoolExecutor(max_workers=max(1, max_documents)) as documents:
+            # 线程池按提交顺序取任务，页数少的文档先开始
+            futures = [documents.submit(run_job, job, executor, budget) for job in jobs]
+            for future in as_completed(futures):
+                future.result()
+    summary.seconds = time.perf_counter() - start
+    return summary
@@ -0,0 +1,207 @@
+# pdf2longimg_cli.py
+"""
+PDF 转长图的命令行版本，不依赖 PyQt5，可在服务器或定时任务中使用，与图形界面调用同一个批量接口
+进度以 JSON Lines 事件输出到标准输出，每行一个事件，包含页/秒
+
+用法:
+    python pdf2longimg_cli.py convert a.pdf docs/ "scans/**/*.pdf" -o out --zoom 2 --pages-per-image 10
+    python pdf2longimg_cli.py convert docs/ -o out --format png --grayscale --jobs 8 --cache
+    python pdf2longimg_cli.py convert book.pdf -o out --pages 1-20,45,100- --every 5 --thumbnail
+    python pdf2longimg_cli.py bench docs/ --jobs 1,2,4,8 --repeat 3
+
+事件: start（计划规模）、file（每个文档完成或失败）、progress（按 --interval 限频）、log（--verbose 时）、
+      run（bench 的每次运行）、done
+退出码: 0 全部成功; 1 部分文件失败; 2 参数或读写错误; 130 被中断
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+from typing import List, Optional, TextIO
+
+from long_image_writer import SUBSAMPLING_OPTIONS, WRITERS, OutputOptions
+from page_selection import THUMBNAIL_ZOOM, PageSelection
+from pdf2longimg_batch import DEFAULT_DOCUMENTS, collect_pdfs, convert_batch
+from pdf2longimg_core import DEFAULT_WORKERS
+from render_cache import CACHE_DIR, DEFAULT_MAX_BYTES, RenderCache
+
+# 与整理工具命令行共用的事件输出位于 Other/event_stream.py，由 _paths 加入导入路径
+import _paths  # noqa: F401
+from event_stream import EventStream
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+class ProgressEmitter(EventStream):
+    """
+    PDF 转换的进度事件，按页计数
+    :param stream: 输出流
+    :param interval: 两次 progress 事件的最小间隔（秒）
+    :param verbose: 是否把转换日志作为 log 事件输出
+    """
+
+    def __init__(self, stream: TextIO, interval: float = 1.0, verbose: bool = False) -> None:
+        super().__init__(stream, interval)
+        self.verbose = verbose
+        self.pages = 0
+        self.total_pages: Optional[int] = None
+
+    def rates(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "pages": self.pages,
+            "total_pages": self.total_pages,
+            "elapsed": round(elapsed, 3),
+            "pages_per_sec": round(self.pages / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def progress(self, done_pages: int, total_pages: int) -> None:
+        """convert_batch 的 on_progress 回调，到达间隔或全部完成时输出 progress 事件"""
+        with self._lock:
+            self.pages, self.total_pages = done_pages, total_pages
+            due = self._due(force=done_pages == total_pages)
+        if due:
+            self.emit("progress", **self.rates())
+
+    def document(self, pdf_path: str, outputs: List[str], error: Optional[str]) -> None:
+        self.emit("file", path=pdf_path, outputs=outputs, error=error)
+
+    def log(self, message: str) -> None:
+        if self.verbose:
+            self.emit("log", message=message)
+
+
+def build_options(args) -> OutputOptions:
+    return OutputOptions(format=args.format, quality=args.quality, subsampling=args.subsampling,
+                         progressive=args.progressive, optimize=not args.no_optimize,
+                         compress_level=args.compress_level, grayscale=args.grayscale)
+
+
+def build_selection(args) -> PageSelection:
+    """:raises ValueError: 页码范围无效时抛出"""
+    return PageSelection(args.pages, args.every, args.thumbnail)
+
+
+def find_inputs(args) -> List[str]:
+    """:raises ValueError: 没有找到 PDF 文件时抛出"""
+    pdf_files = collect_pdfs(args.inputs, not args.no_recursive)
+    if not pdf_files:
+        raise ValueError("没有找到PDF文件")
+    return pdf_files
+
+
+def run_convert_command(args, emitter: ProgressEmitter) -> int:
+    selection = build_selection(args)
+    pdf_files = find_inputs(args)
+    os.makedirs(args.output, exist_ok=True)
+    cache = RenderCache(args.cache_dir, args.cache_size * 1024 ** 2) if args.cache else None
+    emitter.start("convert", files=len(pdf_files), output=args.output, zoom=selection.zoom(args.zoom),
+                  pages_per_image=args.pages_per_image, format=args.format, jobs=args.jobs,
+                  page_ranges=args.pages, every=args.every)
+    summary = convert_batch(pdf_files, args.output, args.zoom, args.pages_per_image, emitter.log, args.jobs,
+                            build_options(args), args.documents, on_progress=emitter.progress, cache=cache,
+                            on_document=emitter.document, selection=selection)
+    emitter.done(failed=summary.failed, outputs=summary.outputs)
+    return EXIT_FAILED if summary.failed else EXIT_OK
+
+
+def parse_jobs(text: str) -> List[int]:
+    """将 "1,2,4" 解析为进程数列表"""
+    jobs = [int(item) for item in text.split(",") if item.strip()]
+    if not jobs or min(jobs) < 1:
+        raise argparse.ArgumentTypeError(f"无效的进程数: {text}")
+    return jobs
+
+
+def run_bench_command(args, emitter: ProgressEmitter) -> int:
+    """
+    以不同进程数重复转换同一批文件，输出到临时文件夹后删除，不使用渲染缓存。
+    每次运行输出一个 run 事件，done 事件给出各进程数的最佳页/秒
+    """
+    selection = build_selection(args)
+    pdf_files = find_inputs(args)
+    emitter.start("bench", files=len(pdf_files), zoom=selection.zoom(args.zoom), pages_per_image=args.pages_per_image,
+                  format=args.format, jobs=args.jobs, repeat=args.repeat, page_ranges=args.pages, every=args.every)
+    best = {}
+    failed = False
+    for jobs in args.jobs:
+        for run in range(args.repeat):
+            with tempfile.TemporaryDirectory(prefix="pdf2longimg_bench_") as output_folder_path:
+                summary = convert_batch(pdf_files, output_folder_path, args.zoom, args.pages_per_image,
+                                        emitter.log, jobs, build_options(args), args.documents,
+                                        selection=selection)
+            pages_per_sec = summary.pages / summary.seconds if summary.seconds else 0.0
+            failed = failed or bool(summary.failed)
+            emitter.emit("run", jobs=jobs, run=run + 1, pages=summary.pages, seconds=round(summary.seconds, 3),
+                         pages_per_sec=round(pages_per_sec, 2), failed=summary.failed)
+            best[jobs] = max(best.get(jobs, 0.0), pages_per_sec)
+    emitter.emit("done", best_pages_per_sec={str(jobs): round(rate, 2) for jobs, rate in best.items()})
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="PDF 转长图命令行版本（JSON Lines 进度输出）")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="+", help="PDF 文件、文件夹或通配符（支持 **）")
+    common.add_argument("--no-recursive", action="store_true", help="不查找文件夹的子文件夹")
+    common.add_argument("--zoom", type=float, default=2.0, help="缩放倍数")
+    common.add_argument("--pages-per-image", type=int, default=10, help="每张长图包含的页数，0 表示全部页面")
+    common.add_argument("--pages", default="", help="页码范围，如 1-20,45,100-（从 1 开始），默认全部页面")
+    common.add_argument("--every", type=int, default=1, help="在选中的页面中每隔 N 页取一页，用于快速预览")
+    common.add_argument("--thumbnail", action="store_true",
+                        help=f"缩略图模式，缩放倍数不超过 {THUMBNAIL_ZOOM}")
+    common.add_argument("--format", choices=list(WRITERS), default=OutputOptions.format, help="输出格式")
+    common.add_argument("--quality", type=int, default=OutputOptions.quality, help="JPEG 与 WebP 的质量（1-100）")
+    common.add_argument("--subsampling", choices=SUBSAMPLING_OPTIONS, default=OutputOptions.subsampling,
+                        help="JPEG 色度抽样")
+    common.add_argument("--progressive", action="store_true", help="输出渐进式 JPEG")
+    common.add_argument("--no-optimize", action="store_true", help="不计算最优哈夫曼表，JPEG 编码稍快、文件稍大")
+    common.add_argument("--compress-level", type=int, default=OutputOptions.compress_level,
+                        help="PNG 与 TIFF 的压缩级别（0-9）")
+    common.add_argument("--grayscale", action="store_true", help="以灰度渲染与输出")
+    common.add_argument("--documents", type=int, default=DEFAULT_DOCUMENTS, help="同时处理的文档数")
+    common.add_argument("--interval", type=float, default=1.0, help="progress 事件的最小间隔（秒）")
+    common.add_argument("--verbose", "-v", action="store_true", help="把转换日志作为 log 事件输出")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", parents=[common], help="批量转换为长图")
+    convert.add_argument("--output", "-o", required=True, help="保存长图的文件夹，不存在时创建")
+    convert.add_argument("--jobs", "-j", type=int, default=DEFAULT_WORKERS, help="渲染进程数")
+    convert.add_argument("--cache", action="store_true", help="使用磁盘渲染缓存")
+    convert.add_argument("--cache-dir", default=CACHE_DIR, help="渲染缓存目录")
+    convert.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                         help="渲染缓存大小上限（MB）")
+    convert.set_defaults(func=run_convert_command)
+
+    bench = subparsers.add_parser("bench", parents=[common], help="测量不同进程数下的转换速度（页/秒）")
+    bench.add_argument("--jobs", "-j", type=parse_jobs, default=[DEFAULT_WORKERS],
+                       help="逗号分隔的进程数，例如 1,2,4,8")
+    bench.add_argument("--repeat", type=int, default=1, help="每个进程数重复运行的次数，取最快的一次")
+    bench.set_defaults(func=run_bench_command)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    emitter = ProgressEmitter(sys.stdout, args.interval, args.verbose)
+    try:
+        return args.func(args, emitter)
+    except KeyboardInterrupt:
+        emitter.emit("interrupted", **emitter.rates())
+        return EXIT_INTERRUPTED
+    except (OSError, ValueError) as e:
+        emitter.emit("error", error=str(e))
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
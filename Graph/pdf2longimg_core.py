@@ -0,0 +1,468 @@
+# pdf2longimg_core.py
+"""
+PDF 转长图核心：与界面无关的页面渲染与拼接。
+PyMuPDF 的 Document 不能在多个线程间共享，因此把页码范围分片交给进程池，
+每个工作进程自行打开文档，结果按页码顺序返回，单页失败不影响其他页面。
+渲染结果以原始像素直接交给长图写入器，不经过临时图片文件
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from long_image_writer import (ENCODE_WORKERS, FORMAT_JPEG, WRITERS, CanvasWriter, LongImageWriter, OutputOptions,
+                               open_writer, remove_output)
+from page_selection import PageSelection
+from render_cache import COLORSPACE_GRAY, COLORSPACE_RGB, RenderCache, document_hash, render_cached
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+SHARDS_PER_WORKER = 4  # 每个进程分到的分片数，分片越小负载越均衡，但打开文档的次数越多
+MIN_SHARD_PAGES = 2  # 每个分片的最少页数，避免为一页重复打开文档
+MAX_SHARD_PAGES = 8  # 每个分片的最多页数，分片的像素数据整体返回，限制在途页面占用的内存
+
+
+@dataclass
+class PageResult:
+    """
+    :param page_num: 页码（从 0 开始）
+    :param width: 渲染结果的宽度
+    :param height: 渲染结果的高度
+    :param samples: 像素数据，失败时为 None
+    :param error: 错误信息
+    :param channels: 每像素通道数，RGB 为 3，灰度为 1
+    """
+    page_num: int
+    width: int = 0
+    height: int = 0
+    samples: Optional[bytes] = None
+    error: Optional[str] = None
+    channels: int = 3
+
+
+@dataclass
+class Segment:
+    """
+    一张输出长图
+    :param suffix: 文件名后缀，如 _part1、_part1_sub2
+    :param positions: 包含的页面在页面序列中的位置
+    :param width: 画布宽度
+    :param height: 画布高度
+    """
+    suffix: str
+    positions: List[int]
+    width: int
+    height: int
+
+
+class RenderBudget:
+    """
+    多个文档共享的内存额度：已提交渲染但尚未被拼接取走的页数与像素字节数，以及各文档预留的画布字节数。
+    单个分片超过上限时，在没有其他在途页面的情况下仍然放行；单个文档的画布超过上限时，在额度为空时放行，
+    避免永远无法开始。因此实际占用不超过 max_bytes 加上一个分片的像素数据，或单个文档的画布预留
+    :param max_pages: 在途页数上限
+    :param max_bytes: 在途像素与画布的字节数上限
+    """
+
+    def __init__(self, max_pages: int, max_bytes: int) -> None:
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.pages = 0
+        self.bytes = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, pages: int, size: int) -> bool:
+        if not self.pages:
+            return True
+        return self.pages + pages <= self.max_pages and self.bytes + size <= self.max_bytes
+
+    def acquire(self, pages: int, size: int, block: bool = True) -> bool:
+        with self._condition:
+            if block:
+                self._condition.wait_for(lambda: self._fits(pages, size))
+            elif not self._fits(pages, size):
+                return False
+            self.pages += pages
+            self.bytes += size
+            return True
+
+    def reserve(self, size: int) -> None:
+        """
+        为一个文档预留画布字节数，只能在该文档不持有任何额度时调用，用完后以 release(0, size) 归还。
+        等待的文档不持有额度，持有额度的文档总能继续处理并归还，不会互相等死
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self.bytes or self.bytes + size <= self.max_bytes)
+            self.bytes += size
+
+    def release(self, pages: int, size: int) -> None:
+        with self._condition:
+            self.pages -= pages
+            self.bytes -= size
+            self._condition.notify_all()
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    return max(1, workers or DEFAULT_WORKERS)
+
+
+def shard_pages(page_count: int, workers: int) -> List[range]:
+    """
+    把 [0, page_count) 切分为连续的页码范围
+    :param page_count: 总页数
+    :param workers: 进程数
+    :return: 按页码顺序排列的分片
+    """
+    if page_count <= 0:
+        return []
+    shard_size = min(max(page_count // (workers * SHARDS_PER_WORKER), MIN_SHARD_PAGES), MAX_SHARD_PAGES)
+    shard_count = -(-page_count // shard_size)
+    size, extra = divmod(page_count, shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(range(start, end))
+        start = end
+    return shards
+
+
+def render_page(pdf_doc: fitz.Document, page_num: int, zoom_factor: float, cache: Optional[RenderCache] = None,
+                doc_hash: Optional[str] = None, colorspace: str = COLORSPACE_RGB) -> PageResult:
+    page = render_cached(pdf_doc, page_num, zoom_factor, colorspace, cache, doc_hash)
+    return PageResult(page_num, page.width, page.height, page.samples, channels=page.channels)
+
+
+def render_shard(pdf_path: str, pages: Sequence[int], zoom_factor: float, cache: Optional[RenderCache] = None,
+                 doc_hash: Optional[str] = None, colorspace: str = COLORSPACE_RGB) -> List[PageResult]:
+    """
+    在工作进程中执行：单独打开文档并渲染一个分片，提供缓存时先查缓存
+    :return: 分片内各页的结果，按页码顺序排列
+    """
+    results = []
+    try:
+        pdf_doc = fitz.open(pdf_path)
+    except Exception as e:
+        return [PageResult(page_num, error=f"打开文档失败: {e}") for page_num in pages]
+    with pdf_doc:
+        for page_num in pages:
+            try:
+                results.append(render_page(pdf_doc, page_num, zoom_factor, cache, doc_hash, colorspace))
+            except Exception as e:
+                results.append(PageResult(page_num, error=str(e)))
+    return results
+
+
+def page_sizes(pdf_path: str, zoom_factor: float,
+               selection: Optional[PageSelection] = None) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """
+    不渲染页面，按页面选择得到要渲染的页码，并按页面尺寸与缩放倍数计算其渲染结果的 (宽, 高)，
+    与 get_pixmap 的取整方式一致
+    :param selection: 页面选择，None 时为全部页面；缩略图模式的缩放倍数由调用方换算
+    :return: (页码, 各页的 (宽, 高))
+    :raises ValueError: 页面选择不包含文档的任何页面时抛出
+    :raises Exception: 无法打开文档时抛出
+    """
+    zoom_matrix = fitz.Matrix(zoom_factor, zoom_factor)
+    with fitz.open(pdf_path) as pdf_doc:
+        pages = selection.pages(len(pdf_doc)) if selection else list(range(len(pdf_doc)))
+        if not pages and len(pdf_doc):
+            raise ValueError(f"页码范围 \"{selection.ranges}\" 不包含任何页面（共 {len(pdf_doc)} 页）")
+        sizes = []
+        for page_num in pages:
+            rect = pdf_doc[page_num].rect.transform(zoom_matrix).round()
+            sizes.append((rect.width, rect.height))
+        return pages, sizes
+
+
+def render_pages(pdf_path: str, zoom_factor: float, sizes: Sequence[Tuple[int, int]], workers: Optional[int] = None,
+                 executor: Optional[ProcessPoolExecutor] = None, budget: Optional[RenderBudget] = None,
+                 cache: Optional[RenderCache] = None, doc_hash: Optional[str] = None,
+                 colorspace: str = COLORSPACE_RGB, pages: Optional[Sequence[int]] = None) -> Iterator[PageResult]:
+    """
+    渲染文档的选中页面，按页码顺序逐页返回结果。
+    在途的分片不超过进程数加一，未取走的像素数据约为 (进程数 + 1) * MAX_SHARD_PAGES 页；
+    提供 budget 时另受其全局上限约束，页面被调用方取走并处理完后归还额度
+    :param pdf_path: PDF 路径
+    :param zoom_factor: 缩放倍数
+    :param sizes: 选中页面渲染结果的 (宽, 高)，见 page_sizes
+    :param workers: 进程数，None 时使用 CPU 核数，为 1 时在当前进程中渲染
+    :param executor: 已有的进程池，提供时不再新建，可在多个文档间复用以省去进程启动开销
+    :param budget: 多个文档共享的在途页面额度
+    :param cache: 渲染缓存
+    :param doc_hash: 文档内容哈希，与 cache 一起提供时才使用缓存
+    :param colorspace: 渲染的色彩空间，见 render_cache.COLORSPACES
+    :param pages: 选中页面的页码，与 sizes 一一对应，None 时为全部页面
+    """
+    workers = resolve_workers(workers)
+    if pages is None:
+        pages = range(len(sizes))
+    # 分片按选中页面的位置切分，再换算为页码交给工作进程
+    shards = deque(pages[shard.start:shard.stop] for shard in shard_pages(len(sizes), workers))
+    channels = 1 if colorspace == COLORSPACE_GRAY else 3
+    if workers == 1 and executor is None:
+        for shard in shards:
+            results = render_shard(pdf_path, shard, zoom_factor, cache, doc_hash, colorspace)
+            results.reverse()
+            while results:
+                yield results.pop()
+        return
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(shards) or 1))
+    pending: Deque[Future] = deque()
+    held_pages = held_bytes = 0
+    submitted = returned = 0  # 已提交、已返回的页面在选中页面中的位置
+
+    def submit(block: bool) -> None:
+        # 只在不持有任何额度时阻塞等待，持有额度的文档总能继续处理并归还，多个文档之间不会互相等死
+        nonlocal held_pages, held_bytes, submitted
+        while shards and len(pending) <= workers:
+            shard = shards[0]
+            size = sum(width * height * channels for width, height in sizes[submitted:submitted + len(shard)])
+            if budget and not budget.acquire(len(shard), size, block and not pending and not held_pages):
+                return
+            shards.popleft()
+            submitted += len(shard)
+            held_pages += len(shard)
+            held_bytes += size
+            pending.append(executor.submit(render_shard, pdf_path, shard, zoom_factor, cache, doc_hash, colorspace))
+
+    try:
+        # 逐步提交分片，按提交顺序取结果即为页码顺序
+        submit(block=True)
+        while pending:
+            results = pending.popleft().result()
+            submit(block=False)
+            # 逐页取出，调用方处理完一页后该页的像素数据即可释放
+            results.reverse()
+            while results:
+                result = results.pop()
+                yield result
+                size = sizes[returned][0] * sizes[returned][1] * channels
+                returned += 1
+                held_pages -= 1
+                held_bytes -= size
+                if budget:
+                    budget.release(1, size)
+            submit(block=True)
+    finally:
+        for future in pending:
+            future.cancel()
+        if budget and held_pages:
+            budget.release(held_pages, held_bytes)
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def plan_segments(sizes: Sequence[Tuple[int, int]], images_per_long: int,
+                  max_height: Optional[int] = WRITERS[FORMAT_JPEG].max_height) -> List[Segment]:
+    """
+    规划输出长图：每 images_per_long 页一张，总高度超过 max_height 时再拆分为多张
+    :param sizes: 各页的 (宽, 高)
+    :param images_per_long: 每张长图的页数，不大于 0 时所有页面拼为一张
+    :param max_height: 单个文件的最大高度，None 表示不限
+    :return: 按页面顺序排列的输出长图
+    """
+    segments = []
+    images_per_long = images_per_long if images_per_long > 0 else max(len(sizes), 1)
+    for part, start in enumerate(range(0, len(sizes), images_per_long), 1):
+        positions = list(range(start, min(start + images_per_long, len(sizes))))
+        if max_height is None or sum(sizes[p][1] for p in positions) <= max_height:
+            groups = [positions]
+        else:
+            groups, current, height = [], [], 0
+            for p in positions:
+                if current and height + sizes[p][1] > max_height:
+                    groups.append(current)
+                    current, height = [], 0
+                current.append(p)
+                height += sizes[p][1]
+            groups.append(current)
+        for sub_part, group in enumerate(groups, 1):
+            suffix = f"_part{part}" if len(groups) == 1 else f"_part{part}_sub{sub_part}"
+            segments.append(Segment(suffix, group, max(sizes[p][0] for p in group), sum(sizes[p][1] for p in group)))
+    return segments
+
+
+def canvas_bytes(segments: Sequence[Segment], options: Optional[OutputOptions] = None) -> int:
+    """
+    整张画布输出格式（JPEG、WebP）下一个文档同时占用的画布字节数峰值：
+    正在拼接的一张加上等待编码的 ENCODE_WORKERS 张；逐条写入的格式返回 0
+    """
+    options = options or OutputOptions()
+    if not issubclass(WRITERS[options.format], CanvasWriter):
+        return 0
+    channels = 1 if options.grayscale else 3
+    sizes = [segment.width * segment.height * channels for segment in segments]
+    window = ENCODE_WORKERS + 1
+    return max((sum(sizes[i:i + window]) for i in range(max(len(sizes) - window + 1, 1))), default=0)
+
+
+def _write_segment(writer: LongImageWriter, images: Iterator[Optional[Image.Image]]) -> None:
+    """依次写入一张长图的各页，images 中的 None 表示该页失败被跳过；出错时删除不完整的文件"""
+    try:
+        with writer:
+            for img in images:
+                if img is not None:
+                    with img:
+                        writer.write(img)
+    except BaseException:
+        remove_output(writer)
+        raise
+
+
+class _EncodeQueue:
+    """
+    等待后台编码完成的长图，最多积压 ENCODE_WORKERS 张，超出时等待最早的一张，
+    同时存在的画布最多为正在编码的 ENCODE_WORKERS 张加上正在拼接的一张
+    """
+
+    def __init__(self) -> None:
+        self.encoder = ThreadPoolExecutor(max_workers=ENCODE_WORKERS)
+        self.output_paths: List[str] = []
+        self._pending: Deque[LongImageWriter] = deque()
+
+    def add(self, writer: LongImageWriter) -> None:
+        self._pending.append(writer)
+        while len(self._pending) > ENCODE_WORKERS:
+            self._finish(self._pending.popleft())
+
+    def _finish(self, writer: LongImageWriter) -> None:
+        try:
+            writer.wait()
+        except BaseException:
+            remove_output(writer)
+            raise
+        if writer.rows:
+            self.output_paths.append(writer.path)
+
+    def __enter__(self) -> "_EncodeQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                while self._pending:
+                    self._finish(self._pending.popleft())
+        finally:
+            for writer in self._pending:
+                writer.abort()
+                remove_output(writer)
+            self.encoder.shutdown(wait=True)
+
+
+def stitch_pages(results: Iterable[PageResult], segments: Sequence[Segment], output_base_path: str,
+                 log_func: Callable[[str], None], options: Optional[OutputOptions] = None,
+                 on_page: Optional[Callable[[PageResult], None]] = None) -> List[str]:
+    """
+    按规划把渲染结果依次写入长图，每页写入后立即释放其像素数据；
+    编码在后台线程中进行，期间继续取下一页
+    :param results: 按页面顺序排列的渲染结果，数量与规划的页面数一致
+    :param options: 输出选项，None 时使用默认的 JPEG
+    :param on_page: 每页写入（或失败跳过）后调用
+    :return: 保存的长图路径
+    """
+    options = options or OutputOptions()
+    results = iter(results)
+
+    def page_images(segment: Segment) -> Iterator[Optional[Image.Image]]:
+        for _ in segment.positions:
+            result = next(results)
+            if result.error:
+                log_func(f"页面 {result.page_num + 1} 处理失败: {result.error}")
+                yield None
+            else:
+                mode = "L" if result.channels == 1 else "RGB"
+                yield Image.frombuffer(mode, (result.width, result.height), result.samples, "raw", mode, 0, 1)
+            if on_page:
+                on_page(result)
+
+    with _EncodeQueue() as queue:
+        for segment in segments:
+            writer = open_writer(options, output_base_path + segment.suffix, segment.width, segment.height,
+                                 queue.encoder)
+            _write_segment(writer, page_images(segment))
+            queue.add(writer)
+    return queue.output_paths
+
+
+def image_sizes(image_paths: Sequence[str]) -> List[Tuple[int, int]]:
+    """只读取文件头获得各图片的 (宽, 高)，不解码像素"""
+    sizes = []
+    for image_path in image_paths:
+        with Image.open(image_path) as img:
+            sizes.append(img.size)
+    return sizes
+
+
+def concatenate_images_vertically(image_paths: Sequence[str], output_base_path: str, images_per_long: int,
+                                  remove_inputs: bool = False, options: Optional[OutputOptions] = None) -> List[str]:
+    """
+    把已有的图片文件拼接为长图：尺寸只读取一次文件头，输出规划一次完成，每张图片只在写入时打开一次并立即关闭
+    :param image_paths: 按顺序排列的图片路径
+    :param output_base_path: 输出路径前缀
+    :param remove_inputs: 拼接完成后是否删除输入图片
+    :param options: 输出选项，None 时使用默认的 JPEG
+    :return: 保存的长图路径
+    """
+    options = options or OutputOptions()
+    with _EncodeQueue() as queue:
+        for segment in plan_segments(image_sizes(image_paths), images_per_long, options.max_height):
+            writer = open_writer(options, output_base_path + segment.suffix, segment.width, segment.height,
+                                 queue.encoder)
+            _write_segment(writer, (Image.open(image_paths[position]) for position in segment.positions))
+            queue.add(writer)
+    if remove_inputs:
+        for image_path in image_paths:
+            os.remove(image_path)
+    return queue.output_paths
+
+
+def convert_pdf(pdf_path: str, output_base_path: str, zoom_factor: float, images_per_long: int,
+                log_func: Callable[[str], None], workers: Optional[int] = None,
+                options: Optional[OutputOptions] = None, sizes: Optional[Sequence[Tuple[int, int]]] = None,
+                executor: Optional[ProcessPoolExecutor] = None, budget: Optional[RenderBudget] = None,
+                on_page: Optional[Callable[[PageResult], None]] = None,
+                cache: Optional[RenderCache] = None, selection: Optional[PageSelection] = None,
+                pages: Optional[Sequence[int]] = None) -> List[str]:
+    """
+    把 PDF 转换为长图：先按页面尺寸规划输出，再边渲染边写入，只渲染选中的页面
+    :param output_base_path: 输出路径前缀，实际文件名追加 _part1.jpg 等后缀
+    :param options: 输出选项，None 时使用默认的 JPEG；灰度输出时直接以灰度渲染
+    :param sizes: 已计算的选中页面尺寸，与 pages 一起提供，None 时读取文档获得
+    :param executor: 共享的进程池
+    :param budget: 共享的在途页面额度
+    :param on_page: 每页写入（或失败跳过）后调用
+    :param cache: 渲染缓存，命中的页面直接读取，不再渲染
+    :param selection: 页面选择，None 时为全部页面；缩略图模式下缩放倍数不超过 THUMBNAIL_ZOOM
+    :param pages: 已计算的选中页码，见 page_sizes
+    :return: 保存的长图路径
+    :raises Exception: 无法打开文档或页面选择不包含任何页面时抛出
+    """
+    options = options or OutputOptions()
+    log_func(f"开始处理文件: {pdf_path}")
+    if selection:
+        zoom_factor = selection.zoom(zoom_factor)
+    if sizes is None:
+        pages, sizes = page_sizes(pdf_path, zoom_factor, selection)
+    segments = plan_segments(sizes, images_per_long, options.max_height)
+    doc_hash = document_hash(pdf_path) if cache else None
+    colorspace = COLORSPACE_GRAY if options.grayscale else COLORSPACE_RGB
+    results = render_pages(pdf_path, zoom_factor, sizes, workers, executor, budget, cache, doc_hash, colorspace,
+                           pages)
+    try:
+        output_paths = stitch_pages(results, segments, output_base_path, log_func, options, on_page)
+    finally:
+        results.close()
+    if cache:
+        cache.trim()
+    log_func(f"文件处理完成: {pdf_path}")
+    return output_paths
@@ -0,0 +1,167 @@
+# render_cache.py
+"""
+页面渲染缓存：以 (文档内容哈希, 页码, 缩放倍数, 色彩空间, PyMuPDF 版本) 为键，把渲染出的原始像素
+以 zlib 快速压缩后保存在磁盘上。只改变拼接方式重新转换时不必再次渲染，
+PDF 转长图与黑白化处理在缩放倍数和色彩空间一致时共用同一份缓存。
+缓存总大小超过上限时按最近使用时间（命中时更新文件修改时间）淘汰
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".openpreptools", "render_cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+TRIM_RATIO = 0.9  # 超出上限时淘汰到上限的该比例，避免每次写入都触发淘汰
+COMPRESS_LEVEL = 1  # 渲染结果大多是大片空白，最快的压缩级别已足够
+HASH_CHUNK_SIZE = 1024 * 1024
+ENTRY_MAGIC = b"PRC1"
+ENTRY_HEADER = struct.Struct("<4sIIB")  # 魔数, 宽, 高, 每像素通道数
+
+COLORSPACE_RGB = "rgb"
+COLORSPACE_GRAY = "gray"
+COLORSPACES = {COLORSPACE_RGB: fitz.csRGB, COLORSPACE_GRAY: fitz.csGRAY}
+
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+_hash_lock = threading.Lock()
+
+
+def document_hash(pdf_path: str) -> str:
+    """文档内容的 SHA-256，同一进程内按 (路径, 大小, 修改时间) 记忆"""
+    stat = os.stat(pdf_path)
+    memo_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+    file_hash = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    digest = file_hash.hexdigest()
+    with _hash_lock:
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def cache_key(doc_hash: str, page_num: int, zoom_factor: float, colorspace: str = COLORSPACE_RGB) -> str:
+    # 界面的整数缩放倍数 2 与命令行的 2.0 渲染结果相同，统一为 float 后再生成键
+    text = f"{doc_hash}:{page_num}:{float(zoom_factor)!r}:{colorspace}:{fitz.VersionBind}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    width: int
+    height: int
+    channels: int
+    samples: bytes
+
+
+class RenderCache:
+    """
+    磁盘渲染缓存，可以传给工作进程使用（只保存目录与上限）
+    :param directory: 缓存目录
+    :param max_bytes: 缓存总大小上限
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key: str) -> Optional[CachedPage]:
+        """读取缓存并更新其最近使用时间，不存在或已损坏时返回 None"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, width, height, channels = ENTRY_HEADER.unpack_from(data)
+            if magic != ENTRY_MAGIC:
+                return None
+            samples = zlib.decompress(memoryview(data)[ENTRY_HEADER.size:])
+            if len(samples) != width * height * channels:
+                return None
+            os.utime(path)
+        except (OSError, struct.error, zlib.error):
+            return None
+        return CachedPage(width, height, channels, samples)
+
+    def store(self, key: str, page: CachedPage) -> None:
+        """写入临时文件后替换，多个进程同时写入同一页时不会产生不完整的缓存；写入失败时忽略"""
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(ENTRY_HEADER.pack(ENTRY_MAGIC, page.width, page.height, page.channels))
+                f.write(zlib.compress(page.samples, COMPRESS_LEVEL))
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def trim(self) -> int:
+        """
+        总大小超过上限时从最久未使用的缓存开始删除
+        :return: 删除的字节数
+        """
+        entries = []
+        total = 0
+        try:
+            subdirs = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        target = total - int(self.max_bytes * TRIM_RATIO)
+        for _, size, path in sorted(entries):
+            if removed >= target:
+                break
+            try:
+                os.remove(path)
+                removed += size
+            except OSError:
+                pass
+        return removed
+
+
+def render_cached(pdf_doc: fitz.Document, page_num: int, zoom_factor: float, colorspace: str = COLORSPACE_RGB,
+                  cache: Optional[RenderCache] = None, doc_hash: Optional[str] = None) -> CachedPage:
+    """
+    渲染一页，提供 cache 与 doc_hash 时先查缓存，未命中时渲染后写入缓存
+    :raises Exception: 渲染失败时抛出
+    """
+    key = cache_key(doc_hash, page_num, zoom_factor, colorspace) if cache and doc_hash else None
+    if key:
+        page = cache.load(key)
+        if page is not None:
+            return page
+    pix = pdf_doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(zoom_factor, zoom_factor),
+                                                 colorspace=COLORSPACES[colorspace], alpha=False)
+    page = CachedPage(pix.width, pix.height, pix.n, pix.samples)
+    if key:
+        cache.store(key, page)
+    return page
@@ -0,0 +1,55 @@
+# event_stream.py
+"""
+命令行工具共用的 JSON Lines 事件输出：每行一个 {"event": ..., "time": ..., ...} 对象，
+多线程回调中调用也不会交错；progress 事件按时间间隔限频，由各工具的子类维护自己的计数
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TextIO
+
+
+class EventStream:
+    """
+    :param stream: 输出流
+    :param interval: 两次 progress 事件的最小间隔（秒）
+    """
+
+    def __init__(self, stream: TextIO, interval: float = 1.0) -> None:
+        self.stream = stream
+        self.interval = interval
+        self._start = time.perf_counter()
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields) -> None:
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def start(self, command: str, **fields) -> None:
+        self._start = time.perf_counter()
+        self.emit("start", command=command, **fields)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def _due(self, force: bool = False) -> bool:
+        """在持有 self._lock 时调用：距上次 progress 事件已到间隔（或 force）时记录本次时间并返回 True"""
+        now = time.perf_counter()
+        if force or now - self._last_emit >= self.interval:
+            self._last_emit = now
+            return True
+        return False
+
+    def rates(self) -> dict:
+        """progress 与 done 事件附带的统计，子类在此加入自己的计数"""
+        return {"elapsed": round(self.elapsed, 3)}
+
+    def done(self, **fields) -> None:
+        self.emit("done", **self.rates(), **fields)
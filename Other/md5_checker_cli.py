@@ -0,0 +1,124 @@
+# md5_checker_cli.py
+"""
+MD5 校验器命令行版本，可用于定时任务或 CI，清单格式与 md5sum/sha256sum 兼容
+
+用法:
+    python md5_checker_cli.py create MD5SUMS dist/ --jobs 4
+    python md5_checker_cli.py verify MD5SUMS --format json
+    python md5_checker_cli.py diff old.md5 new.md5
+    python md5_checker_cli.py update MD5SUMS dist/ --prune
+
+退出码: 0 全部一致; 1 存在不匹配、缺失或差异; 2 参数或读写错误
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from dataclasses import asdict
+from typing import List, Tuple
+
+from md5_checker_core import (STATUS_OK, create_manifest, diff_manifests, read_manifest, update_manifest,
+                              verify_manifest)
+
+EXIT_OK = 0
+EXIT_MISMATCH = 1
+EXIT_ERROR = 2
+
+
+def emit(rows: List[dict], output_format: str, text_lines: List[str]) -> None:
+    """按指定格式输出结果行"""
+    if output_format == "json":
+        json.dump(rows, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    elif output_format == "csv":
+        if rows:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        for line in text_lines:
+            print(line)
+
+
+def cmd_create(args) -> int:
+    results = create_manifest(args.manifest, args.paths, args.algorithm, args.jobs, not args.no_recursive)
+    rows = [asdict(r) for r in results]
+    emit(rows, args.format, [f"{r.digest}  {r.path}" if r.digest else f"{r.path}: {r.error}" for r in results])
+    return EXIT_ERROR if any(r.error for r in results) else EXIT_OK
+
+
+def cmd_verify(args) -> int:
+    results = verify_manifest(args.manifest, args.base_dir, args.algorithm, args.jobs)
+    rows = [asdict(r) for r in results]
+    lines = [f"{r.path}: {r.status}" for r in results if not (args.quiet and r.status == STATUS_OK)]
+    emit(rows, args.format, lines)
+    return EXIT_OK if all(r.status == STATUS_OK for r in results) else EXIT_MISMATCH
+
+
+def cmd_diff(args) -> int:
+    changes = diff_manifests(read_manifest(args.old), read_manifest(args.new))
+    emit(changes, args.format, [f"{c['change']}: {c['path']}" for c in changes])
+    return EXIT_MISMATCH if changes else EXIT_OK
+
+
+def cmd_update(args) -> int:
+    errors: List[Tuple[str, str]] = []
+    changes = update_manifest(args.manifest, args.paths, args.algorithm, args.jobs, args.prune, errors)
+    emit(changes, args.format, [f"{c['change']}: {c['path']}" for c in changes])
+    for path, error in errors:
+        print(f"{path}: {error}", file=sys.stderr)
+    return EXIT_ERROR if errors else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="MD5 校验器命令行工具（兼容 md5sum/sha256sum 清单格式）")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="并发计算的线程数")
+    common.add_argument("--format", choices=["text", "json", "csv"], default="text", help="输出格式")
+    hashing = argparse.ArgumentParser(add_help=False)
+    hashing.add_argument("--algorithm", "-a", default=None,
+                         help="哈希算法（md5、sha1、sha256 等），校验与更新时默认根据清单推断")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create = subparsers.add_parser("create", parents=[common, hashing], help="计算文件哈希并生成清单")
+    create.add_argument("manifest", help="清单文件路径")
+    create.add_argument("paths", nargs="+", help="文件或文件夹")
+    create.add_argument("--no-recursive", action="store_true", help="不递归进入子文件夹")
+    create.set_defaults(func=cmd_create)
+
+    verify = subparsers.add_parser("verify", parents=[common, hashing], help="按清单校验文件")
+    verify.add_argument("manifest", help="清单文件路径")
+    verify.add_argument("--base-dir", default=None, help="清单中相对路径的解析目录，默认为清单所在目录")
+    verify.add_argument("--quiet", "-q", action="store_true", help="文本输出时不显示校验通过的文件")
+    verify.set_defaults(func=cmd_verify)
+
+    diff = subparsers.add_parser("diff", parents=[common], help="比较两份清单")
+    diff.add_argument("old", help="旧清单")
+    diff.add_argument("new", help="新清单")
+    diff.set_defaults(func=cmd_diff)
+
+    update = subparsers.add_parser("update", parents=[common, hashing], help="重新计算清单中的文件并加入新文件")
+    update.add_argument("manifest", help="清单文件路径")
+    update.add_argument("paths", nargs="*", help="需要加入清单的文件或文件夹")
+    update.add_argument("--prune", action="store_true", help="移除已不存在的文件")
+    update.set_defaults(func=cmd_update)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "create" and args.algorithm is None:
+        args.algorithm = "md5"
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
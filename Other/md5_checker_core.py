@@ -0,0 +1,440 @@
+# md5_checker_core.py
+"""
+MD5 校验器核心：与界面无关的文件哈希计算
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PARTIAL_SIZE = 262144  # 性能模式下仅计算前256KB
+BUFFERED_CHUNK_SIZE = 8192  # 原始逐块读取的块大小
+READINTO_CHUNK_SIZE = 1024 * 1024  # readinto 复用缓冲区大小
+MMAP_MIN_SIZE = 8 * 1024 * 1024  # 小于该大小的文件不使用 mmap
+MMAP_SLICE_SIZE = 16 * 1024 * 1024  # 每次送入 hashlib 的映射切片大小
+
+
+def hash_file_buffered(file_path: str, algorithm: str = "md5", chunk_size: int = BUFFERED_CHUNK_SIZE) -> str:
+    """
+    逐块 read 计算哈希（原始实现）
+    :param file_path: 文件路径
+    :param algorithm: hashlib 支持的算法名
+    :param chunk_size: 每次读取的字节数
+    :return: 十六进制哈希值
+    """
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def hash_file_readinto(file_path: str, algorithm: str = "md5", chunk_size: int = READINTO_CHUNK_SIZE) -> str:
+    """
+    使用 readinto 复用同一块缓冲区计算哈希，避免每块分配新的 bytes 对象
+    :param file_path: 文件路径（也可以是管道等不可映射的文件）
+    :param algorithm: hashlib 支持的算法名
+    :param chunk_size: 缓冲区大小
+    :return: 十六进制哈希值
+    """
+    file_hash = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as file:
+        while True:
+            read_size = file.readinto(buffer)
+            if not read_size:
+                break
+            file_hash.update(view[:read_size])
+    return file_hash.hexdigest()
+
+
+def hash_file_mmap(file_path: str, algorithm: str = "md5", slice_size: int = MMAP_SLICE_SIZE) -> str:
+    """
+    将文件映射到内存，按大切片送入 hashlib（hashlib 在计算大块数据时会释放 GIL）
+    :param file_path: 普通文件路径，空文件或不可映射的文件会抛出 ValueError/OSError
+    :param algorithm: hashlib 支持的算法名
+    :param slice_size: 每次送入 hashlib 的切片大小
+    :return: 十六进制哈希值
+    """
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # 提示内核顺序读取，以便更积极地预读（Windows 与旧版本 Python 无此接口）
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mapped) as view:
+                for offset in range(0, len(view), slice_size):
+                    with view[offset:offset + slice_size] as piece:
+                        file_hash.update(piece)
+    return file_hash.hexdigest()
+
+
+def hash_file_partial(file_path: str, algorithm: str = "md5", size: int = PARTIAL_SIZE) -> str:
+    """
+    仅计算文件前 size 字节的哈希
+    """
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, 'rb') as file:
+        file_hash.update(file.read(size))
+    return file_hash.hexdigest()
+
+
+HASH_STRATEGIES: Dict[str, Callable[..., str]] = {
+    "buffered": hash_file_buffered,
+    "readinto": hash_file_readinto,
+    "mmap": hash_file_mmap,
+}
+
+
+def choose_strategy(file_path: str) -> str:
+    """
+    根据文件类型与大小选择哈希策略：大文件走 mmap，小文件、管道等走 readinto
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return "readinto"
+    if stat.S_ISREG(file_stat.st_mode) and file_stat.st_size >= MMAP_MIN_SIZE:
+        return "mmap"
+    return "readinto"
+
+
+def calculate_hash(file_path: str, algorithm: str = "md5", partial: bool = False, strategy: str = "auto") -> str:
+    """
+    计算文件哈希值
+    :param file_path: 文件路径
+    :param algorithm: hashlib 支持的算法名
+    :param partial: 为 True 时仅计算文件的前256KB
+    :param strategy: "auto" 或 HASH_STRATEGIES 中的策略名
+    :return: 十六进制哈希值
+    :raises ValueError: 策略名无效时抛出
+    """
+    if partial:
+        return hash_file_partial(file_path, algorithm)
+    if strategy == "auto":
+        strategy = choose_strategy(file_path)
+    if strategy not in HASH_STRATEGIES:
+        raise ValueError(f"未知的哈希策略: {strategy}")
+    if strategy == "mmap":
+        try:
+            return hash_file_mmap(file_path, algorithm)
+        except (ValueError, OSError):
+            # 某些文件系统或特殊文件无法映射，回退到普通读取
+            return hash_file_readinto(file_path, algorithm)
+    return HASH_STRATEGIES[strategy](file_path, algorithm)
+
+
+def calculate_md5(file_path: str, partial: bool = False) -> str:
+    """
+    计算文件的 MD5 值
+    :param file_path: 文件路径
+    :param partial: 为 True 时仅计算文件的前256KB
+    """
+    return calculate_hash(file_path, "md5", partial)
+
+
+# ---------------------------------------------------------------------------
+# 批量计算与校验
+# ---------------------------------------------------------------------------
+
+# 根据十六进制摘要长度推断算法，用于读取 md5sum/sha*sum 格式的清单
+DIGEST_LENGTH_ALGORITHMS = {32: "md5", 40: "sha1", 56: "sha224", 64: "sha256", 96: "sha384", 128: "sha512"}
+
+STATUS_OK = "OK"
+STATUS_FAILED = "FAILED"
+STATUS_MISSING = "MISSING"
+STATUS_ERROR = "ERROR"
+
+
+@dataclass
+class HashResult:
+    """单个文件的哈希结果，error 不为空表示计算失败"""
+    path: str
+    digest: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class VerifyResult:
+    """单个清单条目的校验结果"""
+    path: str
+    status: str
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _hash_one(file_path: str, algorithm: str, partial: bool) -> HashResult:
+    try:
+        return HashResult(file_path, calculate_hash(file_path, algorithm, partial))
+    except OSError as e:
+        return HashResult(file_path, error=str(e))
+
+
+def iter_hash_files(file_paths: Iterable[str], algorithm: str = "md5", partial: bool = False,
+                    jobs: int = 1) -> Iterator[HashResult]:
+    """
+    批量计算哈希，按完成顺序逐个返回结果，便于调用方在自己的线程中刷新进度
+    :param file_paths: 文件路径列表
+    :param algorithm: hashlib 支持的算法名
+    :param partial: 为 True 时仅计算文件的前256KB
+    :param jobs: 并发线程数，1 表示在当前线程中顺序计算
+    """
+    file_paths = list(file_paths)
+    if jobs <= 1:
+        for file_path in file_paths:
+            yield _hash_one(file_path, algorithm, partial)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_hash_one, file_path, algorithm, partial) for file_path in file_paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def hash_files(file_paths: Iterable[str], algorithm: str = "md5", partial: bool = False,
+               jobs: int = 1) -> List[HashResult]:
+    """批量计算哈希，结果按输入顺序返回"""
+    file_paths = list(file_paths)
+    results = {result.path: result for result in iter_hash_files(file_paths, algorithm, partial, jobs)}
+    return [results[file_path] for file_path in file_paths]
+
+
+def collect_files(paths: Iterable[str], recursive: bool = True) -> List[str]:
+    """
+    展开路径列表：文件原样保留，目录展开为其中的文件（按路径排序）
+    """
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name) for name in sorted(names))
+            else:
+                files.extend(entry.path for entry in sorted(os.scandir(path), key=lambda e: e.name)
+                             if entry.is_file())
+        else:
+            files.append(path)
+    return files
+
+
+# ---------------------------------------------------------------------------
+# md5sum / sha256sum 格式清单
+# ---------------------------------------------------------------------------
+
+def _escape_name(name: str) -> tuple[str, str]:
+    """按 GNU coreutils 规则转义文件名，返回 (行首前缀, 转义后文件名)"""
+    if "\\" in name or "\n" in name or "\r" in name:
+        return "\\", name.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+    return "", name
+
+
+def _unescape_name(name: str) -> str:
+    out = []
+    i = 0
+    while i < len(name):
+        char = name[i]
+        if char == "\\" and i + 1 < len(name):
+            out.append({"\\": "\\", "n": "\n", "r": "\r"}.get(name[i + 1], name[i + 1]))
+            i += 2
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+
+def parse_manifest_line(line: str) -> Optional[tuple[str, str]]:
+    """
+    解析一行 md5sum 格式的清单："<摘要>  <文件名>" 或 "<摘要> *<文件名>"
+    :return: (文件名, 摘要)，空行或注释行返回 None
+    :raises ValueError: 格式不正确时抛出
+    """
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+    digest, sep, rest = line.partition(" ")
+    if not sep or not rest or len(digest) not in DIGEST_LENGTH_ALGORITHMS:
+        raise ValueError(f"无法解析的清单行: {line}")
+    # 第二个字符为空格（文本模式）或 *（二进制模式）
+    if rest[0] in " *":
+        rest = rest[1:]
+    name = _unescape_name(rest) if escaped else rest
+    return name, digest.lower()
+
+
+def read_manifest(manifest_path: str) -> Dict[str, str]:
+    """
+    读取 md5sum/sha256sum 格式的清单
+    :return: {文件名: 摘要}，保持清单中的顺序
+    """
+    entries: Dict[str, str] = {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parsed = parse_manifest_line(line)
+            if parsed:
+                entries[parsed[0]] = parsed[1]
+    return entries
+
+
+def write_manifest(manifest_path: str, entries: Dict[str, str]) -> None:
+    """
+    以 md5sum 兼容格式写入清单（二进制模式标记 *），先写临时文件再替换以免中途中断损坏清单
+    """
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        for name, digest in entries.items():
+            prefix, escaped = _escape_name(name)
+            f.write(f"{prefix}{digest} *{escaped}\n")
+    os.replace(temp_path, manifest_path)
+
+
+def detect_algorithm(entries: Dict[str, str], default: str = "md5") -> str:
+    """根据清单中摘要的长度推断哈希算法"""
+    for digest in entries.values():
+        return DIGEST_LENGTH_ALGORITHMS.get(len(digest), default)
+    return default
+
+
+def manifest_name(file_path: str, base_dir: str) -> str:
+    """清单中记录的文件名：相对 base_dir 的路径，统一使用 / 分隔"""
+    try:
+        name = os.path.relpath(file_path, base_dir)
+    except ValueError:  # Windows 下不同盘符无法求相对路径
+        name = os.path.abspath(file_path)
+    if name.startswith(os.pardir):
+        name = os.path.abspath(file_path)
+    return name.replace(os.sep, "/")
+
+
+def create_manifest(manifest_path: str, paths: Iterable[str], algorithm: str = "md5", jobs: int = 1,
+                    recursive: bool = True) -> List[HashResult]:
+    """
+    计算 paths 下所有文件的哈希并写入清单，清单中的路径相对于清单所在目录
+    :return: 每个文件的哈希结果（包含失败项，失败项不写入清单）
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    manifest_abspath = os.path.abspath(manifest_path)
+    files = [f for f in collect_files(paths, recursive) if os.path.abspath(f) != manifest_abspath]
+    results = hash_files(files, algorithm, jobs=jobs)
+    entries = {manifest_name(r.path, base_dir): r.digest for r in results if r.digest}
+    write_manifest(manifest_path, entries)
+    return results
+
+
+def verify_manifest(manifest_path: str, base_dir: Optional[str] = None, algorithm: Optional[str] = None,
+                    jobs: int = 1) -> List[VerifyResult]:
+    """
+    按清单校验文件
+    :param manifest_path: 清单路径
+    :param base_dir: 相对路径的解析目录，默认是清单所在目录
+    :param algorithm: 哈希算法，默认根据摘要长度推断
+    :param jobs: 并发线程数
+    """
+    entries = read_manifest(manifest_path)
+    base_dir = base_dir or os.path.dirname(os.path.abspath(manifest_path))
+    algorithm = algorithm or detect_algorithm(entries)
+    paths = {name: os.path.join(base_dir, name) for name in entries}
+
+    results: List[VerifyResult] = []
+    existing = [name for name, path in paths.items() if os.path.isfile(path)]
+    hashed = {r.path: r for r in hash_files([paths[name] for name in existing], algorithm, jobs=jobs)}
+    for name, expected in entries.items():
+        result = hashed.get(paths[name])
+        if result is None:
+            results.append(VerifyResult(name, STATUS_MISSING, expected))
+        elif result.error:
+            results.append(VerifyResult(name, STATUS_ERROR, expected, error=result.error))
+        elif result.digest == expected:
+            results.append(VerifyResult(name, STATUS_OK, expected, result.digest))
+        else:
+            results.append(VerifyResult(name, STATUS_FAILED, expected, result.digest))
+    return results
+
+
+def diff_manifests(old: Dict[str, str], new: Dict[str, str]) -> List[dict]:
+    """
+    比较两份清单
+    :return: [{"path", "change": added/removed/changed, "old", "new"}]
+    """
+    changes = []
+    for name, digest in old.items():
+        if name not in new:
+            changes.append({"path": name, "change": "removed", "old": digest, "new": None})
+        elif new[name] != digest:
+            changes.append({"path": name, "change": "changed", "old": digest, "new": new[name]})
+    for name, digest in new.items():
+        if name not in old:
+            changes.append({"path": name, "change": "added", "old": None, "new": digest})
+    return changes
+
+
+def update_manifest(manifest_path: str, paths: Iterable[str] = (), algorithm: Optional[str] = None,
+                    jobs: int = 1, prune: bool = False,
+                    errors: Optional[List[Tuple[str, str]]] = None) -> List[dict]:
+    """
+    更新清单：重新计算已有条目与 paths 中新文件的哈希，无法计算的已有条目保留原值
+    :param prune: 为 True 时移除已不存在的文件
+    :param errors: 提供时追加无法计算哈希的 (文件路径, 错误信息)
+    :return: 与 diff_manifests 相同格式的变更列表
+    """
+    old = read_manifest(manifest_path) if os.path.exists(manifest_path) else {}
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    algorithm = algorithm or detect_algorithm(old)
+    manifest_abspath = os.path.abspath(manifest_path)
+
+    targets = {name: os.path.join(base_dir, name) for name in old}
+    for file_path in collect_files(paths):
+        if os.path.abspath(file_path) != manifest_abspath:
+            targets[manifest_name(file_path, base_dir)] = file_path
+
+    existing = {name: path for name, path in targets.items() if os.path.isfile(path)}
+    hashed = {r.path: r for r in hash_files(existing.values(), algorithm, jobs=jobs)}
+    new: Dict[str, str] = {}
+    for name in targets:
+        result = hashed.get(targets[name])
+        if result is not None and result.digest:
+            new[name] = result.digest
+            continue
+        if result is not None and errors is not None:
+            errors.append((result.path, result.error))
+        if not prune and name in old:
+            new[name] = old[name]
+    write_manifest(manifest_path, new)
+    return diff_manifests(old, new)
+
+
+# ---------------------------------------------------------------------------
+# 图形界面使用的 JSON 记录（md5_data.json）
+# ---------------------------------------------------------------------------
+
+def load_json_records(json_path: str) -> Dict[str, dict]:
+    """读取 {文件路径: {"md5", "partial"}} 格式的记录，文件不存在时返回空字典"""
+    if not os.path.exists(json_path):
+        return {}
+    with open(json_path, 'r') as f:
+        return json.load(f)
+
+
+def save_json_records(json_path: str, records: Dict[str, dict]) -> None:
+    """将新记录合并写入 JSON 文件"""
+    data = load_json_records(json_path)
+    data.update(records)
+    with open(json_path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def check_json_record(records: Dict[str, dict], file_path: str, md5_hash: str, partial: bool) -> bool:
+    """判断文件的 MD5 与记录是否一致（计算方式也必须一致）"""
+    file_info = records.get(file_path)
+    return bool(file_info and file_info['md5'] == md5_hash and file_info['partial'] == partial)
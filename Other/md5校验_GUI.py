@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-import hashlib
-import json
 import os
 import webbrowser
 
+from md5_checker_core import calculate_md5, check_json_record, load_json_records, save_json_records
+
+JSON_PATH = 'md5_data.json'
+
 
 class MD5CheckerApp:
     def __init__(self, root):
@@ -76,25 +78,11 @@ class MD5CheckerApp:
 
     def calculate_md5(self, file_path):
         """计算并返回文件的MD5哈希值，根据性能提升选项决定计算方式"""
-        with open(file_path, 'rb') as file:
-            file_hash = hashlib.md5()
-            if self.performance_check.get():
-                chunk = file.read(262144)  # 读取前256KB
-                file_hash.update(chunk)
-            else:
-                while chunk := file.read(8192):
-                    file_hash.update(chunk)
-        return file_hash.hexdigest()
+        return calculate_md5(file_path, partial=self.performance_check.get())
 
     def write_to_json(self, file_path, md5_hash):
         """将文件名、MD5哈希值和是否仅计算了前256KB的MD5写入JSON文件"""
-        data = {}
-        if os.path.exists('md5_data.json'):
-            with open('md5_data.json', 'r') as f:
-                data = json.load(f)
-        data[file_path] = {'md5': md5_hash, 'partial': self.performance_check.get()}
-        with open('md5_data.json', 'w') as f:
-            json.dump(data, f, indent=4)
+        save_json_records(JSON_PATH, {file_path: {'md5': md5_hash, 'partial': self.performance_check.get()}})
 
     def add_file_md5(self):
         """选择多个文件，计算MD5并写入JSON"""
@@ -115,15 +103,13 @@ class MD5CheckerApp:
         file_paths = filedialog.askopenfilenames(filetypes=self.file_types)
         total_files = len(file_paths)
         if file_paths:
-            if not os.path.exists('md5_data.json'):
+            if not os.path.exists(JSON_PATH):
                 messagebox.showwarning("警告", "MD5数据文件不存在，请先添加文件MD5。")
                 return
-            with open('md5_data.json', 'r') as f:
-                data = json.load(f)
+            data = load_json_records(JSON_PATH)
             for i, file_path in enumerate(file_paths, start=1):
                 md5_hash = self.calculate_md5(file_path)
-                file_info = data.get(file_path)
-                if file_info and file_info['md5'] == md5_hash and file_info['partial'] == self.performance_check.get():
+                if check_json_record(data, file_path, md5_hash, self.performance_check.get()):
                     self.insert_output(f"匹配: {os.path.basename(file_path)}\n", "match")
                 else:
                     self.insert_output(f"不匹配: {os.path.basename(file_path)}\n", "nomatch")
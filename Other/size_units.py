@@ -0,0 +1,16 @@
+# size_units.py
+"""
+带 K/M/G 后缀的字节数解析，供整理工具、伪文件生成与各基准测试的命令行共用
+"""
+
+from __future__ import annotations
+
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """将 "64M"、"1G" 之类的文本解析为字节数"""
+    text = text.strip().upper()
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)